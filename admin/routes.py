@@ -25,6 +25,9 @@ from flask_jwt_extended import JWTManager, create_access_token, create_refresh_t
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask import current_app
 from user.routes import get_interbank_rate_from_db, require_reference_if_needed, user_bp, fetch_rate_for_date_and_currency
+from user.services.data_ingest import ingest_exchange_data, ingest_bctx_data
+from user.services.dashboard_cache import dashboard_cache
+from user.services.daily_stats import refresh_daily_stats, rebuild_daily_stats
 from extentions import limiter, revoke_token          
 
 
@@ -394,6 +397,7 @@ def process_matching_orders(app, debug_messages):
                         # Link matched orders
                         buy.matched_order_id = sell.id
                         sell.matched_order_id = buy.id
+                        buy.benchmark_dirty = sell.benchmark_dirty = True
 
                         db.session.add(buy)
                         db.session.add(sell)
@@ -419,6 +423,7 @@ def process_matching_orders(app, debug_messages):
         # Commit all changes
         try:
             db.session.commit()
+            dashboard_cache.invalidate_users(df['user_id'].dropna().astype(int))
             debug_messages.append("All changes committed to the database successfully.")
         except Exception as e:
             db.session.rollback()
@@ -645,178 +650,19 @@ def delete_premium_rate(rate_id):
 @admin_bp.route('/api/upsert-exchange-data', methods=['POST'])
 def upsert_exchange_data():
     """
-    Reads the latest JSON files (midmarket & yield) from /data folder,
-    and upserts into the exchange_data table.
+    Reads the JSON files (midmarket & yield) of the /data folder not
+    ingested yet, and upserts into the exchange_data table.
     Also back-fills any dates that appear only in the yield file.
-    Returns debug logs in the API response.
+    Files already ingested and records before the feed watermark are
+    skipped; ?full=1 re-ingests the whole files.
+    Returns debug logs in the API response (one line per date with ?debug=1).
     """
-    debug_messages = []
-    data_dir = os.path.join(current_app.root_path, 'data')
-    debug_messages.append(f"Data directory: {data_dir}")
-
-    try:
-        all_files = os.listdir(data_dir)
-        debug_messages.append(f"Files in directory: {all_files}")
-    except Exception as e:
-        return jsonify({'message': f'Error accessing data directory: {e}', 'debug': debug_messages}), 500
-
-    mid_pattern   = re.compile(r"midmarket_rates_\d{4}-\d{2}-\d{2}_\d{4}\.json")
-    yield_pattern = re.compile(r"daily_yield_rates_\d{4}-\d{2}-\d{2}_\d{4}\.json")
-
-    mid_files   = sorted(f for f in all_files if mid_pattern.search(f))
-    yield_files = sorted(f for f in all_files if yield_pattern.search(f))
-    debug_messages.append(f"Found mid_files: {mid_files}")
-    debug_messages.append(f"Found yield_files: {yield_files}")
-
-    if not mid_files or not yield_files:
-        return jsonify({'message': 'Required JSON files are missing', 'debug': debug_messages}), 404
-
-    latest_mid   = os.path.join(data_dir, mid_files[-1])
-    latest_yield = os.path.join(data_dir, yield_files[-1])
-    debug_messages += [f"Latest mid file: {latest_mid}", f"Latest yield file: {latest_yield}"]
-
-    try:
-        mid_data   = json.load(open(latest_mid))
-        yield_data = json.load(open(latest_yield))
-        debug_messages += [
-            f"Loaded {len(mid_data)} mid-data records",
-            f"Loaded {len(yield_data)} yield-data records"
-        ]
-    except Exception as e:
-        return jsonify({'message': f'Error reading JSON: {e}', 'debug': debug_messages}), 500
-
-    # --- 1) Process all mid-market dates (with matching yields if available) ---
-    processed_dates = set()
-
-    for m in mid_data:
-        ts = m.get('Timestamp')
-        if not ts:
-            debug_messages.append("Skipping mid record without Timestamp")
-            continue
-
-        try:
-            d = datetime.fromisoformat(ts).date()
-            debug_messages.append(f"Parsed mid date: {ts} => {d}")
-        except Exception as e:
-            debug_messages.append(f"Skipping mid parse error [{ts}]: {e}")
-            continue
-
-        processed_dates.add(d)
-
-        # look for the matching yield entry
-        match = next(
-            (y for y in yield_data
-             if y.get('Timestamp') 
-                and datetime.fromisoformat(y['Timestamp']).date() == d),
-            None
-        )
-
-        if match:
-            debug_messages.append(f"Found matching yield for {d}")
-            tnd_1m  = match.get('Mid_TND')
-            usd_1m  = match.get('Mid_USD1M')
-            eur_1m  = match.get('Mid_EUR1M')
-            usd_3m  = match.get('Mid_USD3M')
-            usd_6m  = match.get('Mid_USD6M')
-            eur_3m  = match.get('Mid_EUR3M')
-            eur_6m  = match.get('Mid_EUR6M')
-        else:
-            debug_messages.append(f"No yield match for {d}")
-            tnd_1m = usd_1m = eur_1m = usd_3m = usd_6m = eur_3m = eur_6m = None
-
-        rec = ExchangeData.query.filter_by(date=d).first()
-        if rec:
-            # update
-            rec.spot_usd = m.get('spotUSD') or 0.0
-            rec.spot_eur = m.get('spotEUR') or 0.0
-            if tnd_1m is not None:  rec.tnd_1m = tnd_1m
-            if usd_1m is not None:  rec.usd_1m = usd_1m
-            if eur_1m is not None:  rec.eur_1m = eur_1m
-            if usd_3m is not None:  rec.usd_3m = usd_3m
-            if usd_6m is not None:  rec.usd_6m = usd_6m
-            if eur_3m is not None:  rec.eur_3m = eur_3m
-            if eur_6m is not None:  rec.eur_6m = eur_6m
-            debug_messages.append(f"Updated record for {d}")
-        else:
-            # create new
-            new = ExchangeData(
-                date=d,
-                spot_usd=m.get('spotUSD') or 0.0,
-                spot_eur=m.get('spotEUR')or 0.0,
-                tnd_1m=tnd_1m  or 0.0,
-                usd_1m=usd_1m  or 0.0,
-                eur_1m=eur_1m  or 0.0,
-                usd_3m=usd_3m  or 0.0,
-                usd_6m=usd_6m  or 0.0,
-                eur_3m=eur_3m  or 0.0,
-                eur_6m=eur_6m  or 0.0,
-                # if you really want TND 3m/6m equal to overnight:
-                tnd_3m=tnd_1m or 0.0,
-                tnd_6m=tnd_1m or 0.0,
-            )
-            db.session.add(new)
-            debug_messages.append(f"Created record for {d}")
-
-    # --- 2) Now back-fill any dates that appear only in the yield file ---
-    for y in yield_data:
-        y_ts = y.get('Timestamp')
-        if not y_ts:
-            continue
-        try:
-            d = datetime.fromisoformat(y_ts).date()
-        except:
-            continue
-
-        # skip any date we already did in the mid-loop
-        if d in processed_dates:
-            continue
-
-        # these are yield-only dates
-        tnd_1m  = y.get('Mid_TND')   or 0.0
-        usd_1m  = y.get('Mid_USD1M') or 0.0
-        eur_1m  = y.get('Mid_EUR1M') or 0.0
-        usd_3m  = y.get('Mid_USD3M') or 0.0
-        usd_6m  = y.get('Mid_USD6M') or 0.0
-        eur_3m  = y.get('Mid_EUR3M') or 0.0
-        eur_6m  = y.get('Mid_EUR6M') or 0.0
-
-        rec = ExchangeData.query.filter_by(date=d).first()
-        if rec:
-            rec.tnd_1m = tnd_1m
-            rec.usd_1m = usd_1m
-            rec.eur_1m = eur_1m
-            rec.usd_3m = usd_3m
-            rec.usd_6m = usd_6m
-            rec.eur_3m = eur_3m
-            rec.eur_6m = eur_6m
-            debug_messages.append(f"Updated yields for existing date {d}")
-        else:
-            new = ExchangeData(
-                date=d,
-                spot_usd=0.0,  # no spot data
-                spot_eur=0.0,
-                tnd_1m=tnd_1m,
-                usd_1m=usd_1m,
-                eur_1m=eur_1m,
-                usd_3m=usd_3m,
-                usd_6m=usd_6m,
-                eur_3m=eur_3m,
-                eur_6m=eur_6m,
-                tnd_3m=tnd_1m,
-                tnd_6m=tnd_1m,
-            )
-            db.session.add(new)
-            debug_messages.append(f"Inserted yield-only record for {d}")
-
-    # finally commit
-    try:
-        db.session.commit()
-        debug_messages.append("All changes committed")
-        return jsonify({'message':'Exchange data upserted','debug':debug_messages}), 200
-    except Exception as e:
-        db.session.rollback()
-        debug_messages.append(f"Commit failed: {e}")
-        return jsonify({'message':f'Error updating DB: {e}','debug':debug_messages}),500
+    payload, status = ingest_exchange_data(
+        os.path.join(current_app.root_path, 'data'),
+        full=request.args.get('full') == '1',
+        debug=request.args.get('debug') == '1',
+    )
+    return jsonify(payload), status
 
 @admin_bp.route('/api/debug-exchange', methods=['GET'])
 def debug_exchange():
@@ -844,6 +690,26 @@ def debug_exchange():
         })
     return jsonify(rows), 200
 
+@admin_bp.route('/api/dashboard-cache/stats', methods=['GET'])
+@jwt_required()
+@roles_required('Admin')
+def dashboard_cache_stats():
+    """Size and hit/miss counters of this worker's dashboard cache."""
+    return jsonify(dashboard_cache.stats()), 200
+
+@admin_bp.route('/api/client-daily-stats/rebuild', methods=['POST'])
+@jwt_required()
+@roles_required('Admin')
+def rebuild_client_daily_stats():
+    """Backfill client_daily_stats (all clients, or ?user_id=<id>)."""
+    user_id = request.args.get('user_id', type=int)
+    written = rebuild_daily_stats(user_id)
+    if user_id is None:
+        dashboard_cache.clear()
+    else:
+        dashboard_cache.invalidate_user(user_id)
+    return jsonify({"message": "client_daily_stats rebuilt", "rows": written}), 200
+
 @admin_bp.route('/api/internal-emails', methods=['GET'])
 @jwt_required()
 def get_internal_emails():
@@ -893,9 +759,12 @@ def update_order(order_id):
     order.bank_name = data.get("bank_name", order.bank_name)
     order.historical_loss=data.get("historical_loss", order.historical_loss)
     order.reference = data.get("reference", order.reference)     
+    order.benchmark_dirty = True
 
     # Update any additional fields here...
+    refresh_daily_stats([(order.user_id, order.currency, order.transaction_date)])
     db.session.commit()
+    dashboard_cache.invalidate_user(order.user_id)
 
     # When the order is updated to Executed (and it was not Executed before), generate emails
     if old_status != "Executed" and order.status == "Executed":
@@ -1071,144 +940,18 @@ def generate_my_excel():
     )
 
 
-def pick(rec: dict, ric: str, side: str):
-    """
-    Retourne la valeur v telle que la clé k contient à la fois
-    le RIC (ex: 'EURTNDX=BCTX') et le side ('BID' ou 'ASK').
-    Si rien trouvé -> None
-    """
-    for k, v in rec.items():
-        if ric in k and side in k:
-            return v
-    return None
-
-
 @admin_bp.route('/api/upsert-bctx', methods=['POST'])
 def upsert_bctx_data():
     """
-    Reads the LATEST bctx_data_YYYY-MM-DD_HHMM.json file from /app/data,
-    then upserts into bctx_fixings. 
+    Reads the bctx_data_YYYY-MM-DD_HHMM.json files of /app/data not
+    ingested yet, then upserts into bctx_fixings.
+    Records before the bctx watermark are skipped (?full=1 re-ingests).
     """
-
-    debug_messages = []
-    data_dir = os.path.join(current_app.root_path, 'data')
-    
-    # 1) Find the newest bctx_data_... file
-    pattern = re.compile(r"bctx_data_(\d{4}-\d{2}-\d{2}_\d{4})\.json")
-    
-    try:
-        all_files = os.listdir(data_dir)
-        bctx_files = sorted([f for f in all_files if pattern.search(f)])
-        if not bctx_files:
-            return jsonify({"message": "No bctx_data_*.json files found"}), 404
-        
-        # The last one is the newest
-        latest_bctx_file = bctx_files[-1]
-        bctx_file_path = os.path.join(data_dir, latest_bctx_file)
-
-    except Exception as e:
-        return jsonify({"message": f"Error accessing data_dir or listing files: {str(e)}"}), 500
-
-    # 2) Read that JSON file
-    try:
-        with open(bctx_file_path, 'r') as f:
-            bctx_data = json.load(f)
-    except Exception as e:
-        return jsonify({"message": f"Error reading {latest_bctx_file}: {str(e)}"}), 500
-
-    if not isinstance(bctx_data, list):
-        return jsonify({"message": "Invalid JSON structure: expected a list"}), 400
-
-    records_processed = 0
-
-    # 3) Upsert logic
-    for rec in bctx_data:
-        # Try standard key
-        ts_str = rec.get("Timestamp")
-
-        # If not found, try fallback pattern like "('Timestamp', '')"
-        if not ts_str:
-            for key in rec:
-                if "Timestamp" in key:
-                    ts_str = rec[key]
-                    break
-
-        if not ts_str:
-            debug_messages.append("Skipping record with missing Timestamp.")
-            continue
-
-        try:
-            from datetime import datetime
-            ts = datetime.fromisoformat(ts_str.replace("Z",""))
-        except ValueError as e:
-            debug_messages.append(f"Skipping invalid Timestamp '{ts_str}': {e}")
-            continue
-
-        if ts.hour < 12:
-            session = "morning"
-        else:
-            session = "afternoon"
-
-        the_date = ts.date()
-
-        # Extract the numeric data
-       
-        tnd_bid = pick(rec, "TND=BCTX", "BID")
-        tnd_ask = pick(rec, "TND=BCTX", "ASK")
-
-        eur_bid = pick(rec, "EURTNDX=BCTX", "BID")
-        eur_ask = pick(rec, "EURTNDX=BCTX", "ASK")
-
-        gbp_bid = pick(rec, "GBPTNDX=BCTX", "BID")
-        gbp_ask = pick(rec, "GBPTNDX=BCTX", "ASK")
-
-        jpy_bid = pick(rec, "JPYTNDX=BCTX", "BID")
-        jpy_ask = pick(rec, "JPYTNDX=BCTX", "ASK")
-
-        # Check if we already have a row for that date+session
-        existing = BctxFixing.query.filter_by(date=the_date, session=session).first()
-        if existing:
-            existing.original_timestamp = ts
-            existing.tnd_bid = tnd_bid
-            existing.tnd_ask = tnd_ask
-            existing.eur_bid = eur_bid
-            existing.eur_ask = eur_ask
-            existing.gbp_bid = gbp_bid
-            existing.gbp_ask = gbp_ask
-            existing.jpy_bid = jpy_bid
-            existing.jpy_ask = jpy_ask
-            debug_messages.append(f"Updated {the_date} {session}.")
-        else:
-            new_row = BctxFixing(
-                date=the_date,
-                session=session,
-                original_timestamp=ts,
-                tnd_bid=tnd_bid,
-                tnd_ask=tnd_ask,
-                eur_bid=eur_bid,
-                eur_ask=eur_ask,
-                gbp_bid=gbp_bid,
-                gbp_ask=gbp_ask,
-                jpy_bid=jpy_bid,
-                jpy_ask=jpy_ask
-            )
-            db.session.add(new_row)
-            debug_messages.append(f"Inserted new record for {the_date} {session}.")
-
-        records_processed += 1
-
-    # 4) Commit
-    try:
-        db.session.commit()
-        debug_messages.append(f"Processed {records_processed} records from {latest_bctx_file}.")
-        return jsonify({
-            "message": "BCTX fixings upsert complete",
-            "records_processed": records_processed,
-            "debug": debug_messages
-        }), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"message": f"DB commit error: {str(e)}"}), 500
+    payload, status = ingest_bctx_data(
+        os.path.join(current_app.root_path, 'data'),
+        full=request.args.get('full') == '1',
+    )
+    return jsonify(payload), status
 
 @admin_bp.route('/api/tca/inputs', methods=['POST'])
 @jwt_required()
@@ -1353,6 +1096,7 @@ def upload_orders():
     df["Type"]             = df["Type"].str.lower().str.strip()
 
     uploaded, updated = 0, 0
+    day_keys = set()
     for idx, row in df.iterrows():
 
         # When admin leaves Interbancaire blank ➜ fetch automatically
@@ -1387,6 +1131,7 @@ def upload_orders():
             commission_percent = row["Commission %"],
             trade_type         = row["Trade Type"],
             status             = "Executed",
+            benchmark_dirty    = True,
         )
 
         order = Order.query.filter_by(**lookup).first()
@@ -1400,8 +1145,11 @@ def upload_orders():
                                  order_date=datetime.utcnow(),
                                  **common))
             uploaded += 1
+        day_keys.add((client.id, lookup["currency"], lookup["transaction_date"].date()))
 
+    refresh_daily_stats(day_keys)
     db.session.commit()
+    dashboard_cache.invalidate_user(client.id)
     return {
         "message": "Orders processed",
         "uploaded_count": uploaded,
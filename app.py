@@ -1,4 +1,5 @@
 from flask import Flask
+import click
 from flask_cors import CORS
 from datetime import timedelta  , datetime       
 import os
@@ -6,7 +7,6 @@ from dotenv import load_dotenv
 from extentions import limiter
 from models import db, User, Role, RevokedToken
 from scheduler import scheduler, start_scheduler
-from scheduler_jobs import check_for_new_files
 from flask_security import Security, SQLAlchemySessionUserDatastore
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
@@ -14,6 +14,9 @@ from admin.routes import admin_bp
 from user.routes import user_bp, init_socketio, delete_expired_positions, \
                          update_order_interbank_and_benchmark_rates, \
                          update_interbank_rates_db_logic
+from user.services.daily_stats import rebuild_daily_stats
+from user.services.data_watcher import start_data_watcher
+from user.services.market_archive import market_archive
 from invoice import invoice_bp
 from accounts import accounts_bp
 from tca.routes import tca_bp
@@ -96,17 +99,30 @@ security = Security(app, user_datastore)
 with app.app_context():
     db.create_all()
 
+@app.cli.command("rebuild-daily-stats")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this client.")
+def rebuild_daily_stats_command(user_id):
+    """Backfill client_daily_stats from the orders table."""
+    print(f"client_daily_stats rows written: {rebuild_daily_stats(user_id)}")
+
+@app.cli.command("watch-data")
+def watch_data_command():
+    """Ingest new data/ files as eikon/ writes them (runs until stopped)."""
+    watcher = start_data_watcher(app)
+    if watcher is not None:
+        watcher.wait()
+
+@app.cli.command("rebuild-market-archive")
+def rebuild_market_archive_command():
+    """Rewrite the columnar market-data archive from the database."""
+    print(f"market archive rows written: {market_archive.rebuild()}")
+
 # (the rest of your scheduler + socket.io code stays exactly as-is)
 
 # --------------------------------------------------
-# 1) Add the check_for_new_files job (5 min interval)
+# 1) data/ files are ingested by the data watcher, started
+#    below (python app.py) or with `flask watch-data`
 # --------------------------------------------------
-scheduler.add_job(
-    func=check_for_new_files, 
-    trigger='interval', 
-    minutes=5,
-    id="check_for_new_files_job"
-)
 
 # ------------------------------------------------------------
 # 2) Add daily job to delete expired positions (24h interval)
@@ -147,6 +163,7 @@ start_scheduler()
 socketio = init_socketio(app)
 
 if __name__ == "__main__":
+    data_watcher = start_data_watcher(app)
     app.run(debug=True, use_reloader=False, host='0.0.0.0', port=5001)
     socketio.run(app, debug=True)
 
@@ -2,8 +2,8 @@
 from flask import Blueprint, render_template, redirect, url_for
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models import User
+from user.services.market_providers import get_market_provider
 from functools import wraps
-import eikon as ek
 import pandas as pd
 
 # Blueprint setup
@@ -30,11 +30,11 @@ def dashboard():
     return render_template('dashboard.html', vix_data=vix_data, dxy_data=dxy_data, usdeur_data=usdeur_data)
 
 
-# Set your Eikon API key (replace with your actual key or use env variable)
-ek.set_app_key("20af0572a6364fe8abf9a35cdd16bd367057564a")
+# Bars come from the configured market data provider (Eikon in production,
+# see user/services/market_providers.py)
 
 def get_vix_data():
-    vix_df = ek.get_timeseries(".VIX", interval="minute", count=36)
+    vix_df = get_market_provider().history(".VIX", interval="minute", count=36)
     if vix_df is None or vix_df.empty:
         return []
     vix_df.index = pd.to_datetime(vix_df.index)
@@ -49,7 +49,7 @@ def get_vix_data():
     return vix_5m.to_dict(orient="records")
 
 def get_dxy_data():
-    dxy_df = ek.get_timeseries(".DXY", interval="minute", count=36)
+    dxy_df = get_market_provider().history(".DXY", interval="minute", count=36)
     if dxy_df is None or dxy_df.empty:
         return []
     dxy_df.index = pd.to_datetime(dxy_df.index)
@@ -63,7 +63,7 @@ def get_dxy_data():
     return dxy_5m.to_dict(orient="records")
 
 def get_usdeur_data():
-    usdeur_df = ek.get_timeseries("EUR=", interval="minute", count=36)
+    usdeur_df = get_market_provider().history("EUR=", interval="minute", count=36)
     if usdeur_df is None or usdeur_df.empty:
         return []
     usdeur_df.index = pd.to_datetime(usdeur_df.index)
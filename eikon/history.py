@@ -0,0 +1,164 @@
+"""
+Incremental history fetches shared by the Eikon scripts.
+
+Each run resumes every RIC from the last timestamp it returned on the
+previous run (kept in data/.eikon_state.json), splits the range into
+date chunks fetched in parallel with retries, and writes only the rows
+it fetched to a new file: the app ingests every file it has not seen
+yet, oldest first, so nothing is re-read or re-written.  `provider` is anything with refinitiv.data's
+get_history(universe=, fields=, start=, end=, interval=) – the rd module
+itself, or a fake returning DataFrames when Refinitiv is out of reach.
+"""
+import datetime
+import glob
+import json
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# first date fetched for a RIC with no state and no previous file
+HISTORY_START = datetime.datetime(2020, 1, 1)
+
+# largest date range asked for in one get_history call, per interval
+CHUNK = {
+    "1min": datetime.timedelta(days=7),
+    "hourly": datetime.timedelta(days=90),
+    "daily": datetime.timedelta(days=5 * 365),
+}
+WORKERS = int(os.getenv("EIKON_FETCH_WORKERS", "4"))
+RETRIES = 4
+BACKOFF_SECONDS = 2.0
+
+STATE_FILE = ".eikon_state.json"
+
+# EIKON_JSON_COMPRESSION=gz (or zst) writes compressed files; the app reads
+# all three transparently
+COMPRESSION = os.getenv("EIKON_JSON_COMPRESSION", "").strip(".")
+JSON_EXT = f".json.{COMPRESSION}" if COMPRESSION else ".json"
+
+
+def date_chunks(start, end, span):
+    """Consecutive (start, end) ranges of at most `span` covering [start, end)."""
+    while start < end:
+        stop = min(start + span, end)
+        yield start, stop
+        start = stop
+
+
+def with_backoff(call, retries=RETRIES, base=BACKOFF_SECONDS, sleep=time.sleep):
+    """call(), retried with jittered exponential backoff; the last error is raised."""
+    for attempt in range(retries + 1):
+        try:
+            return call()
+        except Exception as e:
+            if attempt == retries:
+                raise
+            delay = base * 2 ** attempt * random.uniform(0.5, 1.5)
+            print(f"get_history failed ({e}), retrying in {delay:.1f}s")
+            sleep(delay)
+
+
+def _fetch_one(provider, ric, fields, start, end, interval):
+    df = provider.get_history(universe=[ric], fields=fields, start=start, end=end, interval=interval)
+    if df is None or df.empty:
+        return None
+    if not isinstance(df.columns, pd.MultiIndex):
+        df.columns = pd.MultiIndex.from_product([[ric], df.columns])
+    return df
+
+
+def fetch_history(provider, rics, fields, interval, starts, end,
+                  workers=WORKERS, sleep=time.sleep):
+    """
+    History of `rics` from starts[ric] to `end`, one get_history call per
+    (RIC, date chunk) with at most `workers` in flight.  Returns the frame
+    a single multi-RIC get_history would: a "Timestamp" index and (RIC,
+    field) columns in the order given (all NaN for a RIC with nothing new),
+    or an empty frame when nothing was returned.
+    """
+    span = CHUNK[interval]
+    jobs = [(ric, a, b) for ric in rics for a, b in date_chunks(starts[ric], end, span)]
+
+    def run(job):
+        ric, a, b = job
+        return with_backoff(lambda: _fetch_one(provider, ric, fields, a, b, interval), sleep=sleep)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(run, jobs))
+
+    per_ric = {}
+    for (ric, _, _), part in zip(jobs, parts):
+        if part is not None:
+            per_ric.setdefault(ric, []).append(part)
+    if not per_ric:
+        return pd.DataFrame()
+    frames = []
+    for ric in rics:
+        if ric in per_ric:
+            df = pd.concat(per_ric[ric])
+            frames.append(df[~df.index.duplicated(keep="last")])      # chunk edges overlap
+    df = pd.concat(frames, axis=1).sort_index()
+    df.index = pd.to_datetime(df.index)
+    df.index.name = "Timestamp"
+    return df.reindex(columns=pd.MultiIndex.from_product([rics, fields]))
+
+
+def write_json(df, path, compression=None):
+    """to_json into a temp name then rename, so the app never sees a partial file."""
+    compression = COMPRESSION if compression is None else compression
+    tmp = path + ".tmp"
+    codec = {"gz": "gzip", "zst": "zstd"}.get(compression, compression or None)
+    df.to_json(tmp, orient="records", date_format="iso", compression=codec)
+    os.replace(tmp, path)
+
+
+# ----------------------------------------------------------------------
+# resume points
+# ----------------------------------------------------------------------
+def load_state(data_dir):
+    """RIC -> last timestamp fetched."""
+    try:
+        with open(os.path.join(data_dir, STATE_FILE)) as fh:
+            return {ric: pd.Timestamp(ts) for ric, ts in json.load(fh).items()}
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(data_dir, df):
+    """Advance each RIC of `df` to the last row it has a value in (other RICs are kept)."""
+    state = load_state(data_dir)
+    for ric in df.columns.get_level_values(0).unique():
+        rows = df[ric].dropna(how="all")
+        if not rows.empty:
+            state[ric] = rows.index.max()
+    fd, tmp = tempfile.mkstemp(dir=data_dir, prefix=".tmp-")
+    with os.fdopen(fd, "w") as fh:
+        json.dump({ric: ts.isoformat() for ric, ts in state.items()}, fh, indent=1)
+    os.replace(tmp, os.path.join(data_dir, STATE_FILE))
+
+
+def latest_file(data_dir, prefix):
+    """Newest `prefix`_YYYY-MM-DD_HHMM.json[.gz|.zst] of data_dir, or None."""
+    files = sorted(
+        f for f in glob.glob(os.path.join(data_dir, f"{prefix}_*.json*"))
+        if not f.endswith(".tmp")
+    )
+    return files[-1] if files else None
+
+
+def resume_points(state, rics, previous, key="Timestamp"):
+    """
+    Where each RIC resumes: its state entry, else the last row of the
+    previous file, else HISTORY_START.  The last bar is fetched again, so
+    a bar still forming on the previous run gets its final value.
+    """
+    fallback = HISTORY_START
+    if previous is not None and any(ric not in state for ric in rics):
+        old = pd.read_json(previous, orient="records", convert_dates=False, dtype=False)
+        if not old.empty:
+            fallback = pd.to_datetime(old[key], format="ISO8601").max().to_pydatetime()
+    return {ric: state[ric].to_pydatetime() if ric in state else fallback for ric in rics}
@@ -4,20 +4,14 @@ import json
 import eikon as ek
 import pandas as pd
 import refinitiv.data as rd
-
-# Set Eikon app key and port number
-ek.set_app_key("20af0572a6364fe8abf9a35cdd16bd367057564a")
-ek.set_port_number(9000)  # Default proxy port for Eikon Desktop
-
-# Open session
-rd.open_session()
+from history import (JSON_EXT, fetch_history, latest_file, load_state, resume_points,
+                     save_state, write_json)
 
 # Define RICs for Midmarket rates and Yields
 rics = ['EUR02H=', 'TND02H=']
 yield_rics = ['USD1MD=', 'USD3MD=', 'USD6MD=', 'EUR1MD=', 'EUR3MD=', 'EUR6MD=', 'TNDOND=']
 
-# Set start and end dates
-start_date = datetime.datetime(2020, 1, 1)
+# Each RIC resumes where the previous run stopped (see history.py)
 end_date = datetime.datetime.today()
 
 # Create the "data" folder if it doesn't exist
@@ -28,20 +22,20 @@ if not os.path.exists(data_dir):
 # Get a timestamp string with date and time (e.g., "2025-02-18_0930")
 timestamp_str = datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
 
-try:
+def main(provider=rd):
+    """Fetch the new midmarket and yield bars and write them to new files."""
+    state = load_state(data_dir)
+
     ###### Fetch and Process Midmarket Rates ######
-    df = rd.get_history(
-        universe=rics,
-        fields=['BID', 'ASK'],
-        start=start_date,
-        end=end_date,
-        interval='hourly'
-    )
+    previous = latest_file(data_dir, "midmarket_rates")
+    df = fetch_history(provider, rics, ['BID', 'ASK'], 'hourly',
+                       resume_points(state, rics, previous), end_date)
 
     if df.empty:
-        print("No data available for Midmarket rates.")
+        print("No new Midmarket rates since the previous run.")
     else:
         print("Midmarket rates data retrieved successfully.")
+        raw = df
         df = df.reset_index()
         df.columns = ['Timestamp', 'Bid_EUR02H', 'Ask_EUR02H', 'Bid_TND02H', 'Ask_TND02H']
         df['Mid_EUR02H'] = (df['Bid_EUR02H'] + df['Ask_EUR02H']) / 2
@@ -50,22 +44,18 @@ try:
         df['spotEUR'] = df['Mid_TND02H'] * df['Mid_EUR02H']
         df = df.infer_objects()
 
-        # Save to JSON with timestamp in the filename
-        result_json = df[['Timestamp', 'spotUSD', 'spotEUR']].to_json(orient="records", date_format="iso")
-        mid_filename = os.path.join(data_dir, f"midmarket_rates_{timestamp_str}.json")
-        with open(mid_filename, "w") as f:
-            f.write(result_json)
+        # Save the new rows to JSON with timestamp in the filename
+        mid_filename = os.path.join(data_dir, f"midmarket_rates_{timestamp_str}{JSON_EXT}")
+        write_json(df[['Timestamp', 'spotUSD', 'spotEUR']], mid_filename)
+        save_state(data_dir, raw)
         print(f"Midmarket rates saved to {mid_filename}.")
 
     ###### Fetch and Process Yield Data ######
-     # fetch daily yields (no DATE field needed—you get the date as the index)
-    yield_df = rd.get_history(
-        universe=yield_rics,
-        fields=['BID', 'ASK'],
-        start=start_date,
-        end=end_date,
-        interval='daily'
-    )
+    # fetch daily yields (no DATE field needed—you get the date as the index)
+    previous = latest_file(data_dir, "daily_yield_rates")
+    yield_df = fetch_history(provider, yield_rics, ['BID', 'ASK'], 'daily',
+                             resume_points(state, yield_rics, previous), end_date)
+    raw = yield_df
 
     # name the index 'Timestamp' so reset_index() will give you exactly that column
     yield_df.index      = pd.to_datetime(yield_df.index)
@@ -73,7 +63,7 @@ try:
     yield_df = yield_df.reset_index()
 
     if yield_df.empty:
-        print("No data available for Yields.")
+        print("No new Yields since the previous run.")
     else:
         print("Yield data retrieved successfully.")
         yield_df = yield_df.reset_index()
@@ -118,18 +108,27 @@ try:
                     'Mid_EUR1M','Mid_EUR3M','Mid_EUR6M','Mid_TND']:
             daily_yield[col] = daily_yield[col] / 100
 
-        # Convert final DataFrame to JSON
-        daily_yield_json = daily_yield.to_json(orient="records", date_format="iso")
-        yield_filename = os.path.join(data_dir, f"daily_yield_rates_{timestamp_str}.json")
-        with open(yield_filename, "w") as f:
-            f.write(daily_yield_json)
+        # Convert the new days to JSON
+        yield_filename = os.path.join(data_dir, f"daily_yield_rates_{timestamp_str}{JSON_EXT}")
+        write_json(daily_yield, yield_filename)
+        save_state(data_dir, raw)
         print(f"Yield rates saved to {yield_filename}.")
 
-except Exception as e:
-    print(f"Error fetching data: {e}")
 
-# Close session
-rd.close_session()
+if __name__ == "__main__":
+    # Set Eikon app key and port number
+    ek.set_app_key("20af0572a6364fe8abf9a35cdd16bd367057564a")
+    ek.set_port_number(9000)  # Default proxy port for Eikon Desktop
+
+    # Open session
+    rd.open_session()
+    try:
+        main()
+    except Exception as e:
+        print(f"Error fetching data: {e}")
+
+    # Close session
+    rd.close_session()
 
 #===================================================================================
 # import eikon as ek
@@ -5,17 +5,12 @@ import eikon as ek
 import pandas as pd
 import refinitiv.data as rd
 import warnings
+from history import (JSON_EXT, fetch_history, latest_file, load_state, resume_points,
+                     save_state, write_json)
 
 # Suppress warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
-# Set Eikon app key and port number
-ek.set_app_key("20af0572a6364fe8abf9a35cdd16bd367057564a")
-ek.set_port_number(9000)  # Default proxy port for Eikon Desktop
-
-# Open a session (ensure Eikon or Workspace is running)
-rd.open_session()
-
 
 # 4) Define BCTX RICs
 bctx_rics = [
@@ -25,8 +20,7 @@ bctx_rics = [
     "JPYTNDX=BCTX"
 ]
 
-# 5) Date Range
-start_date = datetime.datetime(2020, 1, 1)
+# 5) Date Range: each RIC resumes where the previous run stopped (see history.py)
 end_date = datetime.datetime.today()
 
 # 6) Ensure data folder (mapped to /app/data in Docker)
@@ -38,34 +32,48 @@ if not os.path.exists(data_dir):
 # 7) Generate a timestamp
 timestamp_str = datetime.datetime.now().strftime("%Y-%m-%d_%H%M")
 
-try:
-    # 8) Fetch 1-min data
-    df = rd.get_history(
-        universe=bctx_rics,
-        fields=["BID", "ASK"],
-        start=start_date,
-        end=end_date,
-        interval="1min"
-    )
-
-    if df.empty:
-        print("No data available for BCTX in the specified range.")
-    else:
-        print("BCTX data retrieved successfully.")
-
-        # Flatten index
-        df = df.reset_index()
-
-        # 9) Build a filename like bctx_data_2024-10-30_1630.json
-        filename = f"bctx_data_{timestamp_str}.json"
-        full_path = os.path.join(data_dir, filename)
-
-        # 10) Write to JSON
-        df.to_json(full_path, orient="records", date_format="iso")
-        print(f"BCTX data saved to {full_path}")
-
-except Exception as e:
-    print(f"Error fetching BCTX data: {e}")
-
-# 11) Close session
-rd.close_session()
+# key of the timestamp in the file, as to_json names the flattened column
+TIMESTAMP_KEY = "('Timestamp', '')"
+
+
+def main(provider=rd):
+    """Fetch the new 1-min BCTX bars and write them to a new file."""
+    previous = latest_file(data_dir, "bctx_data")
+    starts = resume_points(load_state(data_dir), bctx_rics, previous, key=TIMESTAMP_KEY)
+
+    # 8) Fetch 1-min data, in parallel date chunks per RIC
+    raw = fetch_history(provider, bctx_rics, ["BID", "ASK"], "1min", starts, end_date)
+
+    if raw.empty:
+        print("No new BCTX data since the previous run.")
+        return
+    print("BCTX data retrieved successfully.")
+
+    # Flatten index; the columns get the names to_json gives tuples
+    df = raw.reset_index()
+    df.columns = [str(col) for col in df.columns]
+
+    # 9) Build a filename like bctx_data_2024-10-30_1630.json(.gz)
+    filename = f"bctx_data_{timestamp_str}{JSON_EXT}"
+    full_path = os.path.join(data_dir, filename)
+
+    # 10) Write to JSON, then remember where each RIC stopped
+    write_json(df, full_path)
+    save_state(data_dir, raw)
+    print(f"BCTX data saved to {full_path}")
+
+
+if __name__ == "__main__":
+    # Set Eikon app key and port number
+    ek.set_app_key("20af0572a6364fe8abf9a35cdd16bd367057564a")
+    ek.set_port_number(9000)  # Default proxy port for Eikon Desktop
+
+    # Open a session (ensure Eikon or Workspace is running)
+    rd.open_session()
+    try:
+        main()
+    except Exception as e:
+        print(f"Error fetching BCTX data: {e}")
+
+    # 11) Close session
+    rd.close_session()
@@ -11,7 +11,7 @@ from flask_jwt_extended import (
 )
 
 from models import db, User, Order, Invoice, InvoiceStatus
-from user.routes import calculate_benchmark, compute_bank_gains   # reuse your helper!
+from user.routes import compute_benchmarks, compute_bank_gains   # reuse your helper!
 from user.routes import bank_gains           # we’ll call it internally
 
 def get_invoice_transactions(client_id, year, month, currencies=("USD", "EUR")):
@@ -58,8 +58,8 @@ def build_invoice_rows(orders, netting_enabled=False):
                     o.commission_percent = 0.0
 
     rows = []
-    for o in orders:
-        bench = calculate_benchmark(o)
+    for o, bench in zip(orders, compute_benchmarks(orders)):
+        bench = float(bench)
         tx_type = o.transaction_type.lower()
         is_import = tx_type in ("import", "buy")
         if bench and o.execution_rate:
@@ -163,7 +163,7 @@ def list_clients():
 # helper – return list[dict] for frais variables using existing logic
 # ──────────────────────────────────────────────────────────────────────────────
 def _variable_fees(client: User, y: int, m: int) -> list[dict]:
-    return compute_bank_gains(client.id, currency="USD")
+    return compute_bank_gains(client.id, currency="USD", raw=True)
 
 
 
@@ -113,8 +113,10 @@ class Order(db.Model):
     is_option = db.Column(db.Boolean, default=False)
     trade_type = db.Column(db.String(10), nullable=False, default="spot")  #  "spot", "forward", or "option"
     benchmark_rate = db.Column(db.Float, nullable=True, default=None)  
-    gain = db.Column(db.Float, nullable=True, default=0)
-    gain_percentage = db.Column(db.Float, nullable=True, default=0)
+    gain = db.Column(db.Float, nullable=True, default=0)              # TND, vs benchmark
+    gain_percentage = db.Column(db.Float, nullable=True, default=0)   # in %
+    benchmark_dirty = db.Column(db.Boolean, nullable=False, default=True,
+                                server_default=db.true(), index=True)  # needs re-benchmark
     commission_percent = db.Column(db.Float)  
     commission_gain = db.Column(db.Float, nullable=True, default=0.0) 
     # Relationships
@@ -125,6 +127,33 @@ class Order(db.Model):
         CheckConstraint('amount >= 0', name='check_amount_positive'),
     )
 
+class ClientDailyStats(db.Model):
+    """Executed/matched orders of one client, currency and trade date, pre-aggregated for the dashboard."""
+    __tablename__ = 'client_daily_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    currency = db.Column(db.String(3), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    hedged_count = db.Column(db.Integer, nullable=False, default=0)   # forward + option
+    traded_fx = db.Column(db.Float, nullable=False, default=0.0)
+    traded_tnd = db.Column(db.Float, nullable=False, default=0.0)
+    hedged_fx = db.Column(db.Float, nullable=False, default=0.0)
+    hedged_tnd = db.Column(db.Float, nullable=False, default=0.0)
+    gain_fx = db.Column(db.Float, nullable=False, default=0.0)         # vs benchmark
+    gain_tnd = db.Column(db.Float, nullable=False, default=0.0)
+    hedged_gain_fx = db.Column(db.Float, nullable=False, default=0.0)
+    hedged_gain_tnd = db.Column(db.Float, nullable=False, default=0.0)
+    commission_tnd = db.Column(db.Float, nullable=False, default=0.0)
+    mtd_gain_tnd = db.Column(db.Float, nullable=False, default=0.0)    # gain_tnd with only "import" as a buy
+    buy_day = db.Column(db.Boolean, nullable=False, default=False)           # has import/buy orders
+    superformance_day = db.Column(db.Boolean, nullable=False, default=False)  # a buy beat interbank
+    unpriced_count = db.Column(db.Integer, nullable=False, default=0)         # orders with no benchmark
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'currency', 'day', name='uq_client_daily_stats'),
+    )
+
 class Meeting(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     company_name = db.Column(db.String(100), nullable=False)
@@ -150,6 +179,36 @@ class ExchangeData(db.Model):
     tnd_6m = db.Column(db.Float, nullable=False, name='6M TND')
     eur_6m = db.Column(db.Float, nullable=False, name='6M EUR')
     usd_6m = db.Column(db.Float, nullable=False, name='6M USD')
+    # daily OHLC of the hourly midmarket spot (Spot USD / Spot EUR are the close)
+    spot_usd_open = db.Column(db.Float, nullable=True, name='Spot USD Open')
+    spot_usd_high = db.Column(db.Float, nullable=True, name='Spot USD High')
+    spot_usd_low = db.Column(db.Float, nullable=True, name='Spot USD Low')
+    spot_eur_open = db.Column(db.Float, nullable=True, name='Spot EUR Open')
+    spot_eur_high = db.Column(db.Float, nullable=True, name='Spot EUR High')
+    spot_eur_low = db.Column(db.Float, nullable=True, name='Spot EUR Low')
+    __table_args__ = (
+        db.UniqueConstraint('Date', name='uq_exchange_data_date'),
+    )
+
+
+class ExchangeSpotHourly(db.Model):
+    """Hourly midmarket spot rates, as written by eikon/midmarket.py."""
+    __tablename__ = 'exchange_spot_hourly'
+    id = db.Column(db.Integer, primary_key=True)
+    timestamp = db.Column(db.DateTime, nullable=False, unique=True)
+    spot_usd = db.Column(db.Float, nullable=True)
+    spot_eur = db.Column(db.Float, nullable=True)
+
+
+class IngestionState(db.Model):
+    """Last file and record timestamp ingested per data/ feed (midmarket, yield, bctx)."""
+    __tablename__ = 'ingestion_state'
+    id = db.Column(db.Integer, primary_key=True)
+    feed = db.Column(db.String(20), nullable=False, unique=True)
+    file_name = db.Column(db.String(255), nullable=True)
+    file_hash = db.Column(db.String(64), nullable=True)        # sha256 of the file
+    last_timestamp = db.Column(db.DateTime, nullable=True)     # watermark
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class PremiumRate(db.Model):
@@ -180,6 +239,15 @@ class InterbankRate(db.Model):
     rate = db.Column(db.Float, nullable=False)
     __table_args__ = (db.UniqueConstraint('date', 'currency', name='uix_date_currency'),)
 
+class InterbankEmptyDay(db.Model):
+    """(date, currency) pairs the BCT archive returned no rate for – skipped by the backfill."""
+    __tablename__ = 'interbank_empty_day'
+    id = db.Column(db.Integer, primary_key=True)
+    date = db.Column(db.Date, nullable=False)
+    currency = db.Column(db.String(3), nullable=False)
+    checked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    __table_args__ = (db.UniqueConstraint('date', 'currency', name='uix_empty_date_currency'),)
+
 class InternalEmail(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=True)
@@ -212,9 +280,9 @@ class BctxFixing(db.Model):
         jpy_bid = db.Column(db.Float)
         jpy_ask = db.Column(db.Float)
 
-        # __table_args__ = (
-        #     db.UniqueConstraint('date', 'session', name='unique_date_session'),
-        # )
+        __table_args__ = (
+            db.UniqueConstraint('date', 'session', name='unique_date_session'),
+        )
         def __repr__(self):
             return f"<BctxFixing {self.date} {self.session} TND_BID={self.tnd_bid}>"
         
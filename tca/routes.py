@@ -6,7 +6,12 @@ from flask import request, jsonify
 from sqlalchemy import func
 from models import db, User,  Order, AuditLog, ExchangeData, OpenPosition, PremiumRate, InterbankRate, BctxFixing, TcaSpotInput
 from user.routes import calculate_forward_rate, get_interbank_rate_from_db, get_yield_period
+from user.services.market_data_store import market_data, FIELDS
+from user.services.interbank_index import interbank_index
+from user.services.bctx_ticks import CURRENCY_PREFIX, bctx_ticks, seconds
 from collections import defaultdict     
+import numpy as np
+import pandas as pd
 
 
 # helper ───────────────────────────────────────────────────────────
@@ -55,7 +60,7 @@ def get_interbank_rate(d, c):
     return get_interbank_rate_from_db(d, c)
 
 def compute_forward_rate_for_date(cur, hist, val):
-    row = ExchangeData.query.filter_by(date=hist).first()
+    row = market_data.get(hist)
     if not row:
         return 0.0
     days = (val - hist).days
@@ -123,6 +128,109 @@ def get_fixing_components(date, currency, session):
     return {"bid": bid, "ask": ask, "mid": mid}
 
 
+def get_fixing_components_many(days, currencies):
+    """
+    `get_fixing_components` of every (day, currency) pair, for both
+    sessions, from one bctx_fixings query over the date span.
+    Returns {session: {"bid": array, "ask": array, "mid": array}}.
+    """
+    cols = [f"{p}_{side}" for p in CURRENCY_PREFIX.values() for side in ('bid', 'ask')]
+    rows = []
+    if len(days):
+        rows = (db.session.query(BctxFixing.date, BctxFixing.session,
+                                 *[getattr(BctxFixing, c) for c in cols])
+                          .filter(BctxFixing.date.between(min(days), max(days)))
+                          .all())
+    fx = pd.DataFrame(rows, columns=['date', 'session', *cols]).drop_duplicates(['date', 'session'])
+    prefixes = np.array([CURRENCY_PREFIX.get(str(c).upper()) for c in currencies], dtype=object)
+
+    comps = {}
+    for session in ('morning', 'afternoon'):
+        at = fx[fx['session'] == session].set_index('date').reindex(list(days))
+        comps[session] = {}
+        for side in ('bid', 'ask'):
+            values = np.zeros(len(days))
+            for p in CURRENCY_PREFIX.values():
+                mask = prefixes == p
+                values[mask] = at[f"{p}_{side}"].to_numpy(dtype=float)[mask]
+            comps[session][side] = np.nan_to_num(values, nan=0.0)
+
+    # fallback → morning, for the afternoon side(s) missing
+    am, pm = comps['morning'], comps['afternoon']
+    pm['bid'] = np.where(pm['bid'] == 0, am['bid'], pm['bid'])
+    pm['ask'] = np.where(pm['ask'] == 0, am['ask'], pm['ask'])
+    for comp in comps.values():
+        both = (comp['bid'] != 0) & (comp['ask'] != 0)
+        comp['mid'] = np.where(both, (comp['bid'] + comp['ask']) / 2, 0.0)
+    return comps
+
+
+def _spread_pct(imp, ex, ref):
+    """
+    Spread in % of the reference for imports, of the execution rate for
+    exports – per row, 0 (int) where that base is 0.
+    """
+    num = np.where(imp, ex - ref, ref - ex)
+    base = np.where(imp, ref, ex)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pct = num / base * 100
+    return [v if b else 0 for v, b in zip(pct.tolist(), base.tolist())]
+
+
+# ── intraday benchmarks (BCTX tick store) ──────────────────────────
+def _parse_window(value):
+    """"09:00-11:30" -> (32400, 41400) seconds since midnight; None when absent."""
+    if not value:
+        return None
+    start, end = (seconds(part.strip()) for part in value.split('-', 1))
+    if end <= start:
+        raise ValueError(value)
+    return start, end
+
+
+def _or_none(values):
+    """Array / list -> JSON list, None where NaN (no ticks)."""
+    if isinstance(values, np.ndarray):
+        values = values.tolist()
+    return [None if v != v else v for v in values]
+
+
+def _quote_columns(name, quotes, imp, ex, amt):
+    """
+    {name}_bid/ask/mid and each deal's P&L / spread against the side it
+    trades (ask for imports, bid for exports), e.g. twap_bid_window.
+    """
+    kind, suffix = name.split('_', 1)
+    ref = np.where(imp, quotes['ask'], quotes['bid'])
+    return {
+        **{f"{kind}_{side}_{suffix}": _or_none(quotes[side]) for side in ('bid', 'ask', 'mid')},
+        f"pnl_{name}_tnd"    : _or_none(np.where(imp, (ex - ref) * amt, (ref - ex) * amt)),
+        f"spread_{name}_pct" : _or_none(_spread_pct(imp, ex, ref)),
+    }
+
+
+def _twap_columns(days, ccys, imp, ex, amt, window):
+    """TWAP bid/ask/mid over the window and each deal's P&L / spread against it."""
+    twap = {side: bctx_ticks.twap_many(days, ccys, *window, side=side) for side in ('bid', 'ask', 'mid')}
+    return _quote_columns("twap_window", twap, imp, ex, amt)
+
+
+def _nearest_columns(days, ccys, imp, ex, amt, at):
+    """Tick bid/ask/mid closest to the trade time and each deal's P&L / spread against it."""
+    tick = {side: bctx_ticks.nearest_many(days, ccys, at, side=side) for side in ('bid', 'ask', 'mid')}
+    return _quote_columns("nearest_at", tick, imp, ex, amt)
+
+
+def _range_columns(days, ccys):
+    """Session high / low of the mid quote."""
+    out = {}
+    for session in ('morning', 'afternoon'):
+        high, low = bctx_ticks.high_low_many(days, ccys, session=session)
+        out[f"high_{session}"] = _or_none(high)
+        out[f"low_{session}"] = _or_none(low)
+    return out
+
+
 @tca_bp.route('/spot', methods=['GET'])
 @jwt_required()
 def tca_spot():
@@ -136,66 +244,71 @@ def tca_spot():
     inputs = q.all()
     result    = []
 
-    for inp in inputs:
-        ccy = inp.currency
-        comp_m = get_fixing_components(inp.transaction_date, ccy, 'morning')
-        comp_a = get_fixing_components(inp.transaction_date, ccy, 'afternoon')
-        irate  = get_interbank_rate(inp.transaction_date, ccy) or 0.0
-        ex     = inp.execution_rate
-        amt    = inp.amount
-
-        # --- Sélection bid / ask pour le calcul P&L ---
-        if inp.transaction_type == 'import':      
-            fix_m = comp_m['ask']
-            fix_a = comp_a['ask']
-        else:                                    
-            fix_m = comp_m['bid']
-            fix_a = comp_a['bid']
-
-        # --- P&L & spreads ----------------------------
-        if inp.transaction_type == 'import':
-            pnl_m = (ex - fix_m) * amt
-            pnl_a = (ex - fix_a) * amt
-            pnl_i = (ex - irate) * amt
-            pct_m = (ex - fix_m) / fix_m * 100 if fix_m else 0
-            pct_a = (ex - fix_a) / fix_a * 100 if fix_a else 0
-            pct_i = (ex - irate) / irate * 100 if irate else 0
-
-        else:
-            pnl_m = (fix_m - ex) * amt
-            pnl_a = (fix_a - ex) * amt
-            pnl_i = (irate - ex) * amt
-            pct_m = (fix_m - ex) / ex * 100 if ex else 0
-            pct_a = (fix_a - ex) / ex * 100 if ex else 0
-            pct_i = (irate - ex) / ex * 100 if ex else 0
-
+    # optional: ?window=09:00-11:00 (TWAP benchmark), ?at=10:15 (tick nearest
+    # the trade time) and ?ranges=1 (session high/low)
+    try:
+        window = _parse_window(request.args.get('window'))
+    except ValueError:
+        return jsonify({"error": "window must look like HH:MM-HH:MM"}), 400
+    try:
+        at = seconds(request.args['at']) if request.args.get('at') else None
+    except ValueError:
+        return jsonify({"error": "at must look like HH:MM"}), 400
+    with_ranges = request.args.get('ranges') == '1'
+
+    # fixings of the whole date span in one query, interbank rates from the as-of index
+    days = [inp.transaction_date for inp in inputs]
+    ccys = [inp.currency for inp in inputs]
+    comps = get_fixing_components_many(days, ccys)
+    irate = np.zeros(len(inputs))
+    if inputs:
+        irate = np.nan_to_num(interbank_index.asof_many(ccys, days)[0], nan=0.0)
+    ex  = np.array([inp.execution_rate for inp in inputs], dtype=float)
+    amt = np.array([inp.amount for inp in inputs], dtype=float)
+    imp = np.array([inp.transaction_type == 'import' for inp in inputs], dtype=bool)
+
+    # --- Sélection bid / ask pour le calcul P&L ---
+    fix_m = np.where(imp, comps['morning']['ask'], comps['morning']['bid'])
+    fix_a = np.where(imp, comps['afternoon']['ask'], comps['afternoon']['bid'])
+
+    # --- P&L & spreads ----------------------------
+    columns = {
+        # --- Fixings complets ------------------------------------------
+        "fix_bid_morning"      : comps['morning']['bid'].tolist(),
+        "fix_ask_morning"      : comps['morning']['ask'].tolist(),
+        "fix_mid_morning"      : comps['morning']['mid'].tolist(),
+        "fix_bid_afternoon"    : comps['afternoon']['bid'].tolist(),
+        "fix_ask_afternoon"    : comps['afternoon']['ask'].tolist(),
+        "fix_mid_afternoon"    : comps['afternoon']['mid'].tolist(),
+
+        # --- Interbank --------------------------------------------------
+        "interbank_rate"       : irate.tolist(),
+
+        # --- P&L & spreads (basés sur bid/ask) --------------------------
+        "pnl_fixing_morning_tnd"      : np.where(imp, (ex - fix_m) * amt, (fix_m - ex) * amt).tolist(),
+        "pnl_fixing_afternoon_tnd"    : np.where(imp, (ex - fix_a) * amt, (fix_a - ex) * amt).tolist(),
+        "pnl_interbank_tnd"           : np.where(imp, (ex - irate) * amt, (irate - ex) * amt).tolist(),
+        "spread_fixing_morning_pct"   : _spread_pct(imp, ex, fix_m),
+        "spread_fixing_afternoon_pct" : _spread_pct(imp, ex, fix_a),
+        "spread_interbank_pct"        : _spread_pct(imp, ex, irate),
+    }
+    if window:
+        columns.update(_twap_columns(days, ccys, imp, ex, amt, window))
+    if at is not None:
+        columns.update(_nearest_columns(days, ccys, imp, ex, amt, at))
+    if with_ranges:
+        columns.update(_range_columns(days, ccys))
+
+    for i, inp in enumerate(inputs):
         result.append({
             # --- Infos deal -------------------------------------------------
             "transaction_date" : inp.transaction_date.isoformat(),
             "value_date"       : inp.value_date.isoformat(),
-            "currency"         : ccy,
+            "currency"         : inp.currency,
             "transaction_type" : inp.transaction_type,
-            "amount"           : amt,
-            "execution_rate"   : ex,
-
-            # --- Fixings complets ------------------------------------------
-            "fix_bid_morning"      : comp_m['bid'],
-            "fix_ask_morning"      : comp_m['ask'],
-            "fix_mid_morning"      : comp_m['mid'],
-            "fix_bid_afternoon"    : comp_a['bid'],
-            "fix_ask_afternoon"    : comp_a['ask'],
-            "fix_mid_afternoon"    : comp_a['mid'],
-
-            # --- Interbank --------------------------------------------------
-            "interbank_rate"       : irate,
-
-            # --- P&L & spreads (basés sur bid/ask) --------------------------
-            "pnl_fixing_morning_tnd"      : pnl_m,
-            "pnl_fixing_afternoon_tnd"    : pnl_a,
-            "pnl_interbank_tnd"           : pnl_i,
-            "spread_fixing_morning_pct"   : pct_m,
-            "spread_fixing_afternoon_pct" : pct_a,
-            "spread_interbank_pct"        : pct_i,
+            "amount"           : inp.amount,
+            "execution_rate"   : inp.execution_rate,
+            **{name: values[i] for name, values in columns.items()},
         })
 
     return jsonify(result), 200
@@ -213,24 +326,27 @@ LOOKBACK = {
 }
 
 
-def get_non_zero_value(model, column, as_of, max_shift=4, **filters):
+def _yield_grid(ccys, targets, max_shift, maturities, column_for):
     """
-    Walk backwards day‑by‑day from `as_of` (inclusive) up to `max_shift` days
-    and return (value, effective_date) where value != 0.
-    Extra keyword arguments are passed to .filter_by() so you can constrain
-    on things like currency.
+    (values, effective days) of the ExchangeData yield column_for(ccy, tenor)
+    over the deals × maturities grid, from the in-memory look-back series:
+    the first non-zero value on the target day or up to max_shift days
+    before.  NaN / NaT where there is none or the column does not exist.
     """
-    d = as_of
-    for _ in range(max_shift + 1):
-        row = (db.session.query(model)
-                          .filter_by(date=d, **filters)
-                          .first())
-        if row:
-            v = getattr(row, column)
-            if v:                      
-                return v, d
-        d -= timedelta(days=1)
-    return None, None
+    values    = np.full(targets.shape, np.nan)
+    effective = np.full(targets.shape, np.datetime64("NaT", "D"))
+    tenors = defaultdict(list)
+    for j, m in enumerate(maturities):
+        tenors[get_yield_period(m)].append(j)
+    for ccy in set(ccys):
+        rows = np.flatnonzero(ccys == ccy)
+        for tenor, cols in tenors.items():
+            field = column_for(ccy, tenor)
+            if field not in FIELDS:
+                continue
+            cell = np.ix_(rows, cols)
+            values[cell], effective[cell] = market_data.lookback(field).asof(targets[cell], max_shift[cols])
+    return values, effective
 
 
 @tca_bp.route('/spot-forward', methods=['GET'])
@@ -249,10 +365,44 @@ def tca_spot_forward():
         q = q.filter(func.upper(TcaSpotInput.currency) == ccy_filter.upper())
 
     inputs      = q.all()
-    MATURITIES  = [30, 90, 180, 270, 360]      
+    MATURITIES  = [30, 90, 180, 270, 360]
+    if not inputs:
+        return jsonify([]), 200
+
+    # deals × maturities grid of target days, each column with its own look-back
+    mats      = np.array(MATURITIES)
+    max_shift = np.array([LOOKBACK[m] for m in MATURITIES])
+    tx        = np.array([inp.transaction_date for inp in inputs], dtype="datetime64[D]")
+    targets   = tx[:, None] - mats.astype("timedelta64[D]")
+    ccys      = np.array([inp.currency.upper() for inp in inputs], dtype=object)
+
+    spot   = np.full(targets.shape, np.nan)
+    d_spot = np.full(targets.shape, np.datetime64("NaT", "D"))
+    for j in range(len(MATURITIES)):
+        spot[:, j], d_spot[:, j] = interbank_index.asof_many(ccys, targets[:, j], int(max_shift[j]))
+
+    y_for, d_for = _yield_grid(ccys, targets, max_shift, MATURITIES, lambda ccy, tenor: f"{ccy.lower()}_{tenor}")
+    y_dom, d_dom = _yield_grid(ccys, targets, max_shift, MATURITIES, lambda ccy, tenor: f"tnd_{tenor}")
+
+    ok  = np.isfinite(spot) & np.isfinite(y_for) & np.isfinite(y_dom)
+    ex  = np.array([inp.execution_rate for inp in inputs], dtype=float)[:, None]
+    amt = np.array([inp.amount for inp in inputs], dtype=float)[:, None]
+    buy = np.array([inp.transaction_type.lower() in ("import", "buy") for inp in inputs])[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        fwd     = calculate_forward_rate(spot, y_for, y_dom + 0.0025, mats)
+        pnl_tnd = np.where(buy, (ex - fwd) * amt, (fwd - ex) * amt)
+        pnl_pct = np.where(buy, ex / fwd - 1, fwd / ex - 1)
+    assoc = np.maximum(np.maximum(d_spot, d_for), d_dom)
+
+    def cells(values):
+        return np.where(ok, values, None).tolist()
+
+    spot_out = np.where(np.isfinite(spot), spot, None).tolist()
+    fwd, pnl_tnd, pnl_pct = cells(fwd), cells(pnl_tnd), cells(pnl_pct)
+    assoc = np.where(ok, np.datetime_as_string(assoc).astype(object), None).tolist()
 
     deals = []
-    for inp in inputs:
+    for i, inp in enumerate(inputs):
         base = {
             "transaction_date": inp.transaction_date.isoformat(),
             "value_date"      : inp.value_date.isoformat(),
@@ -261,52 +411,14 @@ def tca_spot_forward():
             "amount"          : inp.amount,
             "execution_rate"  : inp.execution_rate,
         }
-
-        ccy    = inp.currency.upper()
-        hedges = []
-
-        for Δj in MATURITIES:
-            target_day = inp.transaction_date - timedelta(days=Δj)
-            max_shift  = LOOKBACK[Δj]                    
-   
-            spot, d_spot = get_non_zero_value(
-                InterbankRate, "rate", target_day, max_shift, currency=ccy
-            )
-
-            tenor      = get_yield_period(Δj)             
-            y_for_col  = f"{ccy.lower()}_{tenor}"
-            y_dom_col  = f"tnd_{tenor}"
-
-            y_for, d_for = get_non_zero_value(
-                ExchangeData, y_for_col, target_day, max_shift
-            )
-            y_dom, d_dom = get_non_zero_value(
-                ExchangeData, y_dom_col, target_day, max_shift
-            )
-
-            if spot is not None and y_for is not None and y_dom is not None:
-                y_dom += 0.0025
-                fwd = calculate_forward_rate(spot, y_for, y_dom, Δj)
-
-                if inp.transaction_type.lower() in ("import", "buy"):
-                    pnl_tnd = (inp.execution_rate - fwd) * inp.amount
-                    pnl_pct = inp.execution_rate / fwd - 1
-                else:
-                    pnl_tnd = (fwd - inp.execution_rate) * inp.amount
-                    pnl_pct = fwd / inp.execution_rate - 1
-
-                assoc_date = max(d_spot, d_for, d_dom)
-            else:
-                fwd = pnl_tnd = pnl_pct = assoc_date = None
-
-            hedges.append({
-                "maturity_days"  : Δj,
-                "associated_date": assoc_date.isoformat() if assoc_date else None,
-                "associated_spot": spot,
-                "forward_rate"   : fwd,
-                "pnl_tnd"        : pnl_tnd,
-                "pnl_pct"        : pnl_pct,
-            })
+        hedges = [{
+            "maturity_days"  : m,
+            "associated_date": assoc[i][j],
+            "associated_spot": spot_out[i][j],
+            "forward_rate"   : fwd[i][j],
+            "pnl_tnd"        : pnl_tnd[i][j],
+            "pnl_pct"        : pnl_pct[i][j],
+        } for j, m in enumerate(MATURITIES)]
 
         # -------- summary -------------------------------------------------
         pnl_vals = [h["pnl_tnd"] for h in hedges if h["pnl_tnd"] is not None]
@@ -344,7 +456,17 @@ def tca_spot_option():
 
     maturity_totals = defaultdict(float)  
 
-    for inp in inputs:
+    # yields for the whole deals × maturities grid, as /spot-forward reads them
+    max_shift = np.array([LOOKBACK.get(m, LOOKBACK_DEFAULT) for m in MATURITIES])
+    tx        = np.array([inp.transaction_date for inp in inputs], dtype="datetime64[D]")
+    targets   = tx[:, None] - np.array(MATURITIES).astype("timedelta64[D]")
+    ccys      = np.array([inp.currency.upper() for inp in inputs], dtype=object)
+    y_for_grid, _ = _yield_grid(ccys, targets, max_shift, MATURITIES, lambda ccy, tenor: f"{ccy.lower()}_{tenor}")
+    y_dom_grid, _ = _yield_grid(ccys, targets, max_shift, MATURITIES, lambda ccy, tenor: f"tnd_{tenor}")
+    y_for_grid = np.where(np.isfinite(y_for_grid), y_for_grid, None).tolist()
+    y_dom_grid = np.where(np.isfinite(y_dom_grid), y_dom_grid, None).tolist()
+
+    for i, inp in enumerate(inputs):
         base = {
             
             "transaction_date": inp.transaction_date.isoformat(),
@@ -358,24 +480,14 @@ def tca_spot_option():
         ccy    = inp.currency.upper()
         hedges = []
 
-        for Δj in MATURITIES:
+        for j, Δj in enumerate(MATURITIES):
             target_day = inp.transaction_date - timedelta(days=Δj)
 
             # ---- pull market data (spot & yields) -------------------------
-            spot, d_spot = get_non_zero_value(
-                InterbankRate, "rate", target_day,
-                max_shift=LOOKBACK.get(Δj, LOOKBACK_DEFAULT),
-                currency=ccy
-            )
-            tenor = get_yield_period(Δj)               # '1m' | '3m' | '6m'
-            y_for, _ = get_non_zero_value(
-                ExchangeData, f"{ccy.lower()}_{tenor}", target_day,
-                max_shift=LOOKBACK.get(Δj, LOOKBACK_DEFAULT)
-            )
-            y_dom, _ = get_non_zero_value(
-                ExchangeData, f"tnd_{tenor}", target_day,
-                max_shift=LOOKBACK.get(Δj, LOOKBACK_DEFAULT)
+            spot, d_spot = interbank_index.asof(
+                target_day, ccy, max_shift=LOOKBACK.get(Δj, LOOKBACK_DEFAULT)
             )
+            y_for, y_dom = y_for_grid[i][j], y_dom_grid[i][j]
 
             # ---- forward rate --------------------------------------------
             fwd = (
@@ -0,0 +1,25 @@
+import pytest
+from flask import Flask
+
+from models import db
+from user.services.interbank_index import interbank_index
+from user.services.market_data_store import market_data
+
+
+@pytest.fixture
+def app():
+    """Flask app on an in-memory sqlite database, inside an app context."""
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI="sqlite://", JWT_SECRET_KEY="test-secret-key-of-at-least-32-bytes", TESTING=True)
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+def reload_market_data():
+    """Re-read exchange_data and interbank_rate into the in-memory stores."""
+    market_data.refresh()
+    interbank_index.refresh()
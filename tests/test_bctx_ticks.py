@@ -0,0 +1,62 @@
+"""
+The batched tick benchmarks used by /tca/spot match the per-deal ones.
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+
+from user.services.bctx_ticks import TickStore
+
+D1, D2, EMPTY = date(2025, 3, 13), date(2025, 3, 14), date(2025, 3, 15)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TickStore(str(tmp_path))
+    rng = np.random.default_rng(7)
+    for day in (D1, D2):
+        t = np.sort(rng.choice(np.arange(8 * 3600, 17 * 3600), 400, replace=False))
+        bid = 3.1 + rng.normal(0, 0.002, len(t)).cumsum()
+        store.put(day, t, {"tnd_bid": bid, "tnd_ask": bid + 0.004,
+                           "eur_bid": bid + 0.25, "eur_ask": bid + 0.255})
+    return store
+
+
+def test_twap_many_matches_twap(store):
+    days = [D1, D2, D1, EMPTY, D2, D1]
+    ccys = ["USD", "USD", "EUR", "USD", "GBP", "USD"]
+    for side in ("bid", "ask", "mid"):
+        batch = store.twap_many(days, ccys, "09:00", "11:30", side=side)
+        single = [store.twap(d, c, "09:00", "11:30", side=side) for d, c in zip(days, ccys)]
+        np.testing.assert_allclose(batch, [np.nan if v is None else v for v in single])
+    assert np.isnan(batch[3]) and np.isnan(batch[4])
+
+
+def test_high_low_many_matches_high_low(store):
+    days = [D2, D1, EMPTY, D2]
+    ccys = ["EUR", "USD", "EUR", "EUR"]
+    for session in ("morning", "afternoon"):
+        highs, lows = store.high_low_many(days, ccys, session=session)
+        single = [store.high_low(d, c, session=session) for d, c in zip(days, ccys)]
+        np.testing.assert_allclose(highs, [np.nan if h is None else h for h, _ in single])
+        np.testing.assert_allclose(lows, [np.nan if l is None else l for _, l in single])
+    highs, lows = store.high_low_many([], [])
+    assert highs.shape == lows.shape == (0,)
+
+
+def test_nearest_many_picks_the_closest_tick(tmp_path):
+    store = TickStore(str(tmp_path))
+    # USD bid ticks at 09:00, 09:10 and 09:30
+    store.put(D1, [32400, 33000, 34200], {"tnd_bid": [3.0, 3.1, 3.2], "tnd_ask": [3.01, 3.11, 3.21]})
+    times = ["08:00", "09:04", "09:05", "09:06", "09:25", "10:00"]
+    got = store.nearest_many([D1] * 6, ["USD"] * 6, times, side="bid")
+    # 09:05 is 5 min from both 09:00 and 09:10: the earlier tick wins
+    np.testing.assert_allclose(got, [3.0, 3.0, 3.0, 3.1, 3.2, 3.2], rtol=1e-6)
+    assert [store.nearest(D1, "USD", t, side="bid") for t in times] == pytest.approx(got.tolist())
+
+    # one time for every deal, days without ticks give NaN
+    got = store.nearest_many([D1, EMPTY, D1], ["USD", "USD", "GBP"], "09:07")
+    assert got[0] == pytest.approx(3.105, rel=1e-6)
+    assert np.isnan(got[1]) and np.isnan(got[2])
+    assert store.nearest(EMPTY, "USD", "09:07") is None
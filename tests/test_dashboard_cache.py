@@ -0,0 +1,43 @@
+from user.services.dashboard_cache import DashboardCache
+
+
+def test_value_is_cached_until_invalidated():
+    cache = DashboardCache(ttl=60)
+    calls = []
+    compute = lambda: calls.append(1) or len(calls)
+
+    assert cache.get_or_compute(7, "usd", "summary", compute) == 1
+    assert cache.get_or_compute(7, "USD", "summary", compute) == 1
+    cache.invalidate_user(7)
+    assert cache.get_or_compute(7, "USD", "summary", compute) == 2
+
+
+def test_compute_racing_an_invalidation_is_not_stored():
+    cache = DashboardCache(ttl=60)
+
+    def stale():
+        cache.invalidate_user(7)            # an order write lands mid-compute
+        return "before the write"
+
+    assert cache.get_or_compute(7, "USD", "summary", stale) == "before the write"
+    assert cache.get_or_compute(7, "USD", "summary", lambda: "after the write") == "after the write"
+    assert cache.get_or_compute(7, "USD", "summary", lambda: "recomputed") == "after the write"
+
+
+def test_other_clients_and_clear():
+    cache = DashboardCache(ttl=60)
+
+    def other_client_write():
+        cache.invalidate_user(8)
+        return "kept"
+
+    assert cache.get_or_compute(7, "USD", "summary", other_client_write) == "kept"
+    assert cache.get_or_compute(7, "USD", "summary", lambda: "new") == "kept"
+
+    def cleared():
+        cache.clear()
+        return "dropped"
+
+    cache.invalidate_user(7)
+    cache.get_or_compute(7, "USD", "summary", cleared)
+    assert cache.get_or_compute(7, "USD", "summary", lambda: "fresh") == "fresh"
@@ -0,0 +1,184 @@
+"""
+/api/dashboard/summary: the vectorised daily-aggregate path must give the
+same KPIs as the per-order loop it replaced.
+"""
+import calendar
+import random
+from collections import defaultdict
+from datetime import date, timedelta
+
+import pytest
+
+from models import db, ExchangeData, InterbankRate, Order, User
+from tests.conftest import reload_market_data
+from user.routes import calculate_superformance_rate, is_hedged
+from user.services.benchmark_service import compute_benchmarks
+from user.services.dashboard_service import (
+    aggregate_daily, enrich_orders, load_client_orders, summarize_daily,
+)
+
+TODAY = date(2025, 6, 15)
+
+
+def legacy_summary(orders, currency, today):
+    """The former dashboard_summary body, one Python pass per KPI."""
+    total_traded = sum(o.original_amount for o in orders)
+    total_traded_tnd = sum(o.original_amount * o.execution_rate for o in orders if o.execution_rate)
+    total_covered = sum(o.original_amount for o in orders if is_hedged(o))
+    coverage_percent = (total_covered / total_traded * 100) if total_traded else 0
+    in_month = lambda o: o.transaction_date.year == today.year and o.transaction_date.month == today.month
+
+    priced = [o for o in orders if o.execution_rate]
+    bench_by_id = dict(zip((o.id for o in priced), compute_benchmarks(priced)))
+
+    economies_totales = economies_totales_tnd = 0.0
+    economies_totales_couv = economies_totales_couv_tnd = 0.0
+    total_commissions_tnd = 0.0
+    for o in orders:
+        if o.execution_rate is None:
+            continue
+        bench = bench_by_id[o.id]
+        if o.transaction_type.lower() in ("import", "buy"):
+            gain_pct = (bench - o.execution_rate) / o.execution_rate
+        else:
+            gain_pct = (o.execution_rate - bench) / bench
+        gain_fx = gain_pct * o.original_amount
+        gain_tnd = gain_fx * o.execution_rate
+        economies_totales += gain_fx
+        economies_totales_tnd += gain_tnd
+        if is_hedged(o):
+            economies_totales_couv += gain_fx
+            economies_totales_couv_tnd += gain_tnd
+        total_commissions_tnd += o.execution_rate * o.original_amount * (o.commission_percent or 0.0)
+    net_gain_tnd = economies_totales_tnd - total_commissions_tnd
+
+    monthly = defaultdict(lambda: {"transacted": 0.0, "gain": 0.0})
+    for o in orders:
+        key = f"{calendar.month_name[o.transaction_date.month]} {o.transaction_date.year}"
+        monthly[key]["transacted"] += o.original_amount * (o.execution_rate or 0)
+        if o.execution_rate:
+            bench = bench_by_id[o.id]
+            if o.transaction_type.lower() in ("import", "buy"):
+                pct = (bench - o.execution_rate) / o.execution_rate
+            else:
+                pct = (o.execution_rate - bench) / bench
+            monthly[key]["gain"] += pct * o.original_amount * o.execution_rate
+
+    economies_totales_tnd_mtd = 0.0
+    for o in orders:
+        if in_month(o) and o.execution_rate:
+            bench = bench_by_id[o.id]
+            if o.transaction_type.lower() == "import":
+                pct = (bench - o.execution_rate) / o.execution_rate
+            else:
+                pct = (o.execution_rate - bench) / bench
+            economies_totales_tnd_mtd += pct * o.original_amount * o.execution_rate
+    total_commissions_tnd_mtd = sum(
+        o.execution_rate * o.original_amount * (o.commission_percent or 0.0)
+        for o in orders if o.execution_rate and in_month(o)
+    )
+    net_gain_tnd_mtd = economies_totales_tnd_mtd - total_commissions_tnd_mtd
+
+    return {
+        "currency": currency,
+        "total_traded_fx": total_traded,
+        "total_traded_tnd": total_traded_tnd,
+        "total_traded_mtd_fx": sum(o.original_amount for o in orders if in_month(o)),
+        "total_traded_mtd_tnd": sum(o.original_amount * o.execution_rate
+                                    for o in orders if o.execution_rate and in_month(o)),
+        "coverage_percent": coverage_percent,
+        "economies_totales_fx": economies_totales,
+        "economies_totales_tnd": economies_totales_tnd,
+        "economies_totales_couverture_fx": economies_totales_couv,
+        "economies_totales_couverture_tnd": economies_totales_couv_tnd,
+        "total_commissions_tnd": total_commissions_tnd,
+        "net_gain_tnd": net_gain_tnd,
+        "roi_percent": (net_gain_tnd / total_commissions_tnd * 100) if total_commissions_tnd else None,
+        "superformance_rate": calculate_superformance_rate(orders),
+        "months": list(monthly.keys()),
+        "monthlyTotalTransacted": [v["transacted"] for v in monthly.values()],
+        "monthlyTotalGain": [v["gain"] for v in monthly.values()],
+        "total_commissions_tnd_mtd": total_commissions_tnd_mtd,
+        "net_gain_tnd_mtd": net_gain_tnd_mtd,
+        "roi_percent_mtd": (net_gain_tnd_mtd / total_commissions_tnd_mtd * 100)
+                           if total_commissions_tnd_mtd else None,
+        "has_forward_or_option": any(is_hedged(o) for o in orders),
+        "total_covered_mtd_fx": sum(o.original_amount for o in orders if is_hedged(o) and in_month(o)),
+        "total_covered_mtd_tnd": sum(o.original_amount * o.execution_rate for o in orders
+                                     if is_hedged(o) and in_month(o) and o.execution_rate),
+    }
+
+
+@pytest.fixture
+def clients(app):
+    """Two clients: one with 200 mixed USD orders over H1 2025, one with none."""
+    rnd = random.Random(3)
+    trader = User(email="trader@example.com", password="x", client_name="Trader")
+    idle = User(email="idle@example.com", password="x", client_name="Idle")
+    db.session.add_all([trader, idle])
+    db.session.commit()
+
+    days = []
+    d = date(2025, 1, 1)
+    while d <= TODAY:
+        if d.weekday() < 5:
+            db.session.add(InterbankRate(date=d, currency="USD", rate=3 + rnd.random() * 0.1))
+            db.session.add(ExchangeData(date=d, spot_usd=3.0, spot_eur=3.3,
+                                        tnd_1m=.08, eur_1m=.03, usd_1m=.04,
+                                        tnd_3m=.081, eur_3m=.031, usd_3m=.041,
+                                        tnd_6m=.082, eur_6m=.032, usd_6m=.042))
+            days.append(d)
+        d += timedelta(days=1)
+    for tx in sorted(rnd.choice(days) for _ in range(200)):
+        db.session.add(Order(
+            user_id=trader.id, currency="USD", amount=1,
+            original_amount=rnd.randint(1, 10000),
+            transaction_type=rnd.choice(["buy", "sell", "import", "export"]),
+            trade_type=rnd.choice(["spot", "forward", "option"]),
+            transaction_date=tx, order_date=tx,
+            value_date=tx + timedelta(days=rnd.randint(3, 200)),
+            historical_loss=0.01,
+            interbank_rate=rnd.choice([None, 3.0, 3.05]),
+            execution_rate=rnd.choice([3.02, 3.06, 3.1]),
+            commission_percent=rnd.choice([None, 0.001, 0.002]),
+            status=rnd.choice(["Executed", "Matched", "Executed", "Pending"]),
+        ))
+    db.session.commit()
+    reload_market_data()
+    return trader.id, idle.id
+
+
+def _legacy_orders(user_id):
+    return (Order.query
+            .filter(Order.user_id == user_id, Order.currency == "USD",
+                    Order.status.in_(["Executed", "Matched"]))
+            .order_by(Order.transaction_date, Order.id)
+            .all())
+
+
+def _vectorised(user_id):
+    return summarize_daily(aggregate_daily(enrich_orders(load_client_orders(user_id, "USD"))),
+                           "USD", today=TODAY)
+
+
+def _assert_same(expected, actual):
+    assert list(actual) == list(expected)
+    for key, value in expected.items():
+        if isinstance(value, float) or isinstance(actual[key], float):
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+        elif isinstance(value, list) and value and isinstance(value[0], float):
+            assert actual[key] == pytest.approx(value, rel=1e-9, abs=1e-6), key
+        else:
+            assert actual[key] == value, key
+
+
+def test_summary_matches_legacy_loop(clients):
+    trader, _ = clients
+    orders = _legacy_orders(trader)
+    assert any(o.transaction_type == "buy" and o.transaction_date.month == TODAY.month for o in orders)
+    _assert_same(legacy_summary(orders, "USD", TODAY), _vectorised(trader))
+
+
+def test_summary_of_client_without_orders(clients):
+    _, idle = clients
+    _assert_same(legacy_summary([], "USD", TODAY), _vectorised(idle))
@@ -0,0 +1,78 @@
+"""
+Picking the data/ files still to ingest: each eikon/ run writes only its
+own rows, so every file after the last one ingested must be read, and
+the bar at the watermark is read again with its final value.
+"""
+import json
+from datetime import datetime
+
+from models import ExchangeData, ExchangeSpotHourly, IngestionState
+from user.services import data_ingest
+from user.services.data_ingest import ingest_exchange_data, pending_files
+from user.services.market_archive import MarketArchive
+from user.services.ingestion_state import file_sha256
+
+FILES = ["midmarket_rates_2025-01-01_0900.json",
+         "midmarket_rates_2025-01-02_0900.json",
+         "midmarket_rates_2025-01-03_0900.json"]
+
+
+def write_files(folder):
+    for i, name in enumerate(FILES):
+        (folder / name).write_text(f'[{{"Timestamp": "2025-01-0{i + 1}T08:00:00", "spotUSD": 3.1}}]')
+
+
+def test_pending_files_without_state(tmp_path):
+    write_files(tmp_path)
+    assert pending_files(str(tmp_path), FILES, None) == FILES
+    assert pending_files(str(tmp_path), FILES, IngestionState(feed="midmarket")) == FILES
+
+
+def test_pending_files_after_the_last_ingested(tmp_path):
+    write_files(tmp_path)
+    done = tmp_path / FILES[0]
+    state = IngestionState(feed="midmarket", file_name=FILES[0], file_hash=file_sha256(done))
+    assert pending_files(str(tmp_path), FILES, state) == FILES[1:]
+    assert pending_files(str(tmp_path), FILES, state, full=True) == FILES
+
+    # the last file ingested was rewritten since: read it again
+    done.write_text('[{"Timestamp": "2025-01-01T08:00:00", "spotUSD": 3.2}]')
+    assert pending_files(str(tmp_path), FILES, state) == FILES
+
+    state = IngestionState(feed="midmarket", file_name=FILES[-1], file_hash=file_sha256(tmp_path / FILES[-1]))
+    assert pending_files(str(tmp_path), FILES, state) == []
+
+
+def midmarket(folder, name, bars):
+    (folder / name).write_text(json.dumps(
+        [{"Timestamp": ts, "spotUSD": usd, "spotEUR": usd + 0.2} for ts, usd in bars]))
+
+
+def test_last_bar_gets_its_final_value(app, tmp_path, monkeypatch):
+    monkeypatch.setattr(data_ingest, "market_archive", MarketArchive(str(tmp_path / "archive")))
+    data = tmp_path / "data"
+    data.mkdir()
+    (data / "daily_yield_rates_2025-01-02_0900.json").write_text(json.dumps(
+        [{"Timestamp": "2025-01-02T00:00:00", "Mid_TND": 7.5, "Mid_USD1M": 4.3, "Mid_USD3M": 4.3,
+          "Mid_USD6M": 4.2, "Mid_EUR1M": 2.9, "Mid_EUR3M": 2.8, "Mid_EUR6M": 2.7}]))
+    # 09:00 was still forming when the first file was written
+    midmarket(data, "midmarket_rates_2025-01-02_0905.json",
+              [("2025-01-02T08:00:00", 3.10), ("2025-01-02T09:00:00", 3.11)])
+    assert ingest_exchange_data(str(data))[1] == 200
+
+    def spot(hour):
+        row = ExchangeSpotHourly.query.filter_by(timestamp=datetime(2025, 1, 2, hour)).one()
+        return row.spot_usd
+
+    # the next run fetches 09:00 again (resume_points) with its final value
+    midmarket(data, "midmarket_rates_2025-01-02_1005.json",
+              [("2025-01-02T09:00:00", 3.12), ("2025-01-02T10:00:00", 3.13)])
+    assert ingest_exchange_data(str(data))[1] == 200
+    assert [spot(h) for h in (8, 9, 10)] == [3.10, 3.12, 3.13]
+
+    # the last file rewritten in place: its last bar changed again
+    midmarket(data, "midmarket_rates_2025-01-02_1005.json",
+              [("2025-01-02T09:00:00", 3.12), ("2025-01-02T10:00:00", 3.14)])
+    assert ingest_exchange_data(str(data))[1] == 200
+    assert spot(10) == 3.14
+    assert ExchangeData.query.one().spot_usd == 3.14
@@ -0,0 +1,27 @@
+"""
+Only one process watches a data/ directory.
+"""
+import pytest
+
+from user.services import data_watcher
+from user.services.data_watcher import DataWatcher
+
+
+@pytest.mark.skipif(data_watcher.fcntl is None, reason="needs flock")
+def test_a_second_watcher_does_not_start(tmp_path):
+    first = DataWatcher(str(tmp_path), {}, poll=0.1).start()
+    assert first is not None
+    try:
+        # a separate open() of the lock file, as another worker would do
+        assert DataWatcher(str(tmp_path), {}, poll=0.1).start() is None
+    finally:
+        first.stop()
+
+    again = DataWatcher(str(tmp_path), {}, poll=0.1).start()
+    assert again is not None
+    again.stop()
+
+
+def test_start_data_watcher_can_be_disabled(monkeypatch, tmp_path):
+    monkeypatch.setenv("DATA_WATCHER", "0")
+    assert data_watcher.start_data_watcher(None, str(tmp_path)) is None
@@ -0,0 +1,130 @@
+"""
+eikon/history.py with a fake refinitiv.data provider: date chunking,
+resume points and the parallel, retried history fetch.
+"""
+import datetime
+import importlib.util
+import os
+
+import pandas as pd
+import pytest
+
+from user.services.market_providers import ReplayProvider
+
+# eikon/ is a scripts folder (and "eikon" the Eikon package), so load the module by path
+_spec = importlib.util.spec_from_file_location(
+    "eikon_history", os.path.join(os.path.dirname(__file__), os.pardir, "eikon", "history.py"))
+history = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(history)
+
+D = datetime.datetime
+
+
+class FakeRd:
+    """
+    Stands in for refinitiv.data: get_history() returns hourly BID/ASK bars
+    of `bars[ric]` within [start, end], like the real call for one RIC.
+    The first `fail` calls raise, to exercise the retries.
+    """
+
+    def __init__(self, bars, fail=0):
+        self.bars = bars
+        self.fail = fail
+        self.calls = []
+
+    def get_history(self, universe, fields, start, end, interval):
+        self.calls.append((universe[0], start, end, interval))
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError("session dropped")
+        index = pd.DatetimeIndex([t for t in self.bars.get(universe[0], []) if start <= t <= end],
+                                 name="Timestamp")
+        if index.empty:
+            return pd.DataFrame()
+        hours = (index - D(2025, 1, 1)).total_seconds() / 3600
+        return pd.DataFrame({"BID": 3.0 + hours / 1000, "ASK": 3.1 + hours / 1000}, index=index)[fields]
+
+
+def hours(start, end):
+    return list(pd.date_range(start, end, freq="h", inclusive="left").to_pydatetime())
+
+
+def test_date_chunks_cover_the_range_without_overlap():
+    span = datetime.timedelta(days=7)
+    chunks = list(history.date_chunks(D(2025, 1, 1), D(2025, 1, 20), span))
+    assert chunks == [(D(2025, 1, 1), D(2025, 1, 8)),
+                      (D(2025, 1, 8), D(2025, 1, 15)),
+                      (D(2025, 1, 15), D(2025, 1, 20))]
+    assert list(history.date_chunks(D(2025, 1, 20), D(2025, 1, 20), span)) == []
+
+
+def test_resume_points(tmp_path):
+    rics = ["TND=BCTX", "EURTNDX=BCTX"]
+    assert history.resume_points({}, rics, None) == {r: history.HISTORY_START for r in rics}
+
+    previous = str(tmp_path / "bctx_data_2025-01-03_0900.json")
+    history.write_json(pd.DataFrame({"Timestamp": pd.to_datetime(["2025-01-02 10:00", "2025-01-03 08:59"]),
+                                     "x": [1.0, 2.0]}), previous, compression="")
+    state = {"TND=BCTX": pd.Timestamp("2025-01-04 12:00")}
+    assert history.resume_points(state, rics, previous) == {
+        "TND=BCTX": D(2025, 1, 4, 12),
+        "EURTNDX=BCTX": D(2025, 1, 3, 8, 59),
+    }
+
+
+def test_fetch_history_merges_chunks_per_ric():
+    bars = {"EUR02H=": hours(D(2025, 1, 1), D(2025, 6, 1)),
+            "TND02H=": hours(D(2025, 3, 1), D(2025, 6, 1))}
+    fake = FakeRd(bars, fail=2)
+    starts = {"EUR02H=": D(2025, 1, 1), "TND02H=": D(2025, 3, 1), "GBP02H=": D(2025, 1, 1)}
+
+    df = history.fetch_history(fake, ["EUR02H=", "TND02H=", "GBP02H="], ["BID", "ASK"], "hourly",
+                               starts, D(2025, 6, 1), workers=3, sleep=lambda s: None)
+
+    # two 90-day chunks per RIC, plus the two failed attempts
+    assert len(fake.calls) == 3 * 2 + 2
+    assert list(df.columns) == [(r, f) for r in ("EUR02H=", "TND02H=", "GBP02H=") for f in ("BID", "ASK")]
+    assert df.index.name == "Timestamp"
+    assert df.index.is_monotonic_increasing and df.index.is_unique
+    assert len(df) == len(bars["EUR02H="])
+    assert df["TND02H="].dropna().index.min() == pd.Timestamp("2025-03-01")
+    assert df["GBP02H="].isna().all().all()
+    assert df.loc["2025-02-10 05:00", ("EUR02H=", "BID")] == pytest.approx(3.0 + (40 * 24 + 5) / 1000)
+
+
+def test_fetch_history_with_nothing_new():
+    df = history.fetch_history(FakeRd({}), ["EUR02H="], ["BID", "ASK"], "hourly",
+                               {"EUR02H=": D(2025, 1, 1)}, D(2025, 1, 2), sleep=lambda s: None)
+    assert df.empty
+
+
+def test_fetch_history_gives_up_after_the_retries():
+    fake = FakeRd({}, fail=history.RETRIES + 1)
+    with pytest.raises(ConnectionError):
+        history.fetch_history(fake, ["EUR02H="], ["BID", "ASK"], "hourly",
+                              {"EUR02H=": D(2025, 1, 1)}, D(2025, 1, 2), sleep=lambda s: None)
+    assert len(fake.calls) == history.RETRIES + 1
+
+
+def test_fetch_history_from_a_replay():
+    bars = list(pd.date_range("2025-01-02 09:00", "2025-01-16 09:00", freq="6h").to_pydatetime())
+    events = [{"t": t.isoformat(), "kind": "bar", "key": "TND=BCTX", "value": {"BID": 3.1, "ASK": 3.2}}
+              for t in bars]
+    replay = ReplayProvider(events, speed=0)
+
+    df = history.fetch_history(replay, ["TND=BCTX", "EURTNDX=BCTX"], ["ASK", "BID"], "1min",
+                               {"TND=BCTX": D(2025, 1, 1), "EURTNDX=BCTX": D(2025, 1, 1)},
+                               D(2025, 1, 16), sleep=lambda s: None)
+    assert list(df.columns) == [("TND=BCTX", "ASK"), ("TND=BCTX", "BID"),
+                                ("EURTNDX=BCTX", "ASK"), ("EURTNDX=BCTX", "BID")]
+    assert df.index.is_unique and len(df) == len(bars) - 2         # 03:00 and 09:00 on the 16th are after `end`
+    assert (df["TND=BCTX"]["BID"] == 3.1).all()
+    assert df["EURTNDX=BCTX"].isna().all().all()
+
+
+def test_save_state_advances_each_ric(tmp_path):
+    df = pd.DataFrame({("A", "BID"): [1.0, None], ("B", "BID"): [1.0, 2.0]},
+                      index=pd.DatetimeIndex([D(2025, 1, 1), D(2025, 1, 2)], name="Timestamp"))
+    df.columns = pd.MultiIndex.from_tuples(df.columns)
+    history.save_state(str(tmp_path), df)
+    assert history.load_state(str(tmp_path)) == {"A": pd.Timestamp("2025-01-01"), "B": pd.Timestamp("2025-01-02")}
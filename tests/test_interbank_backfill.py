@@ -0,0 +1,104 @@
+"""
+Interbank backfill against a local stand-in for the BCT archive page
+(`cours_archiv.jsp`), served by http.server on a free port.
+"""
+import threading
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from models import db, InterbankEmptyDay, InterbankRate
+from user.services.interbank_backfill import _insert_ignore, backfill_interbank_rates
+
+HOLIDAY = date(2025, 1, 14)         # page without a rate table
+
+
+def bct_page(day):
+    if day == HOLIDAY.isoformat():
+        return "<html><body><table></table></body></html>"
+    cents = day[-2:]
+    return (
+        "<html><body><table>"
+        f"<tr><td>US Dollar</td><td>USD</td><td>1</td><td>3,1{cents}</td></tr>"
+        f"<tr><td>Euro</td><td>EUR</td><td>1</td><td>3,3{cents}</td></tr>"
+        "</table></body></html>"
+    )
+
+
+@pytest.fixture
+def bct_server():
+    """(url, requested dates) of a stub BCT archive."""
+    requested = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            day = parse_qs(urlparse(self.path).query)["input"][0]
+            requested.append(day)
+            body = bct_page(day).encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/cours_archiv.jsp", requested
+    server.shutdown()
+    server.server_close()
+
+
+def _backfill(url):
+    inserted = backfill_interbank_rates(date(2025, 1, 6), date(2025, 1, 17), workers=3,
+                                        base_url=url, archive=None)
+    db.session.commit()
+    return inserted
+
+
+def test_fills_missing_days(app, bct_server):
+    url, requested = bct_server
+    db.session.add(InterbankRate(date=date(2025, 1, 6), currency="USD", rate=3.0))
+    db.session.commit()
+
+    inserted = _backfill(url)
+
+    # two weeks of weekdays, minus the holiday, minus the USD rate already stored
+    assert len(inserted) == 9 * 2 - 1
+    assert "2025-01-11" not in requested and "2025-01-12" not in requested
+    assert InterbankRate.query.filter_by(date=date(2025, 1, 6), currency="USD").one().rate == 3.0
+    assert InterbankRate.query.filter_by(date=date(2025, 1, 6), currency="EUR").one().rate == 3.306
+    assert InterbankRate.query.filter_by(date=date(2025, 1, 17), currency="USD").one().rate == 3.117
+    assert {(e.date, e.currency) for e in InterbankEmptyDay.query} == {(HOLIDAY, "USD"), (HOLIDAY, "EUR")}
+
+
+def test_known_empty_days_are_not_fetched(app, bct_server):
+    url, requested = bct_server
+    db.session.add(InterbankEmptyDay(date=date(2025, 1, 8), currency="USD"))
+    db.session.add(InterbankEmptyDay(date=date(2025, 1, 8), currency="EUR"))
+    db.session.commit()
+
+    _backfill(url)
+
+    assert "2025-01-08" not in requested
+    assert InterbankRate.query.filter_by(date=date(2025, 1, 8)).count() == 0
+
+
+def test_second_run_is_idempotent(app, bct_server):
+    url, requested = bct_server
+    _backfill(url)
+    rates = {(r.date, r.currency, r.rate) for r in InterbankRate.query}
+    requested.clear()
+
+    assert _backfill(url) == []
+    assert requested == []                  # the holiday is a known empty day now
+    assert {(r.date, r.currency, r.rate) for r in InterbankRate.query} == rates
+
+    # rows that a concurrent run inserted first are skipped, not an error
+    _insert_ignore(InterbankRate, [{"date": d, "currency": c, "rate": 9.9} for d, c, _ in rates])
+    db.session.commit()
+    assert {(r.date, r.currency, r.rate) for r in InterbankRate.query} == rates
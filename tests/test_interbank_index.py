@@ -0,0 +1,80 @@
+"""
+InterbankIndex answers the as-of queries through Lookback: checked
+against a day-by-day walk, before and after an incremental refresh.
+"""
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from models import db, InterbankRate
+from user.services.interbank_index import InterbankIndex
+
+START = date(2025, 1, 1)
+
+
+def walk(rows, ccy, day, max_shift=None):
+    """The per-day query loop the index replaces: first non-zero rate on or before `day`."""
+    for shift in range((day - START).days + 1):
+        if max_shift is not None and shift > max_shift:
+            break
+        rate = rows.get((ccy, day - timedelta(days=shift)))
+        if rate:
+            return rate, day - timedelta(days=shift)
+    return None, None
+
+
+def publish(rows, rng, first, days):
+    for i in range(days):
+        d = first + timedelta(days=i)
+        for ccy in ("USD", "EUR"):
+            if d.weekday() < 5 and rng.random() > 0.1:
+                rate = round(3 + rng.random(), 4)
+                if (ccy, d) not in rows and rng.random() < 0.05:
+                    rate = 0.0                  # placeholder rows, never published yet
+                rows[(ccy, d)] = rate
+                row = InterbankRate.query.filter_by(date=d, currency=ccy).first()
+                if row is None:
+                    row = InterbankRate(date=d, currency=ccy)
+                    db.session.add(row)
+                row.rate = rate
+    db.session.commit()
+
+
+def check(index, rows, days):
+    ccys = [c for c in ("USD", "EUR", "GBP") for _ in days]
+    targets = list(days) * 3
+    for max_shift in (None, 0, 3):
+        rates, effective = index.asof_many(ccys, targets, max_shift)
+        for i, (ccy, day) in enumerate(zip(ccys, targets)):
+            want = walk(rows, ccy, day, max_shift)
+            got = index.asof(day, ccy, max_shift)
+            assert got == want
+            if want[0] is None:
+                assert np.isnan(rates[i]) and np.isnat(effective[i])
+            else:
+                assert rates[i] == pytest.approx(want[0])
+                assert effective[i] == np.datetime64(want[1])
+
+
+def test_asof_matches_the_daily_walk(app):
+    rng = random.Random(5)
+    rows = {}
+    publish(rows, rng, START, 60)
+    index = InterbankIndex(refresh_interval=3600)
+    index.refresh()
+    days = [START + timedelta(days=i) for i in range(-2, 75)]
+    check(index, rows, days)
+
+    # a republished rate and 30 new days, read incrementally
+    publish(rows, rng, START + timedelta(days=50), 40)
+    index.refresh(since=START + timedelta(days=50))
+    days = [START + timedelta(days=i) for i in range(-2, 95)]
+    check(index, rows, days)
+
+    fresh = InterbankIndex(refresh_interval=3600)
+    fresh.refresh()
+    for ccy in ("USD", "EUR"):
+        np.testing.assert_array_equal(index._lookbacks[ccy]._values, fresh._lookbacks[ccy]._values)
+        np.testing.assert_array_equal(index._lookbacks[ccy]._source, fresh._lookbacks[ccy]._source)
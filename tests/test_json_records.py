@@ -0,0 +1,32 @@
+"""
+data/ JSON arrays read back record by record from plain, gzip and zstd files.
+"""
+import gzip
+import json
+
+import pytest
+import zstandard
+
+from user.services.json_records import iter_json_records
+
+RECORDS = [{"Timestamp": f"2025-01-02T{h:02d}:00:00", "spotUSD": 3.1 + h / 100} for h in range(24)]
+
+
+@pytest.mark.parametrize("suffix", ["", ".gz", ".zst"])
+def test_records_round_trip(tmp_path, suffix):
+    payload = json.dumps(RECORDS).encode()
+    if suffix == ".gz":
+        payload = gzip.compress(payload)
+    elif suffix == ".zst":
+        payload = zstandard.ZstdCompressor().compress(payload)
+    path = tmp_path / f"midmarket_rates_2025-01-02_0900.json{suffix}"
+    path.write_bytes(payload)
+    # a chunk smaller than one record exercises the refill path
+    assert list(iter_json_records(str(path), chunk_size=16)) == RECORDS
+
+
+def test_truncated_array_is_an_error(tmp_path):
+    path = tmp_path / "bctx_data_2025-01-02_0900.json"
+    path.write_text(json.dumps(RECORDS)[:-40])
+    with pytest.raises(ValueError):
+        list(iter_json_records(str(path)))
@@ -0,0 +1,106 @@
+"""
+The on-disk market archive: in-place tail updates match a rebuild from
+the database, and the hourly spot endpoint reads it.
+"""
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from flask_jwt_extended import JWTManager, create_access_token
+
+import user.routes
+from models import db, ExchangeSpotHourly, InterbankRate
+from user.routes import user_bp
+from user.services import market_archive as archive_module
+from user.services.market_archive import MarketArchive
+
+T0 = datetime(2025, 1, 6)
+
+
+def add_hours(start, n, shift=0.0):
+    for i in range(n):
+        ts = start + timedelta(hours=i)
+        row = ExchangeSpotHourly.query.filter_by(timestamp=ts).first() or ExchangeSpotHourly(timestamp=ts)
+        row.spot_usd = 3.1 + i / 1000 + shift
+        row.spot_eur = None if i % 7 == 3 else 3.2 + i / 1000 + shift
+        db.session.add(row)
+    db.session.commit()
+
+
+def assert_same(archive, series, tmp_path):
+    fresh = MarketArchive(str(tmp_path / "fresh"))
+    fresh.update(series)
+    got, want = archive.frame(series), fresh.frame(series)
+    assert list(got.columns) == list(want.columns)
+    assert got.index.equals(want.index)
+    np.testing.assert_array_equal(got.to_numpy(), want.to_numpy())
+
+
+def test_update_rewrites_only_the_tail(app, tmp_path):
+    archive = MarketArchive(str(tmp_path / "archive"))
+    add_hours(T0, 48)
+    assert archive.update("spot_hourly") == 48
+    path = os.path.join(archive.root, "spot_hourly", "spot_usd.bin")
+    before = open(path, "rb").read()
+    inode = os.stat(path).st_ino
+
+    # hours 40.. republished, 30 new hours after them
+    since = T0 + timedelta(hours=40)
+    add_hours(since, 38, shift=0.5)
+    assert archive.update("spot_hourly", since=since) == 78
+
+    after = open(path, "rb").read()
+    assert os.stat(path).st_ino == inode
+    assert after[:40 * 8] == before[:40 * 8]
+    assert archive.frame("spot_hourly")["spot_usd"].iloc[40] == pytest.approx(3.6)
+    assert_same(archive, "spot_hourly", tmp_path)
+
+
+def test_new_columns_get_blanks(app, tmp_path):
+    archive = MarketArchive(str(tmp_path / "archive"))
+    db.session.add_all([InterbankRate(date=date(2025, 1, d), currency="USD", rate=3.1) for d in (6, 7, 8)])
+    db.session.commit()
+    archive.update("interbank")
+
+    db.session.add_all([InterbankRate(date=date(2025, 1, 9), currency="USD", rate=3.11),
+                        InterbankRate(date=date(2025, 1, 9), currency="EUR", rate=3.3)])
+    db.session.commit()
+    assert archive.update("interbank", since=date(2025, 1, 9)) == 4
+
+    frame = archive.frame("interbank")
+    assert frame["EUR"].isna().tolist() == [True, True, True, False]
+    assert_same(archive, "interbank", tmp_path)
+
+
+def test_failed_update_drops_the_series(app, tmp_path, monkeypatch):
+    archive = MarketArchive(str(tmp_path / "archive"))
+    add_hours(T0, 5)
+    archive.update("spot_hourly")
+
+    def broken(since):
+        raise RuntimeError("database went away")
+    monkeypatch.setitem(archive_module.SERIES, "spot_hourly", (broken, "s"))
+    assert archive.update("spot_hourly", since=T0) is None
+    assert archive.load("spot_hourly") is None
+
+
+def test_hourly_spot_reads_the_archive(app, tmp_path, monkeypatch):
+    app.register_blueprint(user_bp, url_prefix="/")
+    JWTManager(app)
+    client = app.test_client()
+    headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+    add_hours(T0, 72)
+    archive = MarketArchive(str(tmp_path / "archive"))
+    monkeypatch.setattr(user.routes, "market_archive", archive)
+
+    def fetch():
+        r = client.get("/api/exchange-data/hourly?start=2025-01-07&end=2025-01-07&currency=EUR",
+                       headers=headers)
+        assert r.status_code == 200
+        return r.get_json()
+
+    from_db = fetch()
+    assert archive.update("spot_hourly") == 72
+    assert fetch() == from_db
+    assert len(from_db) == 24 - 4          # hours 24, 31, 38 and 45 have no EUR spot
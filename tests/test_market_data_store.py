@@ -0,0 +1,52 @@
+"""
+Market data store: a process that didn't run the ingestion picks up the
+hourly rewrite of the last day on its next catch-up tick.
+"""
+from datetime import date
+
+import pytest
+
+from models import db, ExchangeData
+from user.services.market_data_store import MarketDataStore
+
+DAYS = [date(2025, 1, 6), date(2025, 1, 7)]
+
+
+def _row(day, spot_usd):
+    return ExchangeData(date=day, spot_usd=spot_usd, spot_eur=3.30,
+                        usd_1m=4.3, usd_3m=4.3, usd_6m=4.2,
+                        eur_1m=2.9, eur_3m=2.8, eur_6m=2.7,
+                        tnd_1m=8.0, tnd_3m=8.0, tnd_6m=8.1)
+
+
+@pytest.fixture
+def store(app):
+    db.session.add_all([_row(DAYS[0], 3.10), _row(DAYS[1], 3.12)])
+    db.session.commit()
+    store = MarketDataStore(refresh_interval=3600)
+    store.refresh()
+    return store
+
+
+def test_last_day_rewrite_is_picked_up_on_the_catch_up_tick(store):
+    ExchangeData.query.filter_by(date=DAYS[1]).one().spot_usd = 3.15
+    db.session.commit()
+
+    # within the refresh interval the loaded curve is served as is
+    assert store.get(DAYS[1]).spot_usd == pytest.approx(3.12)
+
+    store.refresh_interval = 0
+    assert store.get(DAYS[1]).spot_usd == pytest.approx(3.15)
+
+    ExchangeData.query.filter_by(date=DAYS[1]).one().spot_usd = 3.16
+    db.session.commit()
+    found, cols = store.get_many(DAYS)
+    assert found.all()
+    assert cols["spot_usd"].tolist() == pytest.approx([3.10, 3.16])
+
+
+def test_earlier_days_do_not_trigger_a_re_read(store):
+    store.refresh_interval = 0
+    ExchangeData.query.filter_by(date=DAYS[0]).one().spot_usd = 3.50
+    db.session.commit()
+    assert store.get(DAYS[0]).spot_usd == pytest.approx(3.10)
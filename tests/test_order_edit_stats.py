@@ -0,0 +1,52 @@
+"""
+A client editing an executed order moves it between client_daily_stats rows.
+"""
+from datetime import date
+
+import pytest
+from flask_jwt_extended import JWTManager, create_access_token
+
+from models import db, User, Order, InterbankRate, ClientDailyStats
+from tests.conftest import reload_market_data
+from user.routes import user_bp
+from user.services.daily_stats import rebuild_daily_stats
+
+DAY = date(2025, 1, 6)
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(user_bp, url_prefix="/")
+    JWTManager(app)
+    user = User(email="client@example.com", password="x", client_name="Client")
+    db.session.add(user)
+    db.session.add_all([InterbankRate(date=DAY, currency="USD", rate=3.10),
+                        InterbankRate(date=DAY, currency="EUR", rate=3.35)])
+    db.session.commit()
+    for amount in (1000, 500):
+        db.session.add(Order(user_id=user.id, currency="USD", amount=amount, original_amount=amount,
+                             transaction_type="import", trade_type="spot", transaction_date=DAY,
+                             order_date=DAY, value_date=DAY, historical_loss=0.0, interbank_rate=3.10,
+                             benchmark_rate=3.10, execution_rate=3.05, status="Executed"))
+    db.session.commit()
+    reload_market_data()
+    rebuild_daily_stats()
+    db.session.commit()
+    token = create_access_token(identity=str(user.id))
+    return app.test_client(), {"Authorization": f"Bearer {token}"}, user.id
+
+
+def stats(user_id):
+    return {r.currency: r.order_count for r in ClientDailyStats.query.filter_by(user_id=user_id, day=DAY)}
+
+
+def test_currency_change_moves_the_order(client):
+    http, headers, user_id = client
+    assert stats(user_id) == {"USD": 2}
+    order = Order.query.filter_by(amount=500).one()
+
+    r = http.put(f"/orders/{order.id}", json={"currency": "EUR"}, headers=headers)
+    assert r.status_code == 200
+    assert stats(user_id) == {"USD": 1, "EUR": 1}
+    usd = ClientDailyStats.query.filter_by(user_id=user_id, currency="USD").one()
+    assert usd.traded_fx == pytest.approx(1000)
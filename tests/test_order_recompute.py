@@ -0,0 +1,69 @@
+"""
+Dirty-order recompute: interbank corrections re-price benchmarked orders,
+and an order edited during a run stays flagged.
+"""
+from datetime import date
+
+import pytest
+from sqlalchemy import update
+
+from models import db, User, Order, InterbankRate
+from tests.conftest import reload_market_data
+from user.services import order_recompute
+from user.services.interbank_index import interbank_index
+from user.services.order_recompute import mark_dirty_for_interbank, recompute_dirty_orders
+
+DAY = date(2025, 1, 6)
+
+
+@pytest.fixture
+def order(app):
+    user = User(email="client@example.com", password="x", client_name="Client")
+    db.session.add(user)
+    db.session.add(InterbankRate(date=DAY, currency="USD", rate=3.10))
+    db.session.commit()
+    order = Order(user_id=user.id, currency="USD", amount=1000, original_amount=1000,
+                  transaction_type="import", trade_type="spot", transaction_date=DAY,
+                  order_date=DAY, value_date=DAY, historical_loss=0.0,
+                  execution_rate=3.05, status="Executed")
+    db.session.add(order)
+    db.session.commit()
+    reload_market_data()
+    recompute_dirty_orders()
+    db.session.refresh(order)
+    assert order.interbank_rate == pytest.approx(3.10) and not order.benchmark_dirty
+    return order
+
+
+def test_interbank_correction_reprices_benchmarked_orders(order):
+    InterbankRate.query.filter_by(date=DAY, currency="USD").one().rate = 3.20
+    mark_dirty_for_interbank({"USD"}, DAY)
+    db.session.commit()
+    interbank_index.refresh(since=DAY)
+
+    assert recompute_dirty_orders()["updated"] == 1
+    db.session.refresh(order)
+    assert order.interbank_rate == pytest.approx(3.20)
+    assert order.benchmark_rate == pytest.approx(3.20)
+    assert order.gain == pytest.approx((3.20 - 3.05) / 3.05 * 1000 * 3.05)
+    assert not order.benchmark_dirty
+
+
+def test_order_edited_during_a_run_stays_dirty(order, monkeypatch):
+    compute = order_recompute.compute_benchmarks
+
+    def edited_meanwhile(df, **kwargs):
+        # update_order / update_order_user flag the order while we compute
+        db.session.execute(update(Order).where(Order.id == order.id).values(benchmark_dirty=True))
+        return compute(df, **kwargs)
+
+    db.session.execute(update(Order).where(Order.id == order.id).values(benchmark_dirty=True))
+    monkeypatch.setattr(order_recompute, "compute_benchmarks", edited_meanwhile)
+    assert recompute_dirty_orders()["processed"] == 1
+    db.session.refresh(order)
+    assert order.benchmark_dirty
+
+    monkeypatch.setattr(order_recompute, "compute_benchmarks", compute)
+    assert recompute_dirty_orders()["processed"] == 1
+    db.session.refresh(order)
+    assert not order.benchmark_dirty
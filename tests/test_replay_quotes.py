@@ -0,0 +1,50 @@
+"""
+Quotes replayed from a data/ directory reach the live rates metrics.
+"""
+import json
+
+import pytest
+
+from user.services import live_rates_service
+from user.services.market_providers import ReplayProvider, set_market_provider
+
+
+@pytest.fixture
+def replay(tmp_path):
+    (tmp_path / "midmarket_rates_2025-01-02_0900.json").write_text(json.dumps([
+        {"Timestamp": "2025-01-02T08:00:00", "spotUSD": 3.15, "spotEUR": 3.27},
+        {"Timestamp": "2025-01-02T09:00:00", "spotUSD": 3.16, "spotEUR": None},
+    ]))
+    previous = set_market_provider(ReplayProvider.from_data_files(str(tmp_path), speed=0))
+    yield
+    set_market_provider(previous)
+
+
+@pytest.fixture
+def fresh_rates(monkeypatch):
+    for ccy in ("USD", "EUR"):
+        monkeypatch.setitem(live_rates_service.rates, ccy, {'XE': 0, 'WISE': 0, 'YahooFinance': 0})
+        monkeypatch.setitem(live_rates_service.metric, ccy,
+                            {"High": 0, "Low": 0, "Average": 0, "Volatility": 0})
+
+
+def test_replayed_mid_sets_the_average(replay, fresh_rates):
+    live_rates_service.update_currency_rates("USD")
+    live_rates_service.update_currency_rates("EUR")
+    assert live_rates_service.rates["USD"]["XE"] == 3.16
+    assert live_rates_service.metric["USD"]["Average"] == pytest.approx(3.16)
+    # the last EUR value is missing: the previous one is still the latest quote
+    assert live_rates_service.metric["EUR"]["Average"] == pytest.approx(3.27)
+
+
+def test_average_skips_a_missing_source(fresh_rates):
+    class OneSource:
+        def latest_quote(self, currency):
+            return {"rates": {"XE": "3.1500"}, "metrics": {}, "pairs": {}}
+
+    previous = set_market_provider(OneSource())
+    try:
+        live_rates_service.update_currency_rates("USD")
+    finally:
+        set_market_provider(previous)
+    assert live_rates_service.metric["USD"]["Average"] == pytest.approx(3.15)
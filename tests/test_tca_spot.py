@@ -0,0 +1,53 @@
+"""
+/tca/spot intraday benchmarks against the tick store.
+"""
+from datetime import date
+
+import pytest
+from flask_jwt_extended import JWTManager, create_access_token
+
+import tca.routes
+from models import db, User, TcaSpotInput
+from tca import tca_bp
+from user.services.bctx_ticks import TickStore
+
+DAY = date(2025, 3, 14)
+
+
+@pytest.fixture
+def client(app, tmp_path, monkeypatch):
+    app.register_blueprint(tca_bp, url_prefix="/tca")
+    JWTManager(app)
+    store = TickStore(str(tmp_path))
+    store.put(DAY, [32400, 33000, 34200], {"tnd_bid": [3.0, 3.1, 3.2], "tnd_ask": [3.02, 3.12, 3.22]})
+    monkeypatch.setattr(tca.routes, "bctx_ticks", store)
+
+    user = User(email="client@example.com", password="x", client_name="Client")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add_all([
+        TcaSpotInput(client_id=user.id, transaction_date=DAY, value_date=DAY, currency="USD",
+                     amount=1000, execution_rate=3.13, transaction_type="import"),
+        TcaSpotInput(client_id=user.id, transaction_date=date(2025, 3, 17), value_date=DAY,
+                     currency="USD", amount=1000, execution_rate=3.05, transaction_type="export"),
+    ])
+    db.session.commit()
+    token = create_access_token(identity=str(user.id))
+    return app.test_client(), {"Authorization": f"Bearer {token}"}
+
+
+def test_nearest_tick_at_the_trade_time(client):
+    http, headers = client
+    r = http.get("/tca/spot?at=09:08", headers=headers)
+    assert r.status_code == 200
+    imp, no_ticks = r.get_json()
+    # 09:08 is closest to the 09:10 tick: bid 3.10, ask 3.12
+    assert imp["nearest_bid_at"] == pytest.approx(3.1)
+    assert imp["nearest_ask_at"] == pytest.approx(3.12)
+    assert imp["nearest_mid_at"] == pytest.approx(3.11)
+    assert imp["pnl_nearest_at_tnd"] == pytest.approx((3.13 - 3.12) * 1000, abs=1e-3)   # float32 ticks
+    assert imp["spread_nearest_at_pct"] == pytest.approx((3.13 - 3.12) / 3.12 * 100, rel=1e-4)
+    assert no_ticks["nearest_bid_at"] is None and no_ticks["pnl_nearest_at_tnd"] is None
+
+    assert "nearest_bid_at" not in http.get("/tca/spot", headers=headers).get_json()[0]
+    assert http.get("/tca/spot?at=9h", headers=headers).status_code == 400
@@ -0,0 +1,56 @@
+"""
+/tca/spot-option forwards from the in-memory yield look-back.
+"""
+from datetime import date
+
+import pytest
+from flask_jwt_extended import JWTManager, create_access_token
+
+from models import db, User, TcaSpotInput, ExchangeData, InterbankRate
+from tca import tca_bp
+from tests.conftest import reload_market_data
+from user.routes import calculate_forward_rate
+
+DAY = date(2025, 3, 14)
+
+
+def _curve(day, usd_1m, tnd_1m):
+    return ExchangeData(date=day, spot_usd=3.1, spot_eur=3.3,
+                        usd_1m=usd_1m, usd_3m=4.3, usd_6m=4.2,
+                        eur_1m=2.9, eur_3m=2.8, eur_6m=2.7,
+                        tnd_1m=tnd_1m, tnd_3m=8.0, tnd_6m=8.1)
+
+
+@pytest.fixture
+def client(app):
+    app.register_blueprint(tca_bp, url_prefix="/tca")
+    JWTManager(app)
+    user = User(email="client@example.com", password="x", client_name="Client")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add_all([
+        # the 30-day hedge targets 2025-02-12: no curve that day, and the
+        # 1M USD yield of the 11th is zero, so it comes from the 10th
+        _curve(date(2025, 2, 10), usd_1m=4.3, tnd_1m=7.9),
+        _curve(date(2025, 2, 11), usd_1m=0.0, tnd_1m=8.0),
+        InterbankRate(date=date(2025, 2, 12), currency="USD", rate=3.10),
+        TcaSpotInput(client_id=user.id, transaction_date=DAY, value_date=DAY, currency="USD",
+                     amount=1000, execution_rate=3.20, transaction_type="import"),
+    ])
+    db.session.commit()
+    reload_market_data()
+    token = create_access_token(identity=str(user.id))
+    return app.test_client(), {"Authorization": f"Bearer {token}"}
+
+
+def test_forward_uses_the_last_non_zero_yields(client):
+    http, headers = client
+    r = http.get("/tca/spot-option", headers=headers)
+    assert r.status_code == 200
+    hedges = {h["maturity_days"]: h for h in r.get_json()["deals"][0]["hedging_with_options"]["details"]}
+
+    assert hedges[30]["associated_spot"] == pytest.approx(3.10)
+    assert hedges[30]["forward_rate"] == pytest.approx(calculate_forward_rate(3.10, 4.3, 8.0, 30))
+    assert hedges[30]["pnl_tnd"] == pytest.approx(max(3.20 - hedges[30]["forward_rate"], 0) * 1000)
+    # no interbank rate or curve within the look-back
+    assert hedges[90]["forward_rate"] is None and hedges[90]["pnl_tnd"] is None
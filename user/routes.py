@@ -1,6 +1,6 @@
 from datetime import datetime, timedelta, date
 from scipy.interpolate import interp1d, CubicSpline
-from models import db, User,  Order, AuditLog, ExchangeData, OpenPosition, PremiumRate, InterbankRate, BctxFixing, TcaSpotInput
+from models import db, User,  Order, AuditLog, ExchangeData, OpenPosition, PremiumRate, InterbankRate, BctxFixing, TcaSpotInput, ExchangeSpotHourly
 from matplotlib import pyplot as plt
 import numpy as np
 from sqlalchemy import func
@@ -13,10 +13,27 @@ from .services.live_rates_service import update_currency_rates, rates, metric, r
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from io import BytesIO
 import json
+import math
 import requests
 from bs4 import BeautifulSoup
 from apscheduler.schedulers.background import BackgroundScheduler
 from .templates import _make_excel
+from .services.benchmark_service import (
+    calculate_forward_rate, get_yield_period, compute_benchmarks
+)
+from .services.market_data_store import market_data
+from .services.interbank_index import interbank_index
+from .services.market_archive import market_archive
+from .services.order_recompute import recompute_dirty_orders, mark_dirty_for_interbank
+from .services.interbank_backfill import backfill_interbank_rates, reparse_interbank_archive
+from .services.market_providers import get_market_provider
+from .services.dashboard_service import (
+    load_client_orders, parse_currencies, price_orders, enrich_orders,
+    aggregate_daily, summarize, summarize_daily, summarize_currencies,
+    bank_gains_frame, forward_rate_rows, superperformance_rows,
+)
+from .services.dashboard_cache import dashboard_cache
+from .services.daily_stats import load_daily_stats, refresh_daily_stats
 
 
 user_bp = Blueprint('user_bp', __name__, static_folder='static', static_url_path='/static/user_bp',
@@ -207,7 +224,7 @@ def submit_order_or_option():
         debug_logs.append(f"Days until maturity: {days_diff}")
 
         # 2) Retrieve today's exchange data to compute forward rate
-        exchange_data = ExchangeData.query.filter_by(date=today).first()
+        exchange_data = market_data.get(today)
         if not exchange_data:
             debug_logs.append("No exchange data found for today's date")
             return jsonify({"message": "Exchange data not available", "debug": debug_logs}), 400
@@ -438,6 +455,8 @@ def update_order_user(order_id):
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     changes = {}
+    # client_daily_stats key before the edit (the currency can change)
+    old_key = (order.user_id, order.currency, order.transaction_date)
 
     if 'amount' in data and data['amount'] != order.amount:
         changes['original_amount'] = {"old": order.original_amount, "new": data['amount']}
@@ -480,7 +499,10 @@ def update_order_user(order_id):
                 changes['strike'] = {"old": order.strike, "new": new_strike}
                 order.strike = new_strike
 
-    log_action(
+    if changes:
+        order.benchmark_dirty = True
+        refresh_daily_stats([old_key, (order.user_id, order.currency, order.transaction_date)])
+    log_action(            # commits
         action_type='update',
         table_name='order',
         record_id=order.id_unique,
@@ -489,6 +511,8 @@ def update_order_user(order_id):
     )
 
     db.session.commit()
+    if changes:
+        dashboard_cache.invalidate_user(user_id)
 
     return jsonify({"message": "Order updated successfully"}), 200
 
@@ -538,9 +562,6 @@ def init_socketio(app):
     socketio = SocketIO(app, cors_allowed_origins="*")
     return socketio
 
-def calculate_forward_rate(spot_rate, yield_foreign, yield_domestic, days):
-    return spot_rate * ((1 + yield_domestic  * days / 360) / (1 + yield_foreign * days / 360))
-
 var_table = {
     'USD': {
         '1m': {'1%': -0.038173, '5%': -0.026578, '10%': -0.020902},
@@ -554,14 +575,6 @@ var_table = {
     }
 }
 
-def get_yield_period(days):
-    if days <= 60:
-        return '1m'
-    elif days <= 120:
-        return '3m'
-    else:
-        return '6m'
-
 def calculate_var(currency, days, amount):
     period = get_yield_period(days)
     currency_var = var_table.get(currency.upper(), {}).get(period, {})
@@ -633,163 +646,41 @@ def calculate_forward_rate_api():
 @user_bp.route('/api/dashboard/summary', methods=['GET'])
 @jwt_required()
 def dashboard_summary():
-    from datetime import date
-    from collections import defaultdict
-    import calendar
+    """
+    ?currency=USD            KPIs of one currency (default USD)
+    ?currency=all | USD,EUR  per-currency KPIs + a TND grand total, in one pass
+    """
     user_id  = get_jwt_identity()
-    currency = request.args.get('currency', 'USD').upper()
-    orders = Order.query.filter(
-    Order.user_id == user_id,
-    Order.currency == currency,
-    Order.status.in_(['Executed', 'Matched'])
-).all()
-    has_forward_or_option = any(is_hedged(o) for o in orders)  
-    total_traded = sum(o.original_amount for o in orders)
-    total_traded_tnd = sum(
-        o.original_amount * o.execution_rate for o in orders if o.execution_rate
-    )
-    total_covered = sum(
-    o.original_amount
-    for o in orders
-    if is_hedged(o)         
-)
-    coverage_percent = (total_covered / total_traded * 100) if total_traded else 0
-    # ---------- Month‑to‑date (MTD) traded ---------------------
-    today = date.today()
-    total_traded_mtd = sum(
-        o.original_amount for o in orders
-        if o.transaction_date.year == today.year and o.transaction_date.month == today.month
-    )
-    total_traded_mtd_tnd = sum(
-        o.original_amount * o.execution_rate for o in orders
-        if o.execution_rate and o.transaction_date.year == today.year and o.transaction_date.month == today.month
-    )
-    # ---------- Gains & Commissions ----------------------------------------
-    economies_totales = 0.0         # cumulative gain in foreign currency
-    economies_totales_tnd = 0.0     # cumulative gain converted to TND
-    economies_totales_couv = 0.0    # hedged cumulative gain in foreign currency
-    economies_totales_couv_tnd = 0.0  # hedged cumulative gain in TND
-    total_commissions_tnd = 0.0     # total commission in TND
-    for o in orders:
-        if o.execution_rate is None:
-            continue
+    currency = parse_currencies(request.args.get('currency'))
+    cache_key = currency if isinstance(currency, str) else \
+        "ALL" if currency is None else ",".join(currency)
+    return jsonify(dashboard_cache.get_or_compute(
+        user_id, cache_key, "summary", lambda: _summary_payload(user_id, currency)
+    ))
 
-        bench = calculate_benchmark(o)
-        if o.transaction_type.lower() in ("import", "buy"):
-            gain_pct = (bench - o.execution_rate)/o.execution_rate
-        else:
-            gain_pct = (o.execution_rate - bench) / bench
-        gain_fx  = gain_pct * o.original_amount
-        gain_tnd = gain_fx * o.execution_rate
-        economies_totales     += gain_fx
-        economies_totales_tnd += gain_tnd
-        if is_hedged(o):
-            economies_totales_couv     += gain_fx
-            economies_totales_couv_tnd += gain_tnd
-        comm_pct = o.commission_percent or 0.0
-        total_commissions_tnd += o.execution_rate * o.original_amount * comm_pct
-    # ---------- Net Gain & ROI ---------------------------------------------
-    net_gain_tnd = economies_totales_tnd - total_commissions_tnd
-    roi_percent  = (net_gain_tnd / total_commissions_tnd * 100) if total_commissions_tnd else None
-    # ---------- Super‑performance Rate -------------------------------------
-    superformance_rate = calculate_superformance_rate(orders)
-    # ---------- Monthly Series (for charts) ----------------------------
-    monthly = defaultdict(lambda: {"transacted": 0.0, "gain": 0.0})
-    for o in orders:
-        # Group by transaction month/year
-        key = f"{calendar.month_name[o.transaction_date.month]} {o.transaction_date.year}"
-        monthly[key]["transacted"] += o.original_amount * (o.execution_rate or 0)
-        if o.execution_rate:
-            bench = calculate_benchmark(o)
-            if o.transaction_type.lower() in ("import", "buy"):
-                order_gain_pct = (bench - o.execution_rate)/o.execution_rate
-                
-            else:
-                order_gain_pct = (o.execution_rate- bench)  / bench
-            monthly[key]["gain"] += order_gain_pct * o.original_amount * (o.execution_rate or 0)
-    months = list(monthly.keys())
-    monthly_total_transacted = [v["transacted"] for v in monthly.values()]
-    monthly_total_gain = [v["gain"] for v in monthly.values()]
-    # ---------- MTD Gains & Commissions ------------------------------------
-    economies_totales_tnd_mtd = 0.0
-    for o in orders:
-        if (o.transaction_date.year == today.year and o.transaction_date.month == today.month and o.execution_rate):
-            bench = calculate_benchmark(o)
-            if o.transaction_type.lower() == "import":
-                gain_pct = (bench - o.execution_rate) / o.execution_rate
-            else:
-                gain_pct = (o.execution_rate - bench) / bench
-            gain_fx  = gain_pct * o.original_amount
-            gain_tnd = gain_fx * o.execution_rate
-            economies_totales_tnd_mtd += gain_tnd
-
-    total_commissions_tnd_mtd = sum(
-        o.execution_rate * o.original_amount * (o.commission_percent or 0.0)
-        for o in orders
-        if o.execution_rate and o.transaction_date.year == today.year and o.transaction_date.month == today.month
-    )
-    net_gain_tnd_mtd = economies_totales_tnd_mtd - total_commissions_tnd_mtd
-    roi_percent_mtd = (net_gain_tnd_mtd / total_commissions_tnd_mtd * 100) if total_commissions_tnd_mtd else None
 
-    return jsonify({
-        "currency": currency,
-        "total_traded_fx": total_traded,             
-        "total_traded_tnd": total_traded_tnd,          
-        "total_traded_mtd_fx": total_traded_mtd,
-        "total_traded_mtd_tnd": total_traded_mtd_tnd,
-        "coverage_percent": coverage_percent,
-        "economies_totales_fx": economies_totales,   
-        "economies_totales_tnd": economies_totales_tnd,  
-        "economies_totales_couverture_fx": economies_totales_couv,
-        "economies_totales_couverture_tnd": economies_totales_couv_tnd,
-        "total_commissions_tnd": total_commissions_tnd,
-        "net_gain_tnd": net_gain_tnd,
-        "roi_percent": roi_percent,
-        "superformance_rate": superformance_rate,       
-        "months": months,
-        "monthlyTotalTransacted": monthly_total_transacted,
-        "monthlyTotalGain": monthly_total_gain,        
-        "total_commissions_tnd_mtd": total_commissions_tnd_mtd,
-        "net_gain_tnd_mtd": net_gain_tnd_mtd,
-        "roi_percent_mtd": roi_percent_mtd,
-        "has_forward_or_option": has_forward_or_option,
-        "total_covered_mtd_fx": sum(
-            o.original_amount for o in orders
-            if is_hedged(o) and o.transaction_date.year == today.year and o.transaction_date.month == today.month
-        ),
-        "total_covered_mtd_tnd": sum(
-            o.original_amount * o.execution_rate for o in orders
-            if is_hedged(o) and o.transaction_date.year == today.year and o.transaction_date.month == today.month and o.execution_rate
-        ),
-    })
+def _summary_payload(user_id, currency):
+    """
+    Summed from client_daily_stats.  Clients not backfilled yet, and days
+    holding orders that could not be priced, fall back to aggregating the
+    orders on the fly, which raises the pricing error as it always has.
+    """
+    daily = load_daily_stats(user_id, currency)
+    if daily is None or daily["unpriced_count"].astype(int).any():
+        daily = aggregate_daily(enrich_orders(load_client_orders(user_id, currency)))
+    if isinstance(currency, str):
+        return summarize_daily(daily, currency)
+    return summarize_currencies(daily, currency)
 
 @user_bp.route('/api/dashboard/secured-vs-market-forward-rate', methods=['GET'])
 @jwt_required()
 def forward_rate_table():
     user_id = get_jwt_identity()
     currency = request.args.get("currency", "USD").upper()
-    orders = Order.query.filter(
-    Order.user_id == user_id,
-    Order.currency == currency,
-    Order.status.in_(['Executed', 'Matched'])  
-).all()
-
-    forward_rate_data = []
-    for order in orders:
-        if not is_hedged(order):
-            continue
-        secured_forward_rate = order.execution_rate
-        benchmark_rate = calculate_benchmark(order)
-        forward_rate_data.append({
-            "transaction_date": order.transaction_date.strftime('%Y-%m-%d'),
-            "value_date": order.value_date.strftime('%Y-%m-%d'),
-            "secured_forward_rate_export": secured_forward_rate if order.transaction_type in ["export", "sell"] else None,
-            "secured_forward_rate_import": secured_forward_rate if order.transaction_type in ["import", "buy"] else None,
-            "market_forward_rate_export": benchmark_rate if order.transaction_type in ["export", "sell"] else None,
-            "market_forward_rate_import": benchmark_rate if order.transaction_type in ["import", "buy"] else None,
-        })
-
-    return jsonify(forward_rate_data)
+    return jsonify(dashboard_cache.get_or_compute(
+        user_id, currency, "secured-vs-market-forward-rate",
+        lambda: forward_rate_rows(load_client_orders(user_id, currency)),
+    ))
 
 
 @user_bp.route('/api/dashboard/superperformance-trend', methods=['GET'])
@@ -797,25 +688,10 @@ def forward_rate_table():
 def superperformance_trend():
     user_id = get_jwt_identity()
     currency = request.args.get("currency", "USD").upper()
-
-    orders = Order.query.filter(
-        Order.user_id == user_id,
-        Order.currency == currency,
-        Order.status.in_(['Executed', 'Matched'])
-    ).order_by(Order.transaction_date).all()
-
-    if not orders:
-        return jsonify({"message": "No data available for this user"}), 200
-    trend_data = []
-    for order in orders:
-        trend_data.append({
-            "date": order.transaction_date.strftime('%Y-%m-%d'),
-            "execution_rate_export": order.execution_rate if order.transaction_type.lower() in ["export", "sell"] else None,
-            "execution_rate_import": order.execution_rate if order.transaction_type.lower() in ["import", "buy"] else None,
-            "interbank_rate": order.interbank_rate  
-        })
-
-    return jsonify(trend_data), 200
+    return jsonify(dashboard_cache.get_or_compute(
+        user_id, currency, "superperformance-trend",
+        lambda: superperformance_rows(load_client_orders(user_id, currency)),
+    )), 200
 
 from collections import defaultdict
 from typing import Iterable, Literal
@@ -863,77 +739,63 @@ def calculate_superformance_rate(
     total_days = len(groups)
     return (superformance_days / total_days * 100.0) if total_days else 0.0
 
-def compute_bank_gains(user_id, currency="USD"):
-    from collections import defaultdict
-    import math
+def _thousands(x, decimals=2):
+    return f"{x:,.{decimals}f}".replace(",", " ").replace(".", ",")
 
-    orders = (
-        Order.query
-        .filter(Order.user_id == user_id,
-                Order.currency == currency,
-                Order.status.in_(["Executed", "Matched"]))
-        .order_by(Order.transaction_date)
-        .all()
-    )
-
-    daily = defaultdict(lambda: {"gain": 0.0, "comm": 0.0})
-    cache = []
-
-    for o in orders:
-        bench = calculate_benchmark(o)
-        tx_type = o.transaction_type.lower()
-        is_import = tx_type in ("import", "buy")
-
-        if bench and o.execution_rate:
-            if is_import:
-                gain_pct = (bench - o.execution_rate) / o.execution_rate
-            else:
-                gain_pct = (o.execution_rate - bench) / bench
-            gain_tnd = gain_pct * o.original_amount * o.execution_rate
-        else:
-            gain_pct = gain_tnd = 0.0
+def _fmt_rate(r):
+    return "" if (r is None or math.isnan(r)) else f"{r:,.4f}".replace(",", " ").replace(".", ",")
 
-        comm_pct = o.commission_percent or 0.0
-        comm_tnd = o.execution_rate * o.original_amount * comm_pct
+def _fmt_pct(p):
+    return f"{p:.2f}%"
 
-        day = o.transaction_date
-        daily[day]["gain"] += gain_tnd
-        daily[day]["comm"] += comm_tnd
+def _num(x):
+    """float, or None for NaN / missing (JSON friendly)."""
+    return None if x is None or pd.isna(x) else float(x)
 
-        cache.append((o, bench, gain_pct, gain_tnd, comm_tnd))
+def compute_bank_gains(user_id, currency="USD", raw=False, orders_df=None):
+    """
+    Bank-gains table of one client.  Read-only: `commission_gain` is
+    persisted by the recompute job (see order_recompute).
+    raw=True returns numbers and ISO dates instead of formatted strings.
+    """
+    df = bank_gains_frame(user_id, currency, df=orders_df)
 
     rows = []
-    for o, bench, gain_pct, gain_tnd, comm_tnd in cache:
-        stats = daily[o.transaction_date]
-        ratio = float(stats["comm"]) / abs(float(stats["gain"])) * 100 if stats["gain"] else 0.0
-
-        o.commission_gain = ratio
-        db.session.add(o)
-
-        def thousands(x):  return f"{x:,.2f}".replace(",", " ").replace(".", ",")
-        fmt_eur  = lambda x: f" {thousands(x)}"
-        fmt_tnd  = lambda x: f"{thousands(x)} TND"
-        fmt_rate = lambda r: "" if (r is None or math.isnan(r)) else f"{r:,.4f}".replace(",", " ").replace(".", ",")
-        fmt_pct  = lambda p: f"{p:.2f}%"
-
+    for o in df.itertuples(index=False):
+        if raw:
+            rows.append({
+                "Date Transaction": o.transaction_date.isoformat(),
+                "Date Valeur": o.value_date.isoformat(),
+                "Devise": o.currency,
+                "Type": o.transaction_type.title(),
+                "Type d’opération": o.trade_type.title(),
+                "Montant": _num(o.original_amount),
+                "Taux d’exécution": _num(o.execution_rate),
+                "Banque": o.bank_name or "N/A",
+                "Taux de référence *": _num(o.benchmark),
+                "% Gain": o.gain_pct * 100,
+                "Gain**": o.gain_tnd,
+                "Commission CC ***": o.commission_tnd,
+                "Commission Percent": (_num(o.commission_percent) or 0.0) * 100,
+                "Commission % de gain": o.commission_gain,
+            })
+            continue
         rows.append({
             "Date Transaction": o.transaction_date.strftime("%-d/%-m/%Y"),
             "Date Valeur": o.value_date.strftime("%-d/%-m/%Y"),
             "Devise": o.currency,
             "Type": o.transaction_type.title(),
             "Type d’opération": o.trade_type.title(),
-            "Montant": fmt_eur(o.original_amount),
-            "Taux d’exécution": fmt_rate(o.execution_rate),
+            "Montant": f" {_thousands(o.original_amount)}",
+            "Taux d’exécution": _fmt_rate(_num(o.execution_rate)),
             "Banque": o.bank_name or "N/A",
-            "Taux de référence *": fmt_rate(bench),
-            "% Gain": fmt_pct(gain_pct * 100),
-            "Gain**": fmt_tnd(gain_tnd),
-            "Commission CC ***": fmt_tnd(comm_tnd),
-            "Commission Percent": fmt_pct((o.commission_percent or 0.0) * 100),
-            "Commission % de gain": fmt_pct(ratio)
+            "Taux de référence *": _fmt_rate(o.benchmark),
+            "% Gain": _fmt_pct(o.gain_pct * 100),
+            "Gain**": f"{_thousands(o.gain_tnd)} TND",
+            "Commission CC ***": f"{_thousands(o.commission_tnd)} TND",
+            "Commission Percent": _fmt_pct((_num(o.commission_percent) or 0.0) * 100),
+            "Commission % de gain": _fmt_pct(o.commission_gain),
         })
-
-    db.session.commit()
     return rows
 
 @user_bp.route('/api/dashboard/bank-gains', methods=['GET'])
@@ -941,125 +803,111 @@ def compute_bank_gains(user_id, currency="USD"):
 def bank_gains():
     uid = get_jwt_identity()
     currency = request.args.get("currency", "USD").upper()
-    rows = compute_bank_gains(uid, currency)
+    raw = request.args.get("format") == "raw"
+    rows = dashboard_cache.get_or_compute(
+        uid, currency, "bank-gains-raw" if raw else "bank-gains",
+        lambda: compute_bank_gains(uid, currency, raw=raw)
+    )
     return jsonify(rows), 200
 
+DASHBOARD_WIDGETS = ["summary", "secured-vs-market-forward-rate",
+                     "superperformance-trend", "bank-gains"]
+
+@user_bp.route('/api/dashboard/bootstrap', methods=['GET'])
+@jwt_required()
+def dashboard_bootstrap():
+    """
+    All dashboard widgets in one call: the order set is loaded and priced
+    once and shared by every payload.
+    ?include=summary,bank-gains  (default: all widgets)
+    ?format=raw                  numeric bank-gains rows
+    A widget that cannot be computed returns {"error": ...} in its slot.
+    """
+    user_id  = get_jwt_identity()
+    currency = request.args.get('currency', 'USD').upper()
+    raw = request.args.get("format") == "raw"
+    include = [w.strip() for w in request.args.get("include", "").split(",") if w.strip()] \
+        or DASHBOARD_WIDGETS
+    unknown = [w for w in include if w not in DASHBOARD_WIDGETS]
+    if unknown:
+        return jsonify({"error": f"Unknown widgets: {unknown}",
+                        "available": DASHBOARD_WIDGETS}), 400
+
+    frame = {}
+    def orders():
+        if "df" not in frame:
+            frame["df"] = price_orders(load_client_orders(user_id, currency))
+        return frame["df"]
+
+    builders = {
+        "summary": lambda: summarize(enrich_orders(orders()), currency),
+        "secured-vs-market-forward-rate": lambda: forward_rate_rows(orders()),
+        "superperformance-trend": lambda: superperformance_rows(orders()),
+        "bank-gains": lambda: compute_bank_gains(user_id, currency, raw=raw, orders_df=orders()),
+    }
+    payload = {"currency": currency}
+    for widget in include:
+        key = "bank-gains-raw" if widget == "bank-gains" and raw else widget
+        try:
+            payload[widget] = dashboard_cache.get_or_compute(user_id, currency, key, builders[widget])
+        except ValueError as e:
+            payload[widget] = {"error": str(e)}
+    return jsonify(payload), 200
+
 def is_hedged(order) -> bool:
     """A deal is hedged whenever it is *not* a spot."""
     return (order.trade_type or "").lower() in ("forward", "option")
 
 
 def calculate_benchmark(order):
-     # ------------------------------------------------------------------
-    # 1) Interbank spot on the trade date
-    # ------------------------------------------------------------------
-    ib_rate = order.interbank_rate or get_interbank_rate_from_db(
-        order.transaction_date, order.currency
-    )
-    if ib_rate is None:
-        raise ValueError(
-            f"Aucun taux interbancaire pour {order.currency} "
-            f"le {order.transaction_date}"
-        )
-    # ------------------------------------------------------------------
-    # 2) Historical‑loss factor
-    # ------------------------------------------------------------------
-    hl = getattr(order, "historical_loss", None)
-    if hl is None:
-        raise ValueError("Historical loss manquant : impossible de calculer le benchmark")
-
-    side = order.transaction_type.lower()
-    if side in ("import", "buy"):
-        base_bmk = ib_rate * (1 + hl)
-    elif side in ("export", "sell"):
-        base_bmk = ib_rate * (1 - hl)
-    else:
-        raise ValueError(f"Type de transaction non supporté : {order.transaction_type}")
-    # ------------------------------------------------------------------
-    # 3) Forward adjustment *only* for forward & option trades
-    # ------------------------------------------------------------------
-    if order.trade_type in ("forward", "option"):
-        # days = (order.value_date - order.transaction_date).days
-        days = (order.value_date - order.transaction_date).days - 2
-        period = get_yield_period(days)                    # '1m' | '3m' | '6m'
-        p_key  = {"1m": "1M", "3m": "3M", "6m": "6M"}[period]
-
-        ed = pd.read_sql(
-            'SELECT * FROM exchange_data WHERE "Date" = %(d)s',
-            db.engine,
-            params={"d": order.transaction_date.strftime("%Y-%m-%d")}
-        )
-        if ed.empty:
-            raise ValueError(f"Aucune donnée de taux pour {order.transaction_date}")
-
-        if order.currency.upper() == "USD":
-            y_foreign = ed[f"{p_key} USD"].iloc[0]
-        elif order.currency.upper() == "EUR":
-            y_foreign = ed[f"{p_key} EUR"].iloc[0]
-        else:
-            raise ValueError("Devise non supportée pour les yields")
-
-        y_domestic = ed[f"{p_key} TND"].iloc[0]
-        return calculate_forward_rate(base_bmk, y_foreign, y_domestic, days)
-    return base_bmk
+    """Benchmark rate of a single order (see `compute_benchmarks`)."""
+    return float(compute_benchmarks([order])[0])
 
 
 from flask import current_app
 
 def get_interbank_rate_from_db(date, currency):
-    rate_entry = InterbankRate.query.filter_by(date=date, currency=currency).first()
-    if rate_entry:
-        return rate_entry.rate
-    rate_entry = InterbankRate.query.filter(
-        InterbankRate.date < date,
-        InterbankRate.currency == currency
-    ).order_by(InterbankRate.date.desc()).first()
-    if rate_entry:
-        return rate_entry.rate
-    return None
-
-# Helper: Fetch interbank rate from external source (e.g., BCT website)
-def fetch_rate_for_date_and_currency(date, currency):
-    formatted_date = date.strftime('%Y-%m-%d')
-    response = requests.post(f"https://www.bct.gov.tn/bct/siteprod/cours_archiv.jsp?input={formatted_date}&langue=en")
-    soup = BeautifulSoup(response.content, 'html.parser')
-    rate = None
-    rows = soup.find_all('tr')
-    for row in rows:
-        cells = row.find_all('td')
-        if cells and cells[1].get_text(strip=True).lower() == currency.lower():
-            rate = float(cells[3].get_text(strip=True).replace(',', '.'))
-            break
+    """Interbank rate on `date`, or on the latest earlier date (as-of index)."""
+    rate, _ = interbank_index.asof(date, currency)
     return rate
 
+# Helper: published BCT interbank rate of one date (DB, then the market data provider:
+# archived page, then BCT website)
+def fetch_rate_for_date_and_currency(date, currency):
+    rate, _ = interbank_index.asof(date, currency, max_shift=0)
+    if rate is not None:
+        return rate
+    try:
+        return get_market_provider().fixings(date, require=currency).get(currency.upper())
+    except requests.RequestException as e:
+        print(f"BCT fetch failed for {date} {currency}: {e}")
+        return None
+
 def update_interbank_rates_db_logic(start_date_str="2020-01-01"):
-    from datetime import datetime, timedelta
+    from datetime import datetime
     try:
         start_date = datetime.strptime(start_date_str, "%Y-%m-%d").date()
     except ValueError:
         print("Invalid start_date format, expected YYYY-MM-DD")
         return {"error": "Invalid start_date format, expected YYYY-MM-DD"}
 
-    end_date = datetime.today().date()
-    currencies = ["USD", "EUR"]  
-    updated_entries = []
-
-    for n in range((end_date - start_date).days + 1):
-        current_date = start_date + timedelta(days=n)
-        for currency in currencies:
-            if not InterbankRate.query.filter_by(date=current_date, currency=currency).first():
-                rate = fetch_rate_for_date_and_currency(current_date, currency)
-                if rate:
-                    new_rate = InterbankRate(date=current_date, currency=currency, rate=rate)
-                    db.session.add(new_rate)
-                    updated_entries.append({
-                        "date": current_date.isoformat(),
-                        "currency": currency,
-                        "rate": rate
-                    })
+    currencies = ["USD", "EUR"]
+    debug_messages = []
     try:
+        inserted = backfill_interbank_rates(start_date, currencies=currencies,
+                                            debug_messages=debug_messages)
+        updated_entries = [
+            {"date": e["date"].isoformat(), "currency": e["currency"], "rate": e["rate"]}
+            for e in inserted
+        ]
+        if inserted:
+            since = min(e["date"] for e in inserted)
+            mark_dirty_for_interbank({e["currency"] for e in inserted}, since)
         db.session.commit()
-        print("Interbank rates DB updated successfully", updated_entries)
+        if inserted:
+            interbank_index.refresh(since=since)
+            market_archive.update("interbank", since=since)
+        print("Interbank rates DB updated successfully", updated_entries, debug_messages)
         return {"message": "Interbank rates DB updated successfully", "updated": updated_entries}
     except Exception as e:
         db.session.rollback()
@@ -1075,33 +923,60 @@ def update_interbank_rates_db_endpoint():
         return jsonify(result), 400
     return jsonify(result), 200
 
+@user_bp.route('/reparse-interbank-archive', methods=['POST'])
+def reparse_interbank_archive_endpoint():
+    """
+    Load rates of extra currencies (e.g. GBP, JPY) from the archived BCT
+    pages, without hitting the site.
+    Body: {"currencies": ["GBP", "JPY"], "start_date": "2024-08-01", "end_date": "..."}
+    """
+    from datetime import datetime
+    data = request.get_json() or {}
+    currencies = [c.upper() for c in data.get("currencies", [])]
+    if not currencies:
+        return jsonify({"error": "currencies is required"}), 400
+    try:
+        start = datetime.strptime(data["start_date"], "%Y-%m-%d").date() if data.get("start_date") else None
+        end = datetime.strptime(data["end_date"], "%Y-%m-%d").date() if data.get("end_date") else None
+    except ValueError:
+        return jsonify({"error": "Invalid date format, expected YYYY-MM-DD"}), 400
+
+    inserted = reparse_interbank_archive(currencies, start, end)
+    if inserted:
+        since = min(e["date"] for e in inserted)
+        mark_dirty_for_interbank({e["currency"] for e in inserted}, since)
+    db.session.commit()
+    if inserted:
+        interbank_index.refresh(since=since)
+        market_archive.update("interbank", since=since)
+    return jsonify({"message": "Archive re-parsed", "inserted": len(inserted)}), 200
+
 @user_bp.route('/update-interbank-rates', methods=['POST'])
 def update_interbank_rates():
     try:
-        update_order_interbank_and_benchmark_rates(current_app)
+        full = request.args.get('full', '0') == '1'
+        update_order_interbank_and_benchmark_rates(current_app, full=full)
         return jsonify({'message': 'Orders updated with interbank & benchmark rates successfully'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-def update_order_interbank_and_benchmark_rates(app):
+def update_order_interbank_and_benchmark_rates(app, full=False):
+    """
+    Re-benchmark only the orders flagged dirty (creation, execution, or a
+    change of the interbank / exchange data of their trade date) and persist
+    interbank_rate, benchmark_rate, gain and gain_percentage.
+    """
     with app.app_context():
         try:
-            orders = Order.query.all()
-            for order in orders:
-                if order.interbank_rate is None:
-                    rate = get_interbank_rate_from_db(order.transaction_date, order.currency)
-                    if rate:
-                        order.interbank_rate = float(rate)
-                try:
-                    benchmark = calculate_benchmark(order)
-                    order.benchmark_rate = float(benchmark)
-                except Exception as ex:
-                    print(f"Error calculating benchmark for Order ID {order.id}: {ex}")
-
-                db.session.add(order)
-
+            errors = []
+            result = recompute_dirty_orders(full=full, errors=errors)
+            for msg in errors:
+                print(f"Error calculating benchmark for {msg}")
+            print(f"Orders successfully updated: {result['updated']}/{result['processed']}")
+            refresh_daily_stats(result["day_keys"])
             db.session.commit()
-            print("Orders successfully updated")
+            dashboard_cache.invalidate_users(result["user_ids"])
+            return result
 
         except Exception as e:
             db.session.rollback()
@@ -1175,7 +1050,7 @@ def preview_option():
         return jsonify({"message": "Preview is only available for options"}), 400
 
     today = datetime.today().date()
-    exchange_data = ExchangeData.query.filter_by(date=today).first()
+    exchange_data = market_data.get(today)
     if not exchange_data:
         return jsonify({"message": "Exchange data for today not available"}), 400
     days_diff = (value_date.date() - today).days
@@ -1246,6 +1121,44 @@ def get_interbank_rates():
         return jsonify(result), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+@user_bp.route('/api/exchange-data/hourly', methods=['GET'])
+@jwt_required()
+def get_hourly_spot():
+    """
+    Hourly midmarket spot for intraday charts.
+    ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: the last 7 days), ?currency=USD|EUR
+    """
+    try:
+        end = datetime.strptime(request.args["end"], "%Y-%m-%d").date() if request.args.get("end") else date.today()
+        start = datetime.strptime(request.args["start"], "%Y-%m-%d").date() if request.args.get("start") \
+            else end - timedelta(days=7)
+    except ValueError:
+        return jsonify({"error": "Dates must be YYYY-MM-DD"}), 400
+    currency = request.args.get("currency", "USD").upper()
+    if currency not in ("USD", "EUR"):
+        return jsonify({"error": "currency must be USD or EUR"}), 400
+
+    # memory-mapped archive first, the database when it is not built
+    field = "spot_usd" if currency == "USD" else "spot_eur"
+    data = market_archive.window("spot_hourly", start, end + timedelta(days=1), [field])
+    if data is not None:
+        ok = ~np.isnan(data[field])
+        ts = data["t"][ok].astype("datetime64[s]").astype(object)
+        return jsonify([{"timestamp": t.isoformat(), "spot": v}
+                        for t, v in zip(ts, data[field][ok].tolist())]), 200
+
+    column = getattr(ExchangeSpotHourly, field)
+    rows = (
+        db.session.query(ExchangeSpotHourly.timestamp, column)
+        .filter(ExchangeSpotHourly.timestamp >= datetime.combine(start, datetime.min.time()),
+                ExchangeSpotHourly.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()),
+                column.isnot(None))
+        .order_by(ExchangeSpotHourly.timestamp)
+        .all()
+    )
+    return jsonify([{"timestamp": ts.isoformat(), "spot": v} for ts, v in rows]), 200
+
+
 # ─── convenience flag ─────────────────────────────────────────
 @property
 def is_admin(self) -> bool:
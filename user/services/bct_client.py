@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import os
+import tempfile
+from datetime import date
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Override to point the backfill at a mirror / local stub server
+BCT_ARCHIVE_URL = os.getenv(
+    "BCT_ARCHIVE_URL", "https://www.bct.gov.tn/bct/siteprod/cours_archiv.jsp"
+)
+BCT_TIMEOUT = (5, 20)          # (connect, read) seconds
+# Raw pages are kept here so they can be re-parsed without hitting the site
+BCT_ARCHIVE_DIR = os.getenv("BCT_ARCHIVE_DIR", "/app/data/bct_archive")
+
+
+# ---------------------------------------------------------------------------
+# on-disk page archive
+# ---------------------------------------------------------------------------
+class PageArchive:
+    """
+    Content-addressed archive of raw `cours_archiv.jsp` pages.
+
+        objects/ab/abcd….html.gz   gzip'd page, named by the sha256 of its bytes
+        dates/2025-01-03           sha256 of the latest page fetched for that date
+
+    Identical pages are stored once; writes go through a temp file +
+    rename so concurrent fetchers never leave a partial object behind.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or BCT_ARCHIVE_DIR
+
+    def _object_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], f"{digest}.html.gz")
+
+    def _date_path(self, day):
+        return os.path.join(self.root, "dates", day.isoformat())
+
+    @staticmethod
+    def _atomic_write(path, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+
+    def put(self, day, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        obj = self._object_path(digest)
+        if not os.path.exists(obj):
+            self._atomic_write(obj, gzip.compress(content))
+        self._atomic_write(self._date_path(day), digest.encode())
+        return digest
+
+    def get(self, day):
+        """Raw page archived for `day`, or None."""
+        try:
+            with open(self._date_path(day)) as fh:
+                digest = fh.read().strip()
+            with gzip.open(self._object_path(digest), "rb") as fh:
+                return fh.read()
+        except (FileNotFoundError, OSError):
+            return None
+
+    def days(self, start=None, end=None):
+        """Archived dates, sorted, optionally restricted to [start, end]."""
+        try:
+            names = os.listdir(os.path.join(self.root, "dates"))
+        except FileNotFoundError:
+            return []
+        out = []
+        for name in names:
+            try:
+                d = date.fromisoformat(name)
+            except ValueError:
+                continue
+            if (start is None or d >= start) and (end is None or d <= end):
+                out.append(d)
+        return sorted(out)
+
+
+page_archive = PageArchive()
+
+
+def make_session(pool_size=4, retries=3) -> requests.Session:
+    """HTTP session with a connection pool sized for the worker pool and
+    retries with backoff on connection errors / 429 / 5xx."""
+    retry = Retry(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def parse_bct_rates(html) -> dict:
+    """
+    All currency rows of a `cours_archiv.jsp` page -> {"USD": 3.1234, ...}.
+    Column 1 holds the currency code and column 3 the rate.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    rates = {}
+    for row in soup.find_all("tr"):
+        cells = row.find_all("td")
+        if len(cells) < 4:
+            continue
+        code = cells[1].get_text(strip=True).upper()
+        if code in rates:
+            continue
+        try:
+            rates[code] = float(cells[3].get_text(strip=True).replace(",", "."))
+        except ValueError:
+            continue
+    return rates
+
+
+# ---------------------------------------------------------------------------
+# fetching
+# ---------------------------------------------------------------------------
+def fetch_bct_page(day, session=None, base_url=None, archive=page_archive) -> bytes:
+    """Download the page of one date (and keep a copy in `archive`)."""
+    http = session or requests
+    response = http.post(
+        base_url or BCT_ARCHIVE_URL,
+        params={"input": day.strftime("%Y-%m-%d"), "langue": "en"},
+        timeout=BCT_TIMEOUT,
+    )
+    response.raise_for_status()
+    if archive is not None:
+        try:
+            archive.put(day, response.content)
+        except OSError as e:
+            print(f"BCT archive write failed for {day}: {e}")
+    return response.content
+
+
+def fetch_bct_rates(day, session=None, base_url=None, archive=page_archive) -> dict:
+    """Every rate published for `day`, freshly downloaded (empty dict when none)."""
+    return parse_bct_rates(fetch_bct_page(day, session=session, base_url=base_url, archive=archive))
+
+
+def bct_rates(day, archive=page_archive, require=None, recent_days=3) -> dict:
+    """
+    Every rate of `day`, from the archived page when there is one.
+    A recent archived page missing the `require`d currency may have been
+    fetched before publication, so it is downloaded again.
+    """
+    page = archive.get(day) if archive is not None else None
+    if page is not None:
+        rates = parse_bct_rates(page)
+        if require is None or require.upper() in rates \
+                or (date.today() - day).days > recent_days:
+            return rates
+    return fetch_bct_rates(day, archive=archive)
@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+from models import BctxFixing
+from .bulk_write import upsert_rows
+from .bctx_ticks import bctx_ticks
+
+# bctx_fixings column -> (RIC, side) found in the flattened Eikon column names,
+# e.g. "('EURTNDX=BCTX', 'BID')"
+BCTX_FIELDS = {
+    "tnd_bid": ("TND=BCTX", "BID"),
+    "tnd_ask": ("TND=BCTX", "ASK"),
+    "eur_bid": ("EURTNDX=BCTX", "BID"),
+    "eur_ask": ("EURTNDX=BCTX", "ASK"),
+    "gbp_bid": ("GBPTNDX=BCTX", "BID"),
+    "gbp_ask": ("GBPTNDX=BCTX", "ASK"),
+    "jpy_bid": ("JPYTNDX=BCTX", "BID"),
+    "jpy_ask": ("JPYTNDX=BCTX", "ASK"),
+}
+SESSION_KEY = ["date", "session"]
+FIXING_COLUMNS = SESSION_KEY + ["original_timestamp"] + list(BCTX_FIELDS)
+
+# records turned into a DataFrame at a time
+RECORD_CHUNK = 50_000
+
+
+def bctx_columns(keys) -> dict:
+    """
+    Map "timestamp" and every BCTX_FIELDS entry to the record key holding
+    it (None when absent): the first key containing both the RIC and the
+    side, and "Timestamp" or else the first key containing it.
+    """
+    keys = list(keys)
+    columns = {
+        "timestamp": "Timestamp" if "Timestamp" in keys
+        else next((k for k in keys if "Timestamp" in k), None)
+    }
+    for field, (ric, side) in BCTX_FIELDS.items():
+        columns[field] = next((k for k in keys if ric in k and side in k), None)
+    return columns
+
+
+def _ticks(records, columns) -> pd.DataFrame:
+    """Dated ticks of `records`: original_timestamp + BCTX_FIELDS columns."""
+    present = {field: key for field, key in columns.items() if key is not None}
+    df = pd.DataFrame(records, columns=list(dict.fromkeys(present.values())))
+    df = pd.DataFrame({field: df[key] for field, key in present.items()})
+    ts = pd.to_datetime(
+        df["timestamp"].astype("string").str.replace("Z", "", regex=False),
+        errors="coerce", format="ISO8601",
+    )
+    out = pd.DataFrame({"original_timestamp": ts})
+    for field in BCTX_FIELDS:
+        out[field] = pd.to_numeric(df[field], errors="coerce") if field in df else np.nan
+    return out[ts.notna()]
+
+
+def _sessions(ticks) -> pd.DataFrame:
+    """Last tick of each (date, session), before noon being "morning"."""
+    ts = ticks["original_timestamp"]
+    out = ticks.assign(
+        date=ts.dt.date,
+        session=np.where(ts.dt.hour < 12, "morning", "afternoon"),
+    )
+    return out.drop_duplicates(SESSION_KEY, keep="last")
+
+
+def _store_ticks(ticks, store):
+    ts = ticks["original_timestamp"]
+    secs = (ts - ts.dt.normalize()).dt.total_seconds().astype("int32")
+    for day, idx in ticks.groupby(ts.dt.date).indices.items():
+        try:
+            store.put(day, secs.iloc[idx].to_numpy(),
+                      {f: ticks[f].iloc[idx].to_numpy() for f in BCTX_FIELDS})
+        except OSError as e:            # the fixings are still written
+            print(f"BCTX tick store write failed for {day}: {e}")
+
+
+def bctx_session_frame(records, chunk=RECORD_CHUNK, store=None):
+    """
+    Reduce a stream of 1-minute BCTX records to one row per (date,
+    session) – the last tick of the session in file order – `chunk`
+    records at a time.  The column mapping is resolved once, from the
+    first record.  With a tick `store` every dated tick is also kept
+    there for the intraday benchmarks.
+
+    Returns (frame with FIXING_COLUMNS, number of records with a valid timestamp).
+    """
+    sessions, count = [], 0
+    columns, batch = None, []
+
+    def flush():
+        nonlocal count
+        ticks = _ticks(batch, columns)
+        sessions.append(_sessions(ticks))
+        if store is not None and not ticks.empty:
+            _store_ticks(ticks, store)
+        count += len(ticks)
+        batch.clear()
+
+    for rec in records:
+        if columns is None:
+            columns = bctx_columns(rec.keys())
+            if columns["timestamp"] is None:
+                raise ValueError("BCTX records have no Timestamp column")
+        batch.append(rec)
+        if len(batch) >= chunk:
+            flush()
+    if batch:
+        flush()
+    if not sessions:
+        return pd.DataFrame(columns=FIXING_COLUMNS), 0
+    df = pd.concat(sessions, ignore_index=True).drop_duplicates(SESSION_KEY, keep="last")
+    return df[FIXING_COLUMNS].sort_values(SESSION_KEY, ignore_index=True), count
+
+
+def upsert_bctx_records(records, debug_messages=None, store=bctx_ticks):
+    """
+    Write the session fixings of `records` to bctx_fixings in one
+    INSERT ... ON CONFLICT (date, session) DO UPDATE batch, and the ticks
+    themselves to the intraday tick `store`.  Caller commits.
+    Returns (records with a valid timestamp, sessions written).
+    """
+    debug_messages = debug_messages if debug_messages is not None else []
+    df, ticks = bctx_session_frame(records, store=store)
+    rows = [
+        {k: (None if isinstance(v, float) and np.isnan(v) else v) for k, v in r.items()}
+        for r in df.to_dict("records")
+    ]
+    for r in rows:
+        r["original_timestamp"] = r["original_timestamp"].to_pydatetime()
+    upsert_rows(BctxFixing, rows, SESSION_KEY)
+    debug_messages.append(f"{ticks} ticks reduced to {len(rows)} session fixings")
+    return ticks, len(rows)
@@ -0,0 +1,189 @@
+import os
+import tempfile
+from datetime import time
+from functools import lru_cache
+
+import numpy as np
+
+# One compressed .npz per day: "t" (int32 seconds since midnight, sorted)
+# and one float32 array per bctx field ("tnd_bid", "eur_ask", ...)
+BCTX_TICK_DIR = os.getenv("BCTX_TICK_DIR", "/app/data/bctx_ticks")
+
+# currency -> prefix of its bctx columns (bctx_fixings and the tick files)
+CURRENCY_PREFIX = {"USD": "tnd", "EUR": "eur", "GBP": "gbp", "JPY": "jpy"}
+
+# same split as the morning/afternoon fixings
+SESSIONS = {"morning": (0, 12 * 3600), "afternoon": (12 * 3600, 24 * 3600)}
+
+
+def seconds(value) -> int:
+    """Seconds since midnight of a time, datetime or "HH:MM[:SS]" string (ints pass through)."""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, str):
+        value = time.fromisoformat(value)
+    return value.hour * 3600 + value.minute * 60 + value.second
+
+
+@lru_cache(maxsize=256)
+def _read(path, mtime_ns):
+    with np.load(path) as npz:
+        return {k: npz[k] for k in npz.files}
+
+
+class TickStore:
+    """
+    Intraday BCTX quotes, one file per day under `root`:
+
+        2025/2025-03-14.npz
+
+    Writes merge with what is stored (a newer tick at the same second
+    wins) and go through a temp file + rename; reads are cached until the
+    file changes.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or BCTX_TICK_DIR
+
+    def _path(self, day):
+        return os.path.join(self.root, f"{day.year:04d}", f"{day.isoformat()}.npz")
+
+    def load(self, day):
+        """{"t": ..., field: ...} arrays of `day`, or None."""
+        path = self._path(day)
+        try:
+            return _read(path, os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def put(self, day, t, fields):
+        """Merge the ticks (`t` seconds, `fields` name -> values) of one day."""
+        t = np.asarray(t, dtype=np.int32)
+        fields = {k: np.asarray(v, dtype=np.float32) for k, v in fields.items()}
+        old = self.load(day)
+        if old is not None:
+            names = sorted(set(fields) | (set(old) - {"t"}))
+            nan_old = np.full(len(old["t"]), np.nan, dtype=np.float32)
+            nan_new = np.full(len(t), np.nan, dtype=np.float32)
+            fields = {k: np.concatenate([old.get(k, nan_old), fields.get(k, nan_new)]) for k in names}
+            t = np.concatenate([old["t"], t])
+        # stable sort, then keep the last (newest) tick of each second
+        order = np.argsort(t, kind="stable")
+        t = t[order]
+        keep = np.append(t[1:] != t[:-1], True)
+        arrays = {"t": t[keep], **{k: v[order][keep] for k, v in fields.items()}}
+
+        path = self._path(day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        with os.fdopen(fd, "wb") as fh:
+            np.savez_compressed(fh, **arrays)
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------------
+    # benchmarks
+    # ------------------------------------------------------------------
+    def series(self, day, currency, side="mid"):
+        """(t, values) of one currency and side ("bid", "ask" or "mid"), NaN ticks dropped."""
+        data = self.load(day)
+        prefix = CURRENCY_PREFIX.get(currency.upper())
+        if data is None or prefix is None:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        if side == "mid":
+            bid, ask = data.get(f"{prefix}_bid"), data.get(f"{prefix}_ask")
+            values = (bid + ask) / 2 if bid is not None and ask is not None else None
+        else:
+            values = data.get(f"{prefix}_{side}")
+        if values is None:
+            return np.empty(0, np.int32), np.empty(0, np.float32)
+        ok = np.isfinite(values)
+        return data["t"][ok], values[ok]
+
+    def twap(self, day, currency, start, end, side="mid"):
+        """
+        Time-weighted average over [start, end) (seconds or times): each
+        tick is in force until the next one, the last one until `end`; the
+        tick in force at `start` counts from `start`.  None without ticks.
+        """
+        t, v = self.series(day, currency, side)
+        a, b = seconds(start), seconds(end)
+        i0 = max(np.searchsorted(t, a, side="right") - 1, 0)
+        i1 = np.searchsorted(t, b, side="left")
+        if i1 <= i0:
+            return None
+        seg_t, seg_v = t[i0:i1].astype(np.int64), v[i0:i1].astype(np.float64)
+        starts = np.maximum(seg_t, a)
+        ends = np.append(seg_t[1:], b)
+        weights = ends - starts
+        if weights.sum() <= 0:
+            return float(seg_v[-1])
+        return float((seg_v * weights).sum() / weights.sum())
+
+    def nearest(self, day, currency, at, side="mid"):
+        """Value of the tick closest to `at` (seconds or a time; the earlier one on a tie), None without ticks."""
+        value = self.nearest_many([day], [currency], at, side)[0]
+        return None if np.isnan(value) else float(value)
+
+    def high_low(self, day, currency, session=None, side="mid", start=None, end=None):
+        """(high, low) over a session ("morning"/"afternoon"), a [start, end) window or the day."""
+        t, v = self.series(day, currency, side)
+        if session is not None:
+            start, end = SESSIONS[session]
+        lo = 0 if start is None else np.searchsorted(t, seconds(start))
+        hi = len(t) if end is None else np.searchsorted(t, seconds(end))
+        if hi <= lo:
+            return None, None
+        window = v[lo:hi]
+        return float(window.max()), float(window.min())
+
+    # ------------------------------------------------------------------
+    # batches (one value per deal, each day/currency computed once)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _per_pair(days, currencies, compute):
+        pairs = list(zip(days, currencies))
+        done = {pair: compute(*pair) for pair in set(pairs)}
+        return [done[pair] for pair in pairs]
+
+    def twap_many(self, days, currencies, start, end, side="mid"):
+        """`twap` of each (trade date, currency) pair; NaN where None."""
+        values = self._per_pair(days, currencies, lambda d, c: self.twap(d, c, start, end, side))
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    def nearest_many(self, days, currencies, times, side="mid"):
+        """
+        `nearest` of each (trade date, currency) pair at `times` (one time
+        for all, or one per pair): a searchsorted over each day's ticks,
+        NaN where the day has none.
+        """
+        days, currencies = list(days), list(currencies)
+        if np.ndim(times) == 0:
+            at = np.full(len(days), seconds(times), dtype=np.int64)
+        else:
+            at = np.array([seconds(x) for x in times], dtype=np.int64)
+        out = np.full(len(days), np.nan)
+        groups = {}
+        for i, pair in enumerate(zip(days, currencies)):
+            groups.setdefault(pair, []).append(i)
+        for (day, currency), rows in groups.items():
+            t, v = self.series(day, currency, side)
+            if not len(t):
+                continue
+            rows = np.asarray(rows)
+            x = at[rows]
+            right = np.minimum(np.searchsorted(t, x), len(t) - 1)
+            left = np.maximum(right - 1, 0)
+            t = t.astype(np.int64)
+            pick = np.where(np.abs(x - t[left]) <= np.abs(t[right] - x), left, right)
+            out[rows] = v[pick]
+        return out
+
+    def high_low_many(self, days, currencies, session=None, side="mid", start=None, end=None):
+        """`high_low` of each (trade date, currency) pair as (highs, lows) arrays; NaN where None."""
+        values = self._per_pair(days, currencies,
+                                lambda d, c: self.high_low(d, c, session, side, start, end))
+        out = np.array(values, dtype=float).reshape(len(values), 2)
+        return out[:, 0], out[:, 1]
+
+
+bctx_ticks = TickStore()
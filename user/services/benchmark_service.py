@@ -0,0 +1,144 @@
+import numpy as np
+import pandas as pd
+from .market_data_store import market_data, to_day_array
+from .interbank_index import interbank_index
+
+# Columns of `Order` needed to price a benchmark
+BENCHMARK_COLUMNS = [
+    "id", "currency", "transaction_type", "trade_type",
+    "transaction_date", "value_date", "interbank_rate", "historical_loss",
+]
+
+# tenor index 0/1/2  <->  '1m' / '3m' / '6m'
+YIELD_ATTRS = {
+    "USD": ["usd_1m", "usd_3m", "usd_6m"],
+    "EUR": ["eur_1m", "eur_3m", "eur_6m"],
+    "TND": ["tnd_1m", "tnd_3m", "tnd_6m"],
+}
+
+
+def calculate_forward_rate(spot_rate, yield_foreign, yield_domestic, days):
+    return spot_rate * ((1 + yield_domestic  * days / 360) / (1 + yield_foreign * days / 360))
+
+
+def get_yield_period(days):
+    if days <= 60:
+        return '1m'
+    elif days <= 120:
+        return '3m'
+    else:
+        return '6m'
+
+
+def yield_period_index(days):
+    """Vectorised `get_yield_period`: 0 -> '1m', 1 -> '3m', 2 -> '6m'."""
+    days = np.asarray(days)
+    return np.where(days <= 60, 0, np.where(days <= 120, 1, 2))
+
+
+def orders_frame(orders) -> pd.DataFrame:
+    """
+    Columnar view of `orders` (ORM objects or an existing DataFrame)
+    restricted to the fields the benchmark needs.
+    """
+    if isinstance(orders, pd.DataFrame):
+        return orders
+    return pd.DataFrame(
+        [{c: getattr(o, c, None) for c in BENCHMARK_COLUMNS} for o in orders],
+        columns=BENCHMARK_COLUMNS,
+    )
+
+
+# ---------------------------------------------------------------------------
+# reference data (served from the in-memory indexes)
+# ---------------------------------------------------------------------------
+def interbank_asof(currencies: np.ndarray, days: np.ndarray) -> np.ndarray:
+    """Interbank rate on `days` (or the latest earlier date) for each currency."""
+    rates, _ = interbank_index.asof_many(currencies, days)
+    return rates
+
+
+# ---------------------------------------------------------------------------
+# batch benchmark
+# ---------------------------------------------------------------------------
+def compute_benchmarks(orders, strict=True, errors=None) -> np.ndarray:
+    """
+    Benchmark rate for every order in `orders` (list of `Order` or a DataFrame
+    with BENCHMARK_COLUMNS), computed as NumPy vectors.
+
+      • base      = interbank * (1 ± historical_loss)   (+ for import/buy)
+      • forward / option trades are carried with the 1M/3M/6M yields of the
+        trade date over (value_date - transaction_date - 2) days.
+
+    strict=True  → raises ValueError for the first order that cannot be priced
+                   (same messages as the former per-order helper).
+    strict=False → leaves NaN for those orders and appends the reason to
+                   `errors` (if a list is given).
+    """
+    df = orders_frame(orders)
+    n = len(df)
+    bench = np.full(n, np.nan)
+    if not n:
+        return bench
+
+    failures = np.full(n, None, dtype=object)
+
+    def _fail(mask, message):
+        for i in np.flatnonzero(mask & pd.isna(failures)):
+            failures[i] = message(i)
+
+    currency = df["currency"].fillna("").astype(str).str.upper().to_numpy()
+    side = df["transaction_type"].fillna("").astype(str).str.lower().to_numpy()
+    trade = df["trade_type"].fillna("").astype(str).to_numpy()
+    tx_day = to_day_array(df["transaction_date"])
+    val_day = to_day_array(df["value_date"])
+    tx_label = df["transaction_date"].to_numpy()
+
+    # 1) interbank spot on the trade date -----------------------------------
+    ib = pd.to_numeric(df["interbank_rate"], errors="coerce").to_numpy(dtype=float, copy=True)
+    missing = np.isnan(ib) | (ib == 0)
+    if missing.any():
+        ib[missing] = interbank_asof(currency[missing], tx_day[missing])
+    _fail(np.isnan(ib), lambda i: f"Aucun taux interbancaire pour {df['currency'].iat[i]} "
+                                  f"le {tx_label[i]}")
+
+    # 2) historical-loss factor ---------------------------------------------
+    hl = pd.to_numeric(df["historical_loss"], errors="coerce").to_numpy(dtype=float)
+    _fail(np.isnan(hl), lambda i: "Historical loss manquant : impossible de calculer le benchmark")
+
+    is_buy = np.isin(side, ("import", "buy"))
+    is_sell = np.isin(side, ("export", "sell"))
+    _fail(~(is_buy | is_sell),
+          lambda i: f"Type de transaction non supporté : {df['transaction_type'].iat[i]}")
+    base = np.where(is_buy, ib * (1 + hl), ib * (1 - hl))
+
+    # 3) forward adjustment *only* for forward & option trades --------------
+    hedged = np.isin(trade, ("forward", "option")) & pd.isna(failures)
+    bench[:] = base
+    if hedged.any():
+        days = (val_day - tx_day).astype("timedelta64[D]").astype(float) - 2
+        period = yield_period_index(np.nan_to_num(days))
+
+        found, curves = market_data.get_many(tx_day)
+        _fail(hedged & ~found, lambda i: f"Aucune donnée de taux pour {tx_label[i]}")
+        _fail(hedged & found & ~np.isin(currency, ("USD", "EUR")),
+              lambda i: "Devise non supportée pour les yields")
+
+        fwd = hedged & pd.isna(failures)
+        if fwd.any():
+            rows = np.arange(n)
+            stacked = {c: np.vstack([curves[a] for a in attrs]) for c, attrs in YIELD_ATTRS.items()}
+            dom = stacked["TND"][period, rows]
+            foreign = np.where(currency == "USD", stacked["USD"][period, rows],
+                               stacked["EUR"][period, rows])
+            bench[fwd] = calculate_forward_rate(base[fwd], foreign[fwd], dom[fwd], days[fwd])
+
+    failed = ~pd.isna(failures)
+    if failed.any():
+        if strict:
+            raise ValueError(failures[np.flatnonzero(failed)[0]])
+        bench[failed] = np.nan
+        if errors is not None:
+            ids = df["id"].to_numpy()
+            errors.extend(f"Order ID {ids[i]}: {failures[i]}" for i in np.flatnonzero(failed))
+    return bench
@@ -0,0 +1,50 @@
+from sqlalchemy import tuple_, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from models import db
+
+UPSERT_CHUNK = 2000
+
+
+def upsert_rows(model, rows, keys, chunk=UPSERT_CHUNK):
+    """
+    INSERT ... ON CONFLICT (keys) DO UPDATE of `rows` (dicts keyed by model
+    attribute names) on Postgres, `chunk` rows per statement; the columns
+    in `keys` need a unique constraint.  Other databases get a bulk UPDATE
+    by primary key plus a bulk INSERT.  Caller commits.
+    """
+    if not rows:
+        return
+    mapper = model.__mapper__
+    # table columns may be named differently from the attributes ("Date", "Spot USD", ...)
+    names = {attr: mapper.columns[attr].name for attr in rows[0]}
+    values = [attr for attr in rows[0] if attr not in keys]
+
+    if db.engine.dialect.name == "postgresql":
+        table_rows = [{names[k]: v for k, v in r.items()} for r in rows]
+        for i in range(0, len(table_rows), chunk):
+            stmt = pg_insert(model.__table__).values(table_rows[i:i + chunk])
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[names[k] for k in keys],
+                set_={names[c]: stmt.excluded[names[c]] for c in values},
+            ))
+        return
+
+    key_cols = [getattr(model, k) for k in keys]
+    known = {}
+    for i in range(0, len(rows), chunk):
+        wanted = [tuple(r[k] for k in keys) for r in rows[i:i + chunk]]
+        known.update(
+            (tuple(row[:-1]), row[-1])
+            for row in db.session.query(*key_cols, model.id).filter(tuple_(*key_cols).in_(wanted))
+        )
+    updates, inserts = [], []
+    for r in rows:
+        pk = known.get(tuple(r[k] for k in keys))
+        if pk is None:
+            inserts.append({names[k]: v for k, v in r.items()})
+        else:
+            updates.append({"id": pk, **r})
+    if updates:
+        db.session.execute(update(model), updates)
+    if inserts:
+        db.session.execute(model.__table__.insert(), inserts)
@@ -0,0 +1,114 @@
+import pandas as pd
+from sqlalchemy import delete, or_, tuple_
+from models import db, Order, ClientDailyStats
+from .dashboard_service import (
+    DASHBOARD_COLUMNS, DONE_STATUSES, DAY_KEY, STAT_COLUMNS,
+    enrich_orders, aggregate_daily,
+)
+
+# client_daily_stats rows are keyed by (user_id, currency, day)
+STATS_KEY = ["user_id", "currency", "day"]
+
+
+def _day_keys(keys) -> pd.DataFrame:
+    """(user_id, currency, transaction_date) frame from a frame or an iterable of tuples."""
+    if isinstance(keys, pd.DataFrame):
+        keys = keys[DAY_KEY]
+    else:
+        keys = pd.DataFrame(list(keys), columns=DAY_KEY)
+    return keys.dropna().drop_duplicates()
+
+
+def _write(daily: pd.DataFrame):
+    if daily.empty:
+        return
+    rows = daily.rename(columns={"transaction_date": "day"})
+    db.session.execute(
+        ClientDailyStats.__table__.insert(),
+        [
+            {**{k: r[k] for k in STATS_KEY},
+             **{c: (bool(r[c]) if c.endswith("_day") else
+                    int(r[c]) if c.endswith("_count") else float(r[c])) for c in STAT_COLUMNS}}
+            for r in rows.to_dict("records")
+        ],
+    )
+
+
+def _done_orders(*criteria) -> pd.DataFrame:
+    rows = (
+        db.session.query(*[getattr(Order, c) for c in DASHBOARD_COLUMNS])
+        .filter(Order.status.in_(DONE_STATUSES), *criteria)
+        .all()
+    )
+    return pd.DataFrame(rows, columns=DASHBOARD_COLUMNS)
+
+
+def refresh_daily_stats(keys) -> int:
+    """
+    Recompute the client_daily_stats rows of the given
+    (user_id, currency, transaction_date) keys from their executed/matched
+    orders; keys left without orders lose their row.  A client with no
+    rows yet gets their whole history instead, so the table never holds
+    part of a client's days (the summary only falls back to the orders
+    for clients without rows).  Orders that cannot be priced count with
+    a zero gain and in `unpriced_count`.  Caller commits.
+    Returns the number of rows written.
+    """
+    keys = _day_keys(keys)
+    if keys.empty:
+        return 0
+    users = [int(u) for u in keys["user_id"].unique()]
+    stored = {u for (u,) in db.session.query(ClientDailyStats.user_id)
+              .filter(ClientDailyStats.user_id.in_(users)).distinct()}
+    fresh = [u for u in users if u not in stored]
+    key_tuples = [tuple(k) for k in keys[keys["user_id"].isin(stored)].itertuples(index=False)]
+
+    order_key = tuple_(Order.user_id, Order.currency, Order.transaction_date)
+    stats_key = tuple_(ClientDailyStats.user_id, ClientDailyStats.currency, ClientDailyStats.day)
+    order_scope, stats_scope = [], []
+    if key_tuples:
+        order_scope.append(order_key.in_(key_tuples))
+        stats_scope.append(stats_key.in_(key_tuples))
+    if fresh:
+        order_scope.append(Order.user_id.in_(fresh))
+        stats_scope.append(ClientDailyStats.user_id.in_(fresh))
+
+    daily = aggregate_daily(enrich_orders(_done_orders(or_(*order_scope)), strict=False))
+    db.session.execute(delete(ClientDailyStats).where(or_(*stats_scope)))
+    _write(daily)
+    return len(daily)
+
+
+def rebuild_daily_stats(user_id=None) -> int:
+    """
+    Backfill: rebuild client_daily_stats from scratch, for one client or
+    for everybody.  Commits.  Returns the number of rows written.
+    """
+    criteria = [] if user_id is None else [Order.user_id == user_id]
+    purge = delete(ClientDailyStats)
+    if user_id is not None:
+        purge = purge.where(ClientDailyStats.user_id == user_id)
+
+    daily = aggregate_daily(enrich_orders(_done_orders(*criteria), strict=False))
+    db.session.execute(purge)
+    _write(daily)
+    db.session.commit()
+    return len(daily)
+
+
+def load_daily_stats(user_id, currency) -> pd.DataFrame:
+    """
+    client_daily_stats rows of one client for one currency, a list of
+    currencies or all of them (None), shaped like `aggregate_daily` output.
+    Returns None when the client has no stats yet (not backfilled); a
+    client with rows has all of their days, see `refresh_daily_stats`.
+    """
+    cols = [getattr(ClientDailyStats, c) for c in STATS_KEY + STAT_COLUMNS]
+    q = db.session.query(*cols).filter(ClientDailyStats.user_id == user_id)
+    if not db.session.query(q.exists()).scalar():
+        return None
+    if currency is not None:
+        currencies = [currency] if isinstance(currency, str) else list(currency)
+        q = q.filter(ClientDailyStats.currency.in_(currencies))
+    daily = pd.DataFrame(q.order_by(ClientDailyStats.day).all(), columns=STATS_KEY + STAT_COLUMNS)
+    return daily.rename(columns={"day": "transaction_date"})
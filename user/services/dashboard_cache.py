@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class DashboardCache:
+    """
+    Per-process cache of dashboard responses, keyed by
+    (user_id, currency, endpoint).
+
+    Entries expire after `ttl` seconds and the least recently used one is
+    evicted once `maxsize` is reached.  Writers that touch a client's orders
+    call `invalidate_user(user_id)`; the TTL bounds staleness for changes
+    made by another worker process or by market-data ingestion.
+
+    Each client has a generation number, bumped by every invalidation.  A
+    value computed while its client was invalidated is returned to the
+    caller but not stored, so it cannot outlive the change for a full TTL.
+    """
+
+    def __init__(self, ttl=300, maxsize=1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()        # key -> (expires_at, value)
+        self._generations = {}               # user_id -> invalidation count
+        self._epoch = 0                      # bumped by clear()
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def key(user_id, currency, endpoint):
+        return (str(user_id), (currency or "").upper(), endpoint)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def generation(self, user_id):
+        """Opaque token that changes whenever `user_id` is invalidated."""
+        with self._lock:
+            return self._epoch, self._generations.get(str(user_id), 0)
+
+    def set(self, key, value, generation=None):
+        """
+        Store `value`; when `generation` (from `generation()` before the
+        value was computed) is stale, drop it instead.  Returns whether
+        the value was stored.
+        """
+        with self._lock:
+            if generation is not None and \
+                    generation != (self._epoch, self._generations.get(key[0], 0)):
+                return False
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def get_or_compute(self, user_id, currency, endpoint, compute):
+        """Cached value for the key, or `compute()` stored under it."""
+        key = self.key(user_id, currency, endpoint)
+        value = self.get(key)
+        if value is None:
+            generation = self.generation(user_id)
+            value = compute()
+            self.set(key, value, generation)
+        return value
+
+    def invalidate_user(self, user_id):
+        """Drop every entry of one client."""
+        uid = str(user_id)
+        with self._lock:
+            self._generations[uid] = self._generations.get(uid, 0) + 1
+            for key in [k for k in self._entries if k[0] == uid]:
+                del self._entries[key]
+
+    def invalidate_users(self, user_ids):
+        for uid in set(user_ids):
+            self.invalidate_user(uid)
+
+    def clear(self):
+        with self._lock:
+            self._epoch += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+            }
+
+
+dashboard_cache = DashboardCache()
@@ -0,0 +1,313 @@
+import calendar
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from models import db, Order
+from .benchmark_service import BENCHMARK_COLUMNS, compute_benchmarks
+from .order_recompute import DAY_KEY, compute_gains, daily_commission_ratio
+
+# Order columns the dashboard widgets need (benchmark inputs + amounts & fees)
+DASHBOARD_COLUMNS = BENCHMARK_COLUMNS + [
+    "user_id", "original_amount", "execution_rate", "commission_percent",
+    "bank_name", "reference",
+]
+DONE_STATUSES = ["Executed", "Matched"]
+
+
+def load_client_orders(user_id, currency) -> pd.DataFrame:
+    """
+    Executed / matched orders of one client in one currency, a list of
+    currencies, or every currency (None) as a columnar frame, ordered by
+    transaction date.  One SELECT, no ORM objects.
+    """
+    q = db.session.query(*[getattr(Order, c) for c in DASHBOARD_COLUMNS]) \
+        .filter(Order.user_id == user_id, Order.status.in_(DONE_STATUSES))
+    if currency is not None:
+        currencies = [currency] if isinstance(currency, str) else list(currency)
+        q = q.filter(Order.currency.in_(currencies))
+    rows = q.order_by(Order.transaction_date, Order.id).all()
+    return pd.DataFrame(rows, columns=DASHBOARD_COLUMNS)
+
+
+def parse_currencies(value):
+    """
+    ?currency= parameter -> None (all currencies), a single code, or a
+    sorted list of codes.  "all" and comma-separated lists are accepted.
+    """
+    value = (value or "USD").upper()
+    if value == "ALL":
+        return None
+    codes = sorted({c.strip() for c in value.split(",") if c.strip()})
+    return codes[0] if len(codes) == 1 else codes
+
+
+def price_orders(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Benchmark every order of the frame once ("benchmark" column, NaN where
+    it cannot be priced) so several widgets can share the result.
+    """
+    df = df.copy()
+    df["benchmark"] = compute_benchmarks(df, strict=False)
+    return df
+
+
+def require_benchmarks(df: pd.DataFrame):
+    """Raise the pricing error of the first row of `df` without a benchmark."""
+    missing = df["benchmark"].isna().to_numpy()
+    if missing.any():
+        compute_benchmarks(df[missing], strict=True)
+
+
+def enrich_orders(df: pd.DataFrame, strict=True) -> pd.DataFrame:
+    """
+    Add the derived columns every widget works from:
+    hedged / is_buy flags, benchmark, gain % and gains in FX & TND,
+    commission in TND.  Benchmarks are computed once, for priced orders
+    only, unless the frame already went through `price_orders`.
+    """
+    df = df.copy()
+    exe = pd.to_numeric(df["execution_rate"], errors="coerce").to_numpy(dtype=float)
+    amt = pd.to_numeric(df["original_amount"], errors="coerce").to_numpy(dtype=float)
+    comm = pd.to_numeric(df["commission_percent"], errors="coerce").fillna(0.0).to_numpy(dtype=float)
+
+    df["hedged"] = df["trade_type"].fillna("").str.lower().isin(["forward", "option"])
+    df["is_buy"] = df["transaction_type"].fillna("").str.lower().isin(["import", "buy"])
+    df["tx_date"] = pd.to_datetime(df["transaction_date"])
+    priced = ~np.isnan(exe) & (exe != 0)
+
+    bench = np.full(len(df), np.nan)
+    if "benchmark" in df:
+        if strict:
+            require_benchmarks(df[priced])
+        bench[priced] = df["benchmark"].to_numpy(dtype=float)[priced]
+    elif priced.any():
+        bench[priced] = compute_benchmarks(df[priced], strict=strict)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(df["is_buy"], (bench - exe) / exe, (exe - bench) / bench)
+        # the MTD gain has always treated only "import" as the buy side
+        mtd_pct = np.where(df["transaction_type"].fillna("").str.lower() == "import",
+                           (bench - exe) / exe, (exe - bench) / bench)
+    pct = np.where(priced, pct, 0.0)
+
+    df["priced"] = priced
+    df["unpriced"] = priced & np.isnan(bench)        # only when strict=False
+    df["benchmark"] = bench
+    df["gain_pct"] = pct
+    df["gain_fx"] = pct * amt
+    df["gain_tnd"] = np.where(priced, pct * amt * exe, 0.0)
+    df["traded_tnd"] = np.where(priced, amt * exe, 0.0)
+    df["commission_tnd"] = np.where(priced, exe * amt * comm, 0.0)
+    df["mtd_gain_tnd"] = np.where(priced, mtd_pct * amt * exe, 0.0)
+    return df
+
+
+# ---------------------------------------------------------------------------
+# daily aggregates (the unit every summary KPI is summed from)
+# ---------------------------------------------------------------------------
+STAT_COLUMNS = [
+    "order_count", "hedged_count", "traded_fx", "traded_tnd",
+    "hedged_fx", "hedged_tnd", "gain_fx", "gain_tnd",
+    "hedged_gain_fx", "hedged_gain_tnd", "commission_tnd", "mtd_gain_tnd",
+    "buy_day", "superformance_day", "unpriced_count",
+]
+
+
+def aggregate_daily(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Collapse an `enrich_orders` frame to one row per (user, currency, trade
+    date) with the additive STAT_COLUMNS.  A "superformance day" is a day on
+    which at least one import/buy order executed at or below interbank.
+    `unpriced_count` counts the orders left without a benchmark (zero gain).
+    """
+    if df.empty:
+        return pd.DataFrame(columns=DAY_KEY + STAT_COLUMNS)
+    amt = df["original_amount"].astype(float)
+    hedged = df["hedged"]
+    exe = pd.to_numeric(df["execution_rate"], errors="coerce")
+    ib = pd.to_numeric(df["interbank_rate"], errors="coerce")
+    gain_fx = df["gain_fx"].where(df["priced"], 0.0).fillna(0.0)
+    gain_tnd = df["gain_tnd"].fillna(0.0)
+
+    parts = pd.DataFrame({
+        **{k: df[k] for k in DAY_KEY},
+        "order_count": 1,
+        "hedged_count": hedged.astype(int),
+        "traded_fx": amt,
+        "traded_tnd": df["traded_tnd"],
+        "hedged_fx": amt.where(hedged, 0.0),
+        "hedged_tnd": df["traded_tnd"].where(hedged, 0.0),
+        "gain_fx": gain_fx,
+        "gain_tnd": gain_tnd,
+        "hedged_gain_fx": gain_fx.where(hedged, 0.0),
+        "hedged_gain_tnd": gain_tnd.where(hedged, 0.0),
+        "commission_tnd": df["commission_tnd"],
+        "mtd_gain_tnd": df["mtd_gain_tnd"].fillna(0.0),
+        "buy_day": df["is_buy"],
+        "superformance_day": df["is_buy"] & exe.notna() & ib.notna() & (exe <= ib),
+        "unpriced_count": df["unpriced"].astype(int),
+    })
+    agg = {c: "sum" for c in STAT_COLUMNS}
+    agg.update(buy_day="any", superformance_day="any")
+    return parts.groupby(DAY_KEY, sort=True).agg(agg).reset_index()
+
+
+def summarize_daily(daily: pd.DataFrame, currency, today=None) -> dict:
+    """
+    All KPIs of /api/dashboard/summary summed from daily aggregates
+    (`aggregate_daily` output or rows of client_daily_stats).
+    """
+    today = today or date.today()
+    day = pd.to_datetime(daily["transaction_date"])
+    mtd = ((day.dt.year == today.year) & (day.dt.month == today.month)).to_numpy()
+    col = lambda c, mask=None: float(daily[c].to_numpy(dtype=float)[mask].sum()) \
+        if mask is not None else float(daily[c].to_numpy(dtype=float).sum())
+
+    total_traded = col("traded_fx")
+    total_covered = col("hedged_fx")
+    total_commissions_tnd = col("commission_tnd")
+    net_gain_tnd = col("gain_tnd") - total_commissions_tnd
+    total_commissions_tnd_mtd = col("commission_tnd", mtd)
+    net_gain_tnd_mtd = col("mtd_gain_tnd", mtd) - total_commissions_tnd_mtd
+
+    buy_days = int(daily["buy_day"].astype(bool).sum())
+    super_days = int(daily["superformance_day"].astype(bool).sum())
+
+    # monthly series, in chronological order
+    monthly = (
+        pd.DataFrame({"month": day.dt.to_period("M"),
+                      "transacted": daily["traded_tnd"].astype(float),
+                      "gain": daily["gain_tnd"].astype(float)})
+        .groupby("month", sort=True)[["transacted", "gain"]].sum()
+    )
+
+    return {
+        "currency": currency,
+        "total_traded_fx": total_traded,
+        "total_traded_tnd": col("traded_tnd"),
+        "total_traded_mtd_fx": col("traded_fx", mtd),
+        "total_traded_mtd_tnd": col("traded_tnd", mtd),
+        "coverage_percent": (total_covered / total_traded * 100) if total_traded else 0,
+        "economies_totales_fx": col("gain_fx"),
+        "economies_totales_tnd": col("gain_tnd"),
+        "economies_totales_couverture_fx": col("hedged_gain_fx"),
+        "economies_totales_couverture_tnd": col("hedged_gain_tnd"),
+        "total_commissions_tnd": total_commissions_tnd,
+        "net_gain_tnd": net_gain_tnd,
+        "roi_percent": (net_gain_tnd / total_commissions_tnd * 100) if total_commissions_tnd else None,
+        "superformance_rate": (super_days / buy_days * 100.0) if buy_days else 0.0,
+        "months": [f"{calendar.month_name[p.month]} {p.year}" for p in monthly.index],
+        "monthlyTotalTransacted": [float(v) for v in monthly["transacted"]],
+        "monthlyTotalGain": [float(v) for v in monthly["gain"]],
+        "total_commissions_tnd_mtd": total_commissions_tnd_mtd,
+        "net_gain_tnd_mtd": net_gain_tnd_mtd,
+        "roi_percent_mtd": (net_gain_tnd_mtd / total_commissions_tnd_mtd * 100) if total_commissions_tnd_mtd else None,
+        "has_forward_or_option": bool(daily["hedged_count"].astype(int).sum() > 0),
+        "total_covered_mtd_fx": col("hedged_fx", mtd),
+        "total_covered_mtd_tnd": col("hedged_tnd", mtd),
+    }
+
+
+def summarize(df: pd.DataFrame, currency, today=None) -> dict:
+    """KPIs of /api/dashboard/summary from an `enrich_orders` frame."""
+    return summarize_daily(aggregate_daily(df), currency, today=today)
+
+
+def bank_gains_frame(user_id, currency, df=None) -> pd.DataFrame:
+    """
+    Per-order gain vs benchmark and commission, plus the daily
+    commission / |gain| ratio ("Commission % de gain"), all numeric.
+    Read-only: the ratio is persisted by the recompute job.
+    `df` may be an already loaded (and priced) order frame.
+    """
+    if df is None:
+        df = load_client_orders(user_id, currency)
+    else:
+        df = df.copy()
+    if "benchmark" in df:
+        require_benchmarks(df)
+        bench = df["benchmark"].to_numpy(dtype=float)
+    else:
+        bench = compute_benchmarks(df)
+    pct, gain_tnd = compute_gains(df, bench)
+
+    exe = pd.to_numeric(df["execution_rate"], errors="coerce").fillna(0.0)
+    amt = pd.to_numeric(df["original_amount"], errors="coerce").fillna(0.0)
+    comm = pd.to_numeric(df["commission_percent"], errors="coerce").fillna(0.0)
+
+    df["benchmark"] = bench
+    df["gain_pct"] = pct
+    df["gain_tnd"] = gain_tnd
+    df["commission_tnd"] = exe * amt * comm
+    df["commission_gain"] = daily_commission_ratio(
+        [df["transaction_date"]], df["commission_tnd"], df["gain_tnd"]
+    )
+    return df
+
+
+
+def _opt(x):
+    """float, or None for NaN / missing (JSON friendly)."""
+    return None if x is None or pd.isna(x) else float(x)
+
+
+def forward_rate_rows(df: pd.DataFrame) -> list:
+    """Secured vs market forward rate of every hedged order."""
+    hedged = df[df["trade_type"].fillna("").str.lower().isin(["forward", "option"])]
+    if "benchmark" in hedged:
+        require_benchmarks(hedged)
+        bench = hedged["benchmark"].to_numpy(dtype=float)
+    else:
+        bench = compute_benchmarks(hedged)
+
+    rows = []
+    for o, benchmark_rate in zip(hedged.itertuples(index=False), bench):
+        sell = o.transaction_type in ["export", "sell"]
+        buy = o.transaction_type in ["import", "buy"]
+        rows.append({
+            "transaction_date": o.transaction_date.strftime('%Y-%m-%d'),
+            "value_date": o.value_date.strftime('%Y-%m-%d'),
+            "secured_forward_rate_export": _opt(o.execution_rate) if sell else None,
+            "secured_forward_rate_import": _opt(o.execution_rate) if buy else None,
+            "market_forward_rate_export": float(benchmark_rate) if sell else None,
+            "market_forward_rate_import": float(benchmark_rate) if buy else None,
+        })
+    return rows
+
+
+def superperformance_rows(df: pd.DataFrame):
+    """Execution vs interbank rate of every order, by transaction date."""
+    if df.empty:
+        return {"message": "No data available for this user"}
+    rows = []
+    for o in df.itertuples(index=False):
+        side = o.transaction_type.lower()
+        rows.append({
+            "date": o.transaction_date.strftime('%Y-%m-%d'),
+            "execution_rate_export": _opt(o.execution_rate) if side in ["export", "sell"] else None,
+            "execution_rate_import": _opt(o.execution_rate) if side in ["import", "buy"] else None,
+            "interbank_rate": _opt(o.interbank_rate),
+        })
+    return rows
+
+
+def summarize_currencies(daily: pd.DataFrame, currencies=None, today=None) -> dict:
+    """
+    Multi-currency summary from daily aggregates: the usual KPIs per
+    currency plus a grand total converted to TND (FX amounts cannot be
+    added across currencies, so the total only carries the TND figures;
+    coverage is weighted by traded TND).
+    """
+    ccy = daily["currency"].fillna("").str.upper()
+    if currencies is None:
+        currencies = sorted(c for c in ccy.unique() if c)
+    by_currency = {c: summarize_daily(daily[ccy == c], c, today=today) for c in currencies}
+
+    total = {k: v for k, v in summarize_daily(daily, "TND", today=today).items()
+             if not k.endswith("_fx")}
+    traded_tnd = float(daily["traded_tnd"].astype(float).sum())
+    covered_tnd = float(daily["hedged_tnd"].astype(float).sum())
+    total["coverage_percent"] = (covered_tnd / traded_tnd * 100) if traded_tnd else 0
+
+    return {"currencies": list(currencies), "by_currency": by_currency, "total": total}
@@ -0,0 +1,177 @@
+import os
+import re
+from itertools import chain
+
+from models import db
+from .bctx_ingest import upsert_bctx_records
+from .exchange_ingest import upsert_exchange_records
+from .ingestion_state import file_sha256, get_state, Watermark, save_state
+from .json_records import DATA_FILE_SUFFIX, iter_json_records
+from .market_archive import market_archive
+from .market_data_store import market_data
+from .order_recompute import mark_dirty_for_exchange_data
+
+FEED_PATTERNS = {
+    "midmarket": re.compile(r"midmarket_rates_\d{4}-\d{2}-\d{2}_\d{4}" + DATA_FILE_SUFFIX + "$"),
+    "yield":     re.compile(r"daily_yield_rates_\d{4}-\d{2}-\d{2}_\d{4}" + DATA_FILE_SUFFIX + "$"),
+    "bctx":      re.compile(r"bctx_data_(\d{4}-\d{2}-\d{2}_\d{4})" + DATA_FILE_SUFFIX + "$"),
+}
+
+
+def feed_of(filename):
+    """Feed a data/ file name belongs to, or None."""
+    return next((feed for feed, p in FEED_PATTERNS.items() if p.search(filename)), None)
+
+
+def pending_files(data_dir, files, state, full=False):
+    """
+    The files of one feed (sorted names) still to ingest, oldest first:
+    every file after the last one ingested, plus that one again if it was
+    rewritten since.  All of them when `full` or nothing was ingested yet.
+    Each eikon/ run writes only the rows it fetched, so no single file
+    holds the whole history.
+    """
+    if full or state is None or not state.file_name:
+        return list(files)
+    done = state.file_name
+    return [f for f in files if f > done or
+            (f == done and file_sha256(os.path.join(data_dir, f)) != state.file_hash)]
+
+
+def ingest_exchange_data(data_dir, full=False, debug=False):
+    """
+    Upsert the midmarket & yield files of `data_dir` not ingested yet into
+    exchange_spot_hourly / exchange_data, skipping records before each
+    feed's watermark (`full` re-ingests every file).  Commits.
+
+    Returns (payload, HTTP status) – the /admin/api/upsert-exchange-data response.
+    """
+    debug_messages = []
+    debug_messages.append(f"Data directory: {data_dir}")
+
+    try:
+        all_files = os.listdir(data_dir)
+        if debug:
+            debug_messages.append(f"Files in directory: {all_files}")
+    except Exception as e:
+        return {'message': f'Error accessing data directory: {e}', 'debug': debug_messages}, 500
+
+    mid_files   = sorted(f for f in all_files if FEED_PATTERNS['midmarket'].search(f))
+    yield_files = sorted(f for f in all_files if FEED_PATTERNS['yield'].search(f))
+    debug_messages.append(f"Found mid_files: {mid_files}")
+    debug_messages.append(f"Found yield_files: {yield_files}")
+
+    if not mid_files or not yield_files:
+        return {'message': 'Required JSON files are missing', 'debug': debug_messages}, 404
+
+    # files not ingested yet, and records before each feed's watermark
+    feeds = {}
+    try:
+        for feed, files in (('midmarket', mid_files), ('yield', yield_files)):
+            state = None if full else get_state(feed)
+            pending = pending_files(data_dir, files, state, full)
+            if not pending:
+                debug_messages.append(f"{feed}: {files[-1]} already ingested")
+                feeds[feed] = None
+                continue
+            mark = Watermark(feed, state)
+            paths = [os.path.join(data_dir, f) for f in pending]
+            records = list(mark.filter(chain.from_iterable(iter_json_records(p) for p in paths)))
+            debug_messages.append(f"{feed}: {len(records)} new records from {pending} (watermark {mark.latest})")
+            feeds[feed] = (pending[-1], file_sha256(paths[-1]), mark.latest, records)
+    except Exception as e:
+        return {'message': f'Error reading JSON: {e}', 'debug': debug_messages}, 500
+
+    if not any(feeds.values()):
+        return {'message': 'Exchange data already up to date', 'debug': debug_messages}, 200
+    mid_data   = feeds['midmarket'][3] if feeds['midmarket'] else []
+    yield_data = feeds['yield'][3] if feeds['yield'] else []
+
+    try:
+        touched = upsert_exchange_records(mid_data, yield_data, debug_messages, debug=debug)
+    except Exception as e:
+        db.session.rollback()
+        return {'message': f'Error upserting exchange data: {e}', 'debug': debug_messages}, 500
+
+    # finally commit
+    try:
+        mark_dirty_for_exchange_data(touched)
+        for feed, ingested in feeds.items():
+            if ingested:
+                save_state(feed, *ingested[:3])
+        db.session.commit()
+        debug_messages.append("All changes committed")
+        if touched:
+            market_data.refresh(since=min(touched))
+            market_archive.update('exchange', since=min(touched))
+            market_archive.update('spot_hourly', since=min(touched))
+        return {'message': 'Exchange data upserted', 'debug': debug_messages}, 200
+    except Exception as e:
+        db.session.rollback()
+        debug_messages.append(f"Commit failed: {e}")
+        return {'message': f'Error updating DB: {e}', 'debug': debug_messages}, 500
+
+
+def ingest_bctx_data(data_dir, full=False):
+    """
+    Upsert the bctx_data files of `data_dir` not ingested yet into
+    bctx_fixings (and the intraday tick store), skipping records before
+    the bctx watermark (`full` re-ingests every file).  Commits.
+
+    Returns (payload, HTTP status) – the /admin/api/upsert-bctx response.
+    """
+    debug_messages = []
+
+    # 1) List the bctx_data_... files, oldest first
+    try:
+        all_files = os.listdir(data_dir)
+        bctx_files = sorted([f for f in all_files if FEED_PATTERNS['bctx'].search(f)])
+        if not bctx_files:
+            return {"message": "No bctx_data_*.json files found"}, 404
+    except Exception as e:
+        return {"message": f"Error accessing data_dir or listing files: {str(e)}"}, 500
+
+    # 2) Keep the files not ingested yet, and records from the watermark on
+    state = None if full else get_state('bctx')
+    try:
+        pending = pending_files(data_dir, bctx_files, state, full)
+        if pending:
+            latest_bctx_file = pending[-1]
+            file_hash = file_sha256(os.path.join(data_dir, latest_bctx_file))
+    except Exception as e:
+        return {"message": f"Error reading bctx files: {str(e)}"}, 500
+    if not pending:
+        return {
+            "message": f"{bctx_files[-1]} already ingested",
+            "records_processed": 0,
+            "debug": debug_messages
+        }, 200
+    mark = Watermark('bctx', state)
+    paths = [os.path.join(data_dir, f) for f in pending]
+
+    # 3) Reduce the ticks to one row per (date, session) and upsert them in one batch
+    try:
+        records_processed, _ = upsert_bctx_records(
+            mark.filter(chain.from_iterable(iter_json_records(p) for p in paths)), debug_messages
+        )
+    except ValueError as e:
+        db.session.rollback()
+        return {"message": f"Invalid BCTX file: {str(e)}"}, 400
+    except Exception as e:
+        db.session.rollback()
+        return {"message": f"Error upserting BCTX fixings: {str(e)}"}, 500
+
+    # 4) Commit
+    try:
+        save_state('bctx', latest_bctx_file, file_hash, mark.latest)
+        db.session.commit()
+        debug_messages.append(f"Processed {records_processed} records from {', '.join(pending)}.")
+        market_archive.update('bctx', since=mark.mark.date() if mark.mark else None)
+        return {
+            "message": "BCTX fixings upsert complete",
+            "records_processed": records_processed,
+            "debug": debug_messages
+        }, 200
+    except Exception as e:
+        db.session.rollback()
+        return {"message": f"DB commit error: {str(e)}"}, 500
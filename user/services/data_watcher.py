@@ -0,0 +1,214 @@
+import ctypes
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:                     # not POSIX: no cross-process guard
+    fcntl = None
+
+from .data_ingest import feed_of, ingest_exchange_data, ingest_bctx_data
+
+# inotify(7) event bits
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+_EVENT = struct.Struct("iIII")          # wd, mask, cookie, len (+ name)
+
+# A feed is ingested once its files have been quiet this long
+DEBOUNCE_SECONDS = float(os.getenv("DATA_WATCH_DEBOUNCE", "10"))
+# Directory scan interval when inotify is not available
+POLL_SECONDS = float(os.getenv("DATA_WATCH_POLL", "30"))
+
+# Held (flock) by the one process watching a data/ directory
+LOCK_NAME = ".data-watcher.lock"
+
+# midmarket and yield files are written together and ingested together
+INGEST_GROUPS = {"midmarket": "exchange", "yield": "exchange", "bctx": "bctx"}
+
+
+class _Inotify:
+    """Minimal inotify watch on one directory through libc (Linux only)."""
+
+    def __init__(self, path):
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+
+    def read(self, timeout):
+        """File names with an event within `timeout` seconds; None on queue overflow."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names, offset = [], 0
+        while offset + _EVENT.size <= len(buf):
+            _, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            names.append(os.fsdecode(buf[offset:offset + length].rstrip(b"\0")))
+            offset += length
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DataWatcher:
+    """
+    Watches the data/ directory and runs the ingestion of a feed group
+    ("exchange" for midmarket + yield, "bctx") in this background thread
+    once its files have stopped changing for `debounce` seconds.
+
+    inotify is used when available, otherwise the directory is polled
+    (size + mtime).  Every group is run once at start-up to catch up on
+    files written while the app was down; what was already ingested is
+    skipped through the ingestion_state table, so nothing lives in memory.
+
+    Only one process per directory runs it: `start` takes an exclusive
+    lock on data/.data-watcher.lock and does nothing while another
+    process holds it.
+    """
+
+    def __init__(self, data_dir, handlers, debounce=DEBOUNCE_SECONDS, poll=POLL_SECONDS):
+        self.data_dir = data_dir
+        self.handlers = handlers          # group -> callable()
+        self.debounce = debounce
+        self.poll = poll
+        self._pending = {}                # group -> time of the last change seen
+        self._stop = threading.Event()
+        self._thread = None
+        self._snapshot = {}
+        self._lock_fd = None
+
+    # -- lifecycle ----------------------------------------------------------
+    def _lock(self):
+        """True once this process holds the directory lock (always without flock)."""
+        if fcntl is None:
+            return True
+        os.makedirs(self.data_dir, exist_ok=True)
+        fd = os.open(os.path.join(self.data_dir, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def start(self):
+        """Start watching; None when another process already watches the directory."""
+        if not self._lock():
+            print(f"[data watcher] {self.data_dir} is watched by another process")
+            return None
+        self._thread = threading.Thread(target=self._run, name="data-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def wait(self):
+        """Block until the watcher stops (or Ctrl-C)."""
+        while self._thread is not None and self._thread.is_alive():
+            self._thread.join(1.0)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)         # releases the flock
+            self._lock_fd = None
+
+    # -- change detection -----------------------------------------------------
+    def _touch(self, names, now):
+        for name in names:
+            group = INGEST_GROUPS.get(feed_of(name))
+            if group in self.handlers:
+                self._pending[group] = now
+
+    def _scan(self):
+        """Names whose size or mtime changed since the previous scan."""
+        try:
+            entries = {e.name: (e.stat().st_size, e.stat().st_mtime_ns)
+                       for e in os.scandir(self.data_dir) if e.is_file()}
+        except OSError:
+            return []
+        changed = [n for n, sig in entries.items() if self._snapshot.get(n) != sig]
+        self._snapshot = entries
+        return changed
+
+    def _run(self):
+        try:
+            watch = _Inotify(self.data_dir) if sys.platform.startswith("linux") else None
+        except OSError as e:
+            print(f"[data watcher] inotify unavailable ({e}), polling every {self.poll}s")
+            watch = None
+        self._scan()
+        for group in self.handlers:                 # catch up on start-up
+            self._pending[group] = 0.0
+
+        next_poll = time.monotonic() + self.poll
+        while not self._stop.is_set():
+            now = time.monotonic()
+            if watch is not None:
+                names = watch.read(timeout=1.0)
+                if names is None:                   # overflow: re-check every group
+                    self._pending.update({g: now for g in self.handlers})
+                else:
+                    self._touch(names, time.monotonic())
+            else:
+                self._stop.wait(1.0)
+                if now >= next_poll:
+                    self._touch(self._scan(), now)
+                    next_poll = now + self.poll
+            self._flush(time.monotonic())
+        if watch is not None:
+            watch.close()
+
+    def _flush(self, now):
+        for group, changed_at in list(self._pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            del self._pending[group]
+            try:
+                self.handlers[group]()
+            except Exception as e:              # keep watching
+                print(f"[data watcher] {group} ingestion failed: {e}")
+
+
+def start_data_watcher(app, data_dir=None):
+    """
+    Start the watcher on `data_dir` (default <app root>/data).  Called from
+    the entry points that serve the app (`python app.py`, `flask
+    watch-data`), never on import.  DATA_WATCHER=0 disables it; returns
+    None when disabled or already running in another process.
+    """
+    if os.getenv("DATA_WATCHER", "1") == "0":
+        return None
+    data_dir = data_dir or os.path.join(app.root_path, "data")
+
+    def run(ingest):
+        def handler():
+            with app.app_context():
+                payload, status = ingest(data_dir)
+                print(f"[data watcher] {payload.get('message')} ({status})")
+        return handler
+
+    return DataWatcher(data_dir, {
+        "exchange": run(ingest_exchange_data),
+        "bctx": run(ingest_bctx_data),
+    }).start()
@@ -0,0 +1,177 @@
+from datetime import datetime, time, timedelta
+
+import numpy as np
+import pandas as pd
+from models import db, ExchangeData, ExchangeSpotHourly
+from .bulk_write import upsert_rows
+
+# Spot columns come from the midmarket file, the rest from the yield file
+SPOT_FIELDS = {"spot_usd": "spotUSD", "spot_eur": "spotEUR"}
+YIELD_FIELDS = {
+    "tnd_1m": "Mid_TND",
+    "usd_1m": "Mid_USD1M",
+    "eur_1m": "Mid_EUR1M",
+    "usd_3m": "Mid_USD3M",
+    "usd_6m": "Mid_USD6M",
+    "eur_3m": "Mid_EUR3M",
+    "eur_6m": "Mid_EUR6M",
+}
+# TND 3m/6m are not published: new rows copy the 1m rate
+TND_COPIES = ["tnd_3m", "tnd_6m"]
+# daily open/high/low of the hourly spot; the close is spot_usd / spot_eur
+OHLC_COLUMNS = [f"{c}_{agg}" for c in SPOT_FIELDS for agg in ("open", "high", "low")]
+VALUE_COLUMNS = list(SPOT_FIELDS) + list(YIELD_FIELDS) + TND_COPIES + OHLC_COLUMNS
+
+
+def _record_time(record):
+    ts = record.get("Timestamp")
+    if not ts:
+        return None
+    try:
+        return datetime.fromisoformat(ts).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+def _records_frame(records, fields, keep) -> pd.DataFrame:
+    """Date-indexed frame of `fields` (model column -> JSON key); records
+    without a parsable Timestamp are dropped, duplicate dates keep `keep`."""
+    df = pd.DataFrame(
+        [[_record_time(r)] + [r.get(k) for k in fields.values()] for r in records],
+        columns=["date"] + list(fields),
+    )
+    df = df[df["date"].notna()]
+    df["date"] = [t.date() for t in df["date"]]
+    df = df.drop_duplicates("date", keep=keep).set_index("date")
+    return df.apply(pd.to_numeric, errors="coerce").astype(float)
+
+
+# ---------------------------------------------------------------------------
+# hourly spot
+# ---------------------------------------------------------------------------
+def hourly_frame(mid_data) -> pd.DataFrame:
+    """timestamp / spot_usd / spot_eur of the midmarket records (a later
+    duplicate timestamp wins), sorted by time."""
+    df = pd.DataFrame(
+        [[_record_time(r)] + [r.get(k) for k in SPOT_FIELDS.values()] for r in mid_data],
+        columns=["timestamp"] + list(SPOT_FIELDS),
+    )
+    df = df[df["timestamp"].notna()].drop_duplicates("timestamp", keep="last")
+    df["timestamp"] = pd.to_datetime(df["timestamp"])
+    for c in SPOT_FIELDS:
+        df[c] = pd.to_numeric(df[c], errors="coerce").astype(float)
+    return df.sort_values("timestamp", ignore_index=True)
+
+
+def write_hourly(hourly: pd.DataFrame):
+    """Upsert the hourly spots in one batch.  Caller commits."""
+    rows = [
+        {"timestamp": ts.to_pydatetime(),
+         **{c: (None if np.isnan(v) else float(v)) for c, v in zip(SPOT_FIELDS, vals)}}
+        for ts, *vals in hourly[["timestamp"] + list(SPOT_FIELDS)].itertuples(index=False)
+    ]
+    upsert_rows(ExchangeSpotHourly, rows, ["timestamp"])
+
+
+def daily_spot(dates) -> pd.DataFrame:
+    """
+    Daily close + open/high/low of the stored hourly spots for `dates`,
+    in one resample.  The close is the last non-missing hour (0 when the
+    day has none, as the daily row always had a spot).
+    """
+    dates = sorted(set(dates))
+    columns = list(SPOT_FIELDS) + OHLC_COLUMNS
+    if not dates:
+        return pd.DataFrame(columns=columns)
+    rows = (
+        db.session.query(ExchangeSpotHourly.timestamp, *[getattr(ExchangeSpotHourly, c) for c in SPOT_FIELDS])
+        .filter(ExchangeSpotHourly.timestamp >= datetime.combine(dates[0], time.min),
+                ExchangeSpotHourly.timestamp < datetime.combine(dates[-1] + timedelta(days=1), time.min))
+        .all()
+    )
+    hourly = pd.DataFrame(rows, columns=["timestamp"] + list(SPOT_FIELDS))
+    hourly["timestamp"] = pd.to_datetime(hourly["timestamp"])
+    bars = hourly.set_index("timestamp").astype(float).resample("D").agg(["first", "max", "min", "last"])
+
+    daily = pd.DataFrame(index=[ts.date() for ts in bars.index])
+    for c in SPOT_FIELDS:
+        daily[c] = bars[(c, "last")].to_numpy()
+        daily[f"{c}_open"] = bars[(c, "first")].to_numpy()
+        daily[f"{c}_high"] = bars[(c, "max")].to_numpy()
+        daily[f"{c}_low"] = bars[(c, "min")].to_numpy()
+    daily = daily.reindex(dates)
+    daily[list(SPOT_FIELDS)] = daily[list(SPOT_FIELDS)].fillna(0.0)
+    return daily[columns]
+
+
+# ---------------------------------------------------------------------------
+# daily rows
+# ---------------------------------------------------------------------------
+def exchange_frame(daily, yield_data) -> pd.DataFrame:
+    """
+    One row per date of either source with the values to write, NaN meaning
+    "keep what is stored" (or 0 for a new row):
+
+      * mid dates (rows of `daily`, see daily_spot): spot close and OHLC,
+        and the yields of the same date when the yield file has them;
+      * yield-only dates: the yields (missing -> 0), spot left untouched.
+
+    `has_mid` tells the two apart.
+    """
+    yld = _records_frame(yield_data, YIELD_FIELDS, keep="first")
+
+    df = daily.join(yld, how="outer")
+    df["has_mid"] = df.index.isin(daily.index)
+    df.loc[~df["has_mid"], list(YIELD_FIELDS)] = df.loc[~df["has_mid"], list(YIELD_FIELDS)].fillna(0.0)
+    return df.sort_index()
+
+
+def _existing(dates) -> pd.DataFrame:
+    cols = [ExchangeData.date, ExchangeData.id] + [getattr(ExchangeData, c) for c in VALUE_COLUMNS]
+    rows = db.session.query(*cols).filter(ExchangeData.date.in_(list(dates))).all()
+    df = pd.DataFrame(rows, columns=["date", "id"] + VALUE_COLUMNS).set_index("date")
+    return df[~df.index.duplicated()]
+
+
+def upsert_exchange_records(mid_data, yield_data, debug_messages=None, debug=False):
+    """
+    Upsert the midmarket records into exchange_spot_hourly, then the daily
+    aggregate of the touched days and the yield records into exchange_data:
+    one SELECT of the stored rows for the dates involved, a join in pandas
+    and one INSERT ... ON CONFLICT ("Date") DO UPDATE batch.  Per-date lines
+    go to `debug_messages` only with `debug`.  Caller commits.
+
+    Returns the set of dates written.
+    """
+    debug_messages = debug_messages if debug_messages is not None else []
+    hourly = hourly_frame(mid_data)
+    if not hourly.empty:
+        write_hourly(hourly)
+        debug_messages.append(f"{len(hourly)} hourly spots written")
+    df = exchange_frame(daily_spot(hourly["timestamp"].dt.date), yield_data)
+    if df.empty:
+        debug_messages.append("No dated records to upsert")
+        return set()
+
+    existing = _existing(df.index)
+    is_new = ~df.index.isin(existing.index)
+    for c in TND_COPIES:
+        df[c] = np.where(is_new, df["tnd_1m"], np.nan)
+    merged = df[VALUE_COLUMNS].combine_first(existing[VALUE_COLUMNS]).loc[df.index]
+    required = [c for c in VALUE_COLUMNS if c not in OHLC_COLUMNS]
+    merged[required] = merged[required].fillna(0.0)
+    merged = merged.astype(object).where(merged.notna(), None)
+
+    rows = [{"date": d, **vals} for d, vals in zip(merged.index, merged.to_dict("records"))]
+    upsert_rows(ExchangeData, rows, ["date"])
+
+    if debug:
+        has_yield = df[list(YIELD_FIELDS)].notna().any(axis=1)
+        for d, new, mid, yld in zip(df.index, is_new, df["has_mid"], has_yield):
+            kind = ("mid + yield" if yld else "mid only") if mid else "yield only"
+            debug_messages.append(f"{'Created' if new else 'Updated'} record for {d} ({kind})")
+    debug_messages.append(
+        f"{int(df['has_mid'].sum())} mid dates, {int((~df['has_mid']).sum())} yield-only dates: "
+        f"{int(is_new.sum())} created, {int((~is_new).sum())} updated"
+    )
+    return set(df.index)
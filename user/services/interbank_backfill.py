@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, InterbankRate, InterbankEmptyDay
+from .bct_client import make_session, fetch_bct_rates, parse_bct_rates, page_archive
+
+# A page that is still empty this many days later is not going to be filled
+EMPTY_DAY_GRACE = 3
+
+MISSING_SQL = text("""
+    SELECT d::date AS day, c.currency
+    FROM generate_series(CAST(:start AS date), CAST(:end AS date), interval '1 day') AS d
+    CROSS JOIN unnest(CAST(:currencies AS text[])) AS c(currency)
+    LEFT JOIN interbank_rate ir
+           ON ir.date = d::date AND ir.currency = c.currency
+    LEFT JOIN interbank_empty_day e
+           ON e.date = d::date AND e.currency = c.currency
+    WHERE ir.id IS NULL AND e.id IS NULL
+      AND extract(isodow FROM d) < 6
+    ORDER BY day
+""")
+
+
+def missing_interbank_days(start, end, currencies):
+    """
+    (date, currency) pairs in [start, end] with neither a rate nor a known
+    empty page, weekends excluded.  One query against a generated date
+    series on Postgres; other databases diff two queries in Python.
+    """
+    currencies = [c.upper() for c in currencies]
+    if db.engine.dialect.name == "postgresql":
+        rows = db.session.execute(
+            MISSING_SQL, {"start": start, "end": end, "currencies": currencies}
+        ).all()
+        return [(r.day, r.currency) for r in rows]
+
+    known = set()
+    for model in (InterbankRate, InterbankEmptyDay):
+        known.update(
+            db.session.query(model.date, model.currency)
+            .filter(model.date.between(start, end), model.currency.in_(currencies))
+            .all()
+        )
+    days = (start + timedelta(days=n) for n in range((end - start).days + 1))
+    return [(d, c) for d in days if d.weekday() < 5
+            for c in currencies if (d, c) not in known]
+
+
+def _insert_ignore(model, rows):
+    """INSERT ... ON CONFLICT DO NOTHING, so a rerun or a racing run cannot fail."""
+    if not rows:
+        return
+    dialect = db.engine.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        insert = pg_insert if dialect == "postgresql" else sqlite_insert
+        db.session.execute(insert(model).values(rows).on_conflict_do_nothing())
+    else:
+        db.session.execute(model.__table__.insert(), rows)
+
+
+def backfill_interbank_rates(start, end=None, currencies=("USD", "EUR"),
+                             workers=4, base_url=None, debug_messages=None,
+                             archive=page_archive):
+    """
+    Fetch every missing (date, currency) interbank rate from the BCT archive.
+
+    Each missing date is fetched once (all currencies are parsed from the
+    same page) by a bounded pool of workers sharing one pooled, retrying
+    HTTP session.  New rates are inserted in one batch; dates older than
+    EMPTY_DAY_GRACE days that still have no rate are recorded in
+    interbank_empty_day so later runs skip them.  Downloaded pages are
+    kept in `archive` (None to keep nothing).  Caller commits.
+
+    Returns the list of inserted {"date", "currency", "rate"} entries.
+    """
+    end = end or date.today()
+    debug_messages = debug_messages if debug_messages is not None else []
+    missing = missing_interbank_days(start, end, currencies)
+    by_day = {}
+    for d, ccy in missing:
+        by_day.setdefault(d, set()).add(ccy)
+    if not by_day:
+        return []
+
+    pages = {}
+    session = make_session(pool_size=workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fetch_bct_rates, d, session, base_url, archive): d for d in by_day}
+        for future in as_completed(futures):
+            d = futures[future]
+            try:
+                pages[d] = future.result()
+            except Exception as e:            # network error after retries: retry next run
+                debug_messages.append(f"BCT fetch failed for {d}: {e}")
+    session.close()
+
+    inserted, empty = [], []
+    cutoff = date.today() - timedelta(days=EMPTY_DAY_GRACE)
+    for d, rates in sorted(pages.items()):
+        for ccy in sorted(by_day[d]):
+            rate = rates.get(ccy)
+            if rate:
+                inserted.append({"date": d, "currency": ccy, "rate": rate})
+            elif d <= cutoff:
+                empty.append({"date": d, "currency": ccy, "checked_at": datetime.utcnow()})
+
+    _insert_ignore(InterbankRate, inserted)
+    _insert_ignore(InterbankEmptyDay, empty)
+    debug_messages.append(
+        f"{len(by_day)} dates fetched, {len(inserted)} rates inserted, {len(empty)} empty pairs recorded"
+    )
+    return inserted
+
+
+def reparse_interbank_archive(currencies, start=None, end=None, archive=page_archive):
+    """
+    Insert the rates of `currencies` found in archived pages (dates in
+    [start, end]) that are not in interbank_rate yet – e.g. to add GBP/JPY
+    history without downloading anything.  Caller commits.
+    Returns the inserted {"date", "currency", "rate"} entries.
+    """
+    currencies = [c.upper() for c in currencies]
+    days = archive.days(start, end)
+    if not days:
+        return []
+    known = set(
+        db.session.query(InterbankRate.date, InterbankRate.currency)
+        .filter(InterbankRate.date.between(days[0], days[-1]),
+                InterbankRate.currency.in_(currencies))
+        .all()
+    )
+    inserted = []
+    for d in days:
+        rates = parse_bct_rates(archive.get(d) or b"")
+        for ccy in currencies:
+            if (d, ccy) not in known and rates.get(ccy):
+                inserted.append({"date": d, "currency": ccy, "rate": rates[ccy]})
+    _insert_ignore(InterbankRate, inserted)
+    return inserted
@@ -0,0 +1,138 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from models import db, InterbankRate
+from .lookback import Lookback
+from .market_data_store import to_day_array
+
+NAT = np.datetime64("NaT", "D")
+
+
+def _day(d) -> np.datetime64:
+    if isinstance(d, datetime):
+        d = d.date()
+    return np.datetime64(d, "D")
+
+
+class InterbankIndex:
+    """
+    As-of index over `interbank_rate`.
+
+    For every currency we keep a sorted datetime64[D] array of publication
+    dates and the matching rate array, plus a `Lookback` over them: a
+    forward-filled daily calendar, so "rate on d, or the latest earlier
+    date" is a single array index and the effective date comes for free.
+    Zero rates are dropped at load time so the answer is always the first
+    *non-zero* rate on or before the requested day.
+    """
+
+    def __init__(self, refresh_interval=60):
+        self._lock = threading.Lock()
+        self._series = {}            # currency -> (dates, rates)
+        self._lookbacks = {}         # currency -> Lookback over its series
+        self._loaded = False
+        self._last_refresh = 0.0
+        self.refresh_interval = refresh_interval
+
+    # ------------------------------------------------------------------
+    # loading
+    # ------------------------------------------------------------------
+    def refresh(self, since=None):
+        """
+        Load rows with date >= `since` (all rows when None or on first use)
+        and merge them into the per-currency arrays.
+        Returns the number of rows read.
+        """
+        if not self._loaded:
+            since = None
+        q = db.session.query(InterbankRate.currency, InterbankRate.date, InterbankRate.rate)
+        if since is not None:
+            q = q.filter(InterbankRate.date >= since)
+        rows = q.order_by(InterbankRate.currency, InterbankRate.date).all()
+
+        fresh = {}
+        for ccy, d, rate in rows:
+            if rate:
+                fresh.setdefault(ccy.upper(), ([], []))
+                fresh[ccy.upper()][0].append(d)
+                fresh[ccy.upper()][1].append(rate)
+
+        with self._lock:
+            series = dict(self._series) if since is not None else {}
+            lookbacks = dict(self._lookbacks) if since is not None else {}
+            for ccy, (ds, rs) in fresh.items():
+                new_d = to_day_array(ds)
+                new_r = np.asarray(rs, dtype=float)
+                if ccy in series:
+                    old_d, old_r = series[ccy]
+                    keep = ~np.isin(old_d, new_d)
+                    new_d = np.concatenate([old_d[keep], new_d])
+                    new_r = np.concatenate([old_r[keep], new_r])
+                order = np.argsort(new_d, kind="stable")
+                series[ccy] = (new_d[order], new_r[order])
+                # slots before the first day read are reused from the previous calendar
+                lookbacks[ccy] = Lookback(*series[ccy], previous=lookbacks.get(ccy),
+                                          changed_from=to_day_array(ds).min())
+            self._series = series
+            self._lookbacks = lookbacks
+            self._loaded = True
+            self._last_refresh = time.monotonic()
+        return len(rows)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.refresh()
+
+    def last_date(self, currency):
+        dates, _ = self._series.get(currency.upper(), (None, None))
+        return dates[-1] if dates is not None and len(dates) else NAT
+
+    def _maybe_catch_up(self, currency, day):
+        last = self.last_date(currency)
+        if (np.isnat(last) or day > last) and \
+                time.monotonic() - self._last_refresh > self.refresh_interval:
+            self.refresh(since=None if np.isnat(last) else last.astype(object))
+
+    # ------------------------------------------------------------------
+    # lookups
+    # ------------------------------------------------------------------
+    def asof_many(self, currencies, days, max_shift=None):
+        """
+        Vectorised as-of lookup.
+        Returns (rates, effective_days): float array (NaN when unknown) and
+        datetime64[D] array (NaT when unknown), aligned with the inputs.
+        `max_shift` (calendar days) rejects matches older than day - max_shift.
+        """
+        self._ensure_loaded()
+        currencies = np.asarray([str(c).upper() for c in currencies], dtype=object)
+        days = to_day_array(days)
+        rates = np.full(len(days), np.nan)
+        effective = np.full(len(days), NAT)
+
+        for ccy in set(currencies):
+            mask = (currencies == ccy) & ~np.isnat(days)
+            if not mask.any():
+                continue
+            self._maybe_catch_up(ccy, days[mask].max())
+            lookback = self._lookbacks.get(ccy)
+            if lookback is not None:
+                rates[mask], effective[mask] = lookback.asof(days[mask], max_shift)
+        return rates, effective
+
+    def asof(self, d, currency, max_shift=None):
+        """(rate, effective_date) for one day, or (None, None) – one calendar slot read."""
+        self._ensure_loaded()
+        day = _day(d)
+        self._maybe_catch_up(currency, day)
+        lookback = self._lookbacks.get(currency.upper())
+        if lookback is None:
+            return None, None
+        rate, effective = lookback.asof(day, max_shift)
+        if np.isnan(rate):
+            return None, None
+        return float(rate), effective.item()
+
+
+interbank_index = InterbankIndex()
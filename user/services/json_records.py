@@ -0,0 +1,77 @@
+import gzip
+import io
+import json
+
+import zstandard
+
+# data/ files may be written as name.json, name.json.gz or name.json.zst
+DATA_FILE_SUFFIX = r"\.json(?:\.gz|\.zst)?"
+
+CHUNK_SIZE = 1 << 16
+
+
+def open_data_file(path):
+    """Text stream over a plain, gzip or zstd compressed file (by extension)."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8")
+    if path.endswith(".zst"):
+        raw = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True)
+        return io.TextIOWrapper(raw, encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_json_records(path, chunk_size=CHUNK_SIZE):
+    """
+    Yield the elements of the top-level JSON array in `path` one by one,
+    reading `chunk_size` characters at a time, so memory stays bounded by
+    the largest record rather than the file.  Raises ValueError when the
+    file is not a JSON array.
+    """
+    decoder = json.JSONDecoder()
+    with open_data_file(path) as fh:
+        buf, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = fh.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf, pos = buf[pos:] + chunk, 0
+            return True
+
+        def next_char():
+            # first non-blank character from pos on (pos moved to it), "" at EOF
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos].isspace():
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not fill():
+                    return ""
+
+        if next_char() != "[":
+            raise ValueError(f"{path}: expected a JSON array")
+        pos += 1
+        if next_char() == "]":
+            return
+        while True:
+            if next_char() == "":
+                raise ValueError(f"{path}: truncated JSON array")
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                if end == len(buf) and not eof and fill():
+                    continue           # value may go on in the next chunk
+            except json.JSONDecodeError:
+                if eof or not fill():
+                    raise ValueError(f"{path}: truncated or invalid JSON")
+                continue
+            pos = end
+            yield value
+            sep = next_char()
+            if sep == "]":
+                return
+            if sep != ",":
+                raise ValueError(f"{path}: expected ',' or ']' in JSON array")
+            pos += 1
@@ -0,0 +1,68 @@
+import numpy as np
+
+NAT = np.datetime64("NaT", "D")
+
+
+def _fill(known, values, lo, hi):
+    """Forward-filled (value, source day number) for every day number in [lo, hi)."""
+    pos = np.searchsorted(known, np.arange(lo, hi), side="right") - 1
+    return values[pos], known[pos]
+
+
+class Lookback:
+    """
+    "First non-zero value on `day` or up to `max_shift` days before" over
+    one daily series, answered from arrays instead of one query per day.
+
+    The series is forward-filled once into a calendar – one slot per day
+    from its first to its last non-zero value, holding the latest non-zero
+    value and the day it comes from – so a lookup is `day - start` into
+    it, whatever the shape of the target days (a deals × maturities grid
+    broadcasts against a per-maturity `max_shift`).
+
+    Built from `previous` (the same series before a refresh) and the first
+    day the refresh touched, the calendar slots before that day are reused
+    and only the tail is filled again.
+    """
+
+    def __init__(self, days, values, previous=None, changed_from=None):
+        days = np.asarray(days, dtype="datetime64[D]")
+        values = np.asarray(values, dtype=float)
+        ok = ~np.isnat(days) & np.isfinite(values) & (values != 0)
+        known = days[ok].astype(np.int64)
+        order = np.argsort(known, kind="stable")
+        known, values = known[order], values[ok][order]
+        if not len(known):
+            self.start = 0
+            self._values, self._source = np.empty(0), np.empty(0, dtype=np.int64)
+            return
+        self.start, end = int(known[0]), int(known[-1]) + 1
+        changed = None if changed_from is None else int(np.datetime64(changed_from, "D").astype(np.int64))
+        if previous is not None and previous.start == self.start and changed is not None and changed > self.start:
+            keep = min(changed, self.start + len(previous._values)) - self.start
+            tail_v, tail_s = _fill(known, values, self.start + keep, end)
+            self._values = np.concatenate([previous._values[:keep], tail_v])
+            self._source = np.concatenate([previous._source[:keep], tail_s])
+        else:
+            self._values, self._source = _fill(known, values, self.start, end)
+
+    def asof(self, days, max_shift=None):
+        """
+        (values, effective days) shaped like `days` (broadcast with
+        `max_shift`): NaN / NaT where no non-zero value lies within
+        `max_shift` days on or before the day (no limit when None).
+        """
+        days = np.asarray(days, dtype="datetime64[D]")
+        if max_shift is not None:
+            days, max_shift = np.broadcast_arrays(days, np.asarray(max_shift))
+        if not len(self._values):
+            return np.full(days.shape, np.nan), np.full(days.shape, NAT)
+        wanted = days.astype(np.int64)
+        idx = wanted - self.start
+        hit = ~np.isnat(days) & (idx >= 0)
+        idx = np.clip(idx, 0, len(self._values) - 1)        # past the end -> last value
+        src = self._source[idx]
+        if max_shift is not None:
+            hit &= (wanted - src) <= max_shift
+        return (np.where(hit, self._values[idx], np.nan),
+                np.where(hit, src.astype("datetime64[D]"), NAT))
@@ -0,0 +1,225 @@
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+from models import db, ExchangeData, ExchangeSpotHourly, BctxFixing, InterbankRate
+from .bctx_ingest import BCTX_FIELDS
+
+# One directory per series, each column a raw .bin file opened memory-mapped
+MARKET_ARCHIVE_DIR = os.getenv("MARKET_ARCHIVE_DIR", "/app/data/archive")
+
+EXCHANGE_FIELDS = [a.key for a in ExchangeData.__mapper__.column_attrs if a.key not in ("id", "date")]
+HOURLY_FIELDS = ["spot_usd", "spot_eur"]
+AFTERNOON = np.timedelta64(12 * 3600, "s")
+
+
+# ----------------------------------------------------------------------
+# series read from the database: (t, {column: array}) for keys >= since
+# ----------------------------------------------------------------------
+def _floats(names, rows):
+    values = np.array([tuple(r) for r in rows], dtype=float).reshape(len(rows), len(names))
+    return {name: values[:, i].copy() for i, name in enumerate(names)}
+
+
+def _exchange(since):
+    q = db.session.query(ExchangeData.date, *[getattr(ExchangeData, f) for f in EXCHANGE_FIELDS])
+    if since is not None:
+        q = q.filter(ExchangeData.date >= since)
+    rows = q.order_by(ExchangeData.date).all()
+    return np.array([r[0] for r in rows], dtype="datetime64[D]"), _floats(EXCHANGE_FIELDS, [r[1:] for r in rows])
+
+
+def _spot_hourly(since):
+    cols = [getattr(ExchangeSpotHourly, f) for f in HOURLY_FIELDS]
+    q = db.session.query(ExchangeSpotHourly.timestamp, *cols)
+    if since is not None:
+        q = q.filter(ExchangeSpotHourly.timestamp >= since)
+    rows = q.order_by(ExchangeSpotHourly.timestamp).all()
+    return np.array([r[0] for r in rows], dtype="datetime64[s]"), _floats(HOURLY_FIELDS, [r[1:] for r in rows])
+
+
+def _bctx(since):
+    """Keyed by the session start: the date at 00:00 (morning) or 12:00 (afternoon)."""
+    fields = list(BCTX_FIELDS)
+    q = db.session.query(BctxFixing.date, BctxFixing.session, BctxFixing.original_timestamp,
+                         *[getattr(BctxFixing, f) for f in fields])
+    if since is not None:
+        q = q.filter(BctxFixing.date >= since)
+    rows = q.order_by(BctxFixing.date, BctxFixing.session.desc()).all()      # morning first
+    t = np.array([r[0] for r in rows], dtype="datetime64[D]").astype("datetime64[s]")
+    t = t + np.where([r[1] == "afternoon" for r in rows], AFTERNOON, np.timedelta64(0, "s"))
+    columns = _floats(fields, [r[3:] for r in rows])
+    columns["original_timestamp"] = np.array([r[2] for r in rows], dtype="datetime64[s]")
+    return t, columns
+
+
+def _interbank(since):
+    """One column per currency, NaN where the BCT published no rate."""
+    q = db.session.query(InterbankRate.date, InterbankRate.currency, InterbankRate.rate)
+    if since is not None:
+        q = q.filter(InterbankRate.date >= since)
+    rows = q.all()
+    days = np.array([r[0] for r in rows], dtype="datetime64[D]")
+    t, pos = np.unique(days, return_inverse=True)
+    columns = {}
+    for i, (_, ccy, rate) in enumerate(rows):
+        columns.setdefault(ccy.upper(), np.full(len(t), np.nan))[pos[i]] = rate
+    return t, columns
+
+
+# series -> (loader, unit of its "t" column)
+SERIES = {
+    "exchange": (_exchange, "D"),
+    "spot_hourly": (_spot_hourly, "s"),
+    "bctx": (_bctx, "s"),
+    "interbank": (_interbank, "D"),
+}
+
+
+def _blank(dtype, n):
+    return np.full(n, np.datetime64("NaT") if dtype.kind == "M" else np.nan, dtype=dtype)
+
+
+class MarketArchive:
+    """
+    Columnar copy of the market history on disk, for analyses that read
+    years of data at once (backtests, TCA, VaR):
+
+        exchange/meta.json          {"rows": 1843, "columns": {"t": "<M8[D]", ...}}
+        exchange/t.bin              datetime64 keys, sorted
+        exchange/spot_usd.bin       one raw float64 column per file
+        ...
+
+    The database stays the source of truth: `update(series, since)`
+    re-reads the rows with key >= since after each ingestion and writes
+    them over the archived tail, in place.  Rows before `since` are never
+    rewritten and the files only grow; meta.json, swapped in last, says
+    how many rows are valid.  Reads are memory-mapped and cached until
+    meta.json changes.  A failed update drops meta.json, so readers fall
+    back to the database until the series is rebuilt.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or MARKET_ARCHIVE_DIR
+        self._lock = threading.Lock()
+        self._cache = {}                # series -> ((inode, mtime) of meta.json, arrays)
+
+    def _path(self, series, name):
+        return os.path.join(self.root, series, name)
+
+    def _meta(self, series):
+        try:
+            with open(self._path(series, "meta.json")) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    # ------------------------------------------------------------------
+    # reading
+    # ------------------------------------------------------------------
+    def load(self, series):
+        """{"t": ..., column: ...} read-only memory-mapped arrays, or None when not built."""
+        try:
+            st = os.stat(self._path(series, "meta.json"))
+        except FileNotFoundError:
+            return None
+        version = (st.st_ino, st.st_mtime_ns)
+        cached = self._cache.get(series)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        meta = self._meta(series)
+        if meta is None:
+            return None
+        n = meta["rows"]
+        arrays = {
+            name: np.memmap(self._path(series, f"{name}.bin"), dtype=dtype, mode="r", shape=(n,))
+            if n else np.empty(0, dtype=dtype)
+            for name, dtype in meta["columns"].items()
+        }
+        self._cache[series] = (version, arrays)
+        return arrays
+
+    def window(self, series, start=None, end=None, columns=None):
+        """Zero-copy slices of the series over start <= t < end (None = unbounded)."""
+        data = self.load(series)
+        if data is None:
+            return None
+        t = data["t"]
+        lo = 0 if start is None else np.searchsorted(t, np.datetime64(start, SERIES[series][1]))
+        hi = len(t) if end is None else np.searchsorted(t, np.datetime64(end, SERIES[series][1]))
+        names = ["t", *(columns or [n for n in data if n != "t"])]
+        return {n: data[n][lo:hi] for n in names}
+
+    def frame(self, series, start=None, end=None, columns=None):
+        """`window` as a DataFrame indexed by t (empty when the series is not built)."""
+        data = self.window(series, start, end, columns)
+        if data is None:
+            return pd.DataFrame()
+        t = data.pop("t")
+        return pd.DataFrame(data, index=pd.Index(t, name="t"))
+
+    # ------------------------------------------------------------------
+    # writing
+    # ------------------------------------------------------------------
+    def update(self, series, since=None):
+        """
+        Re-read the rows of `series` with key >= `since` (everything when
+        None or not built yet) and write them over the archived ones from
+        that key on.  The archive is a derived copy: errors are printed,
+        never raised.  Returns the number of rows in the series, or None
+        on failure.
+        """
+        loader, unit = SERIES[series]
+        try:
+            with self._lock:
+                old = self.load(series) if since is not None else None
+                cut = np.datetime64(since, unit) if old is not None else None
+                t, columns = loader(None if cut is None else cut.astype(object))
+                keep = 0 if old is None else int(np.searchsorted(old["t"], cut))
+                dtypes = {} if old is None else {n: v.dtype for n, v in old.items() if n != "t"}
+                tail = {"t": t}
+                for name in dict.fromkeys([*dtypes, *columns]):
+                    tail[name] = columns[name] if name in columns else _blank(dtypes[name], len(t))
+                self._write(series, keep, tail, dtypes)
+            return keep + len(t)
+        except Exception as e:
+            print(f"Market archive update failed for {series}: {e}")
+            try:
+                os.remove(self._path(series, "meta.json"))
+            except OSError:
+                pass
+            return None
+
+    def rebuild(self):
+        """Rewrite every series from the database.  Returns {series: rows}."""
+        return {series: self.update(series) for series in SERIES}
+
+    def _write(self, series, keep, tail, dtypes):
+        """
+        Write `tail` from row `keep` on.  Columns new to the series get
+        blanks for the rows before it.  Caller holds the lock.
+        """
+        os.makedirs(os.path.join(self.root, series), exist_ok=True)
+        columns = {}
+        for name, values in tail.items():
+            values = np.ascontiguousarray(values, dtype=dtypes.get(name, values.dtype))
+            offset = keep
+            if keep and name != "t" and name not in dtypes:
+                values, offset = np.concatenate([_blank(values.dtype, keep), values]), 0
+            path = self._path(series, f"{name}.bin")
+            with open(path, "r+b" if os.path.exists(path) else "wb") as fh:
+                fh.seek(offset * values.dtype.itemsize)
+                fh.write(values.tobytes())
+            columns[name] = values.dtype.str
+
+        meta = {"rows": keep + len(tail["t"]), "columns": columns}
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, series), prefix=".tmp-")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, self._path(series, "meta.json"))
+
+
+market_archive = MarketArchive()
@@ -0,0 +1,192 @@
+import threading
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from models import db, ExchangeData
+from .lookback import Lookback
+
+# ExchangeData attributes kept in memory (one contiguous row per field)
+FIELDS = [
+    "spot_usd", "spot_eur",
+    "usd_1m", "usd_3m", "usd_6m",
+    "eur_1m", "eur_3m", "eur_6m",
+    "tnd_1m", "tnd_3m", "tnd_6m",
+]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class Curve:
+    """
+    Read-only snapshot of one `exchange_data` row.
+    Exposes the same attribute names as the ORM model (spot_usd, usd_1m, …)
+    so it can be used wherever an ExchangeData row was used before.
+    """
+    __slots__ = ("date", *FIELDS)
+
+    def __init__(self, day, values):
+        self.date = day
+        for name, v in zip(FIELDS, values):
+            setattr(self, name, float(v))
+
+    def spot(self, currency):
+        return getattr(self, f"spot_{currency.lower()}")
+
+    def rate(self, currency, tenor):
+        """tenor: '1m' | '3m' | '6m'"""
+        return getattr(self, f"{currency.lower()}_{tenor}")
+
+    def __repr__(self):
+        return f"<Curve {self.date} USD={self.spot_usd} EUR={self.spot_eur}>"
+
+
+def to_day_array(values) -> np.ndarray:
+    """date / datetime / Timestamp iterable -> datetime64[D] array (NaT for None)."""
+    return pd.to_datetime(pd.Series(list(values), dtype=object)).values.astype("datetime64[D]")
+
+
+def _to_ordinal(d) -> int:
+    if isinstance(d, datetime):
+        d = d.date()
+    return d.toordinal()
+
+
+class MarketDataStore:
+    """
+    Process-level cache of `exchange_data`.
+
+    Values live in a (len(FIELDS), n_days) float array indexed by
+    `date.toordinal() - start`, so a single date is an O(1) slot read and a
+    vector of dates is one fancy-index.  Only the last day changes during the
+    day, so the store is filled on first use and then refreshed incrementally
+    by the ingestion code (`refresh(since=...)`) after it commits, and by the
+    catch-up tick in other processes.
+    """
+
+    def __init__(self, refresh_interval=60):
+        self._lock = threading.Lock()
+        # (start ordinal, present mask, values) swapped as one tuple
+        self._snapshot = (0, np.zeros(0, dtype=bool), np.empty((len(FIELDS), 0)))
+        self._loaded = False
+        self._last_refresh = 0.0
+        self.refresh_interval = refresh_interval
+        self._lookbacks = {}         # field -> (snapshot it was built from, Lookback)
+
+    # ------------------------------------------------------------------
+    # loading
+    # ------------------------------------------------------------------
+    def refresh(self, since=None):
+        """
+        (Re)load rows with date >= `since` (everything when None) and merge
+        them into the arrays.  Returns the number of rows read.
+        """
+        if not self._loaded:
+            since = None
+        cols = [getattr(ExchangeData, f) for f in FIELDS]
+        q = db.session.query(ExchangeData.date, *cols)
+        if since is not None:
+            q = q.filter(ExchangeData.date >= since)
+        rows = q.all()
+
+        with self._lock:
+            start, present, values = self._snapshot if since is not None \
+                else (0, np.zeros(0, dtype=bool), np.empty((len(FIELDS), 0)))
+
+            if rows:
+                ords = np.array([_to_ordinal(r[0]) for r in rows], dtype=np.int64)
+                data = np.array([r[1:] for r in rows], dtype=float).T
+
+                end = start + len(present)
+                new_start = int(min(ords.min(), start)) if len(present) else int(ords.min())
+                new_end = int(max(ords.max() + 1, end)) if len(present) else int(ords.max() + 1)
+                if (new_start, new_end) != (start, end):
+                    grown_present = np.zeros(new_end - new_start, dtype=bool)
+                    grown_values = np.full((len(FIELDS), new_end - new_start), np.nan)
+                    off = start - new_start
+                    grown_present[off:off + len(present)] = present
+                    grown_values[:, off:off + len(present)] = values
+                    present, values = grown_present, grown_values
+                else:
+                    present, values = present.copy(), values.copy()
+
+                idx = ords - new_start
+                present[idx] = True
+                values[:, idx] = data
+                start = new_start
+
+            self._snapshot = (start, present, values)
+            self._loaded = True
+            self._last_refresh = time.monotonic()
+        return len(rows)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.refresh()
+
+    def _maybe_catch_up(self, ordinal):
+        """
+        A date past the last loaded day may have been ingested by another
+        process, and the last day itself is rewritten in place by every
+        hourly ingestion – re-read from the last day on, at most once per
+        `refresh_interval`.
+        """
+        start, present, _ = self._snapshot
+        last = start + len(present) - 1
+        if ordinal >= last and time.monotonic() - self._last_refresh > self.refresh_interval:
+            self.refresh(since=date.fromordinal(last) if len(present) else None)
+            return True
+        return False
+
+    # ------------------------------------------------------------------
+    # lookups
+    # ------------------------------------------------------------------
+    def get(self, d):
+        """Curve for date `d`, or None when there is no exchange_data row."""
+        self._ensure_loaded()
+        o = _to_ordinal(d)
+        self._maybe_catch_up(o)
+        start, present, values = self._snapshot
+        i = o - start
+        if 0 <= i < len(present) and present[i]:
+            return Curve(date.fromordinal(o), values[:, i])
+        return None
+
+    def get_many(self, days):
+        """
+        Vectorised lookup.
+        Returns (found, columns) where `found` is a bool mask aligned with
+        `days` and `columns` maps each FIELDS name to a float array (NaN where
+        not found).
+        """
+        self._ensure_loaded()
+        days = to_day_array(days)
+        ords = days.astype(np.int64) + EPOCH_ORDINAL
+        if len(ords) and not np.isnat(days).all():
+            self._maybe_catch_up(int(ords[~np.isnat(days)].max()))
+
+        start, present, values = self._snapshot
+        idx = ords - start
+        found = (~np.isnat(days)) & (idx >= 0) & (idx < len(present))
+        found[found] = present[idx[found]]
+        safe = np.where(found, idx, 0)
+        out = values[:, safe] if len(present) else np.full((len(FIELDS), len(days)), np.nan)
+        out = np.where(found, out, np.nan)
+        return found, dict(zip(FIELDS, out))
+
+
+    def lookback(self, field):
+        """`Lookback` over one FIELDS column, rebuilt after a refresh."""
+        self._ensure_loaded()
+        snapshot = self._snapshot
+        cached = self._lookbacks.get(field)
+        if cached is None or cached[0] is not snapshot:
+            start, present, values = snapshot
+            days = (np.arange(len(present)) + start - EPOCH_ORDINAL).astype("datetime64[D]")
+            row = values[FIELDS.index(field)] if len(present) else np.empty(0)
+            cached = (snapshot, Lookback(days, np.where(present, row, np.nan)))
+            self._lookbacks[field] = cached
+        return cached[1]
+
+
+market_data = MarketDataStore()
@@ -0,0 +1,342 @@
+import bisect
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import requests
+from bs4 import BeautifulSoup
+from .bct_client import bct_rates
+from .bctx_ingest import BCTX_FIELDS, bctx_columns
+from .ingestion_state import record_timestamp
+from .json_records import DATA_FILE_SUFFIX, iter_json_records
+
+# "live" (Eikon + XE/Wise + BCT) or "replay" of MARKET_REPLAY_FILE
+MARKET_DATA_PROVIDER = os.getenv("MARKET_DATA_PROVIDER", "live")
+# a recording (JSON array of events) or a data/ directory
+MARKET_REPLAY_FILE = os.getenv("MARKET_REPLAY_FILE", "")
+# replay clock rate: 1 = real time, 60 = a minute per second, 0 = everything at once
+MARKET_REPLAY_SPEED = float(os.getenv("MARKET_REPLAY_SPEED", "1"))
+
+EIKON_APP_KEY = os.getenv("EIKON_APP_KEY", "20af0572a6364fe8abf9a35cdd16bd367057564a")
+
+XE_URL = "https://www.xe.com/currencyconverter/convert/?Amount=1&From={}&To=TND"
+WISE_URL = "https://wise.com/us/currency-converter/{}-to-tnd-rate?amount=1"
+XE_CHARTS_URL = "https://www.xe.com/currencycharts/"
+
+
+class MarketDataProvider:
+    """
+    Where market data comes from.  Every consumer goes through three calls:
+
+        history(ric, interval, count, start, end)
+            DataFrame of bars on a DatetimeIndex, columns as the source
+            gives them (OPEN/HIGH/LOW/CLOSE, BID/ASK, ...)
+        latest_quote(currency)
+            {"rates": {source: rate}, "metrics": {"High": ...},
+             "pairs": {"EUR/USD": {"rate": ..., "change": ...}}}
+        fixings(day, require=None)
+            BCT interbank rates published for `day`, {"USD": 3.12, ...}
+
+    A provider that has no such data raises NotImplementedError.
+    """
+
+    def history(self, ric, interval="minute", count=None, start=None, end=None):
+        raise NotImplementedError(f"{type(self).__name__} has no history")
+
+    def latest_quote(self, currency):
+        raise NotImplementedError(f"{type(self).__name__} has no quotes")
+
+    def fixings(self, day, require=None):
+        raise NotImplementedError(f"{type(self).__name__} has no fixings")
+
+
+# ----------------------------------------------------------------------
+# live sources
+# ----------------------------------------------------------------------
+class EikonProvider(MarketDataProvider):
+    """Bars from Eikon Desktop (`eikon.get_timeseries`), imported on first use."""
+
+    def __init__(self, app_key=None):
+        self.app_key = app_key or EIKON_APP_KEY
+        self._ek = None
+
+    def history(self, ric, interval="minute", count=None, start=None, end=None):
+        if self._ek is None:
+            import eikon as ek
+            ek.set_app_key(self.app_key)
+            self._ek = ek
+        return self._ek.get_timeseries(ric, interval=interval, count=count,
+                                       start_date=start, end_date=end)
+
+
+class WebQuoteProvider(MarketDataProvider):
+    """TND quotes scraped from XE and Wise, and the XE major-pairs table."""
+
+    def latest_quote(self, currency):
+        quote = {"rates": {}, "metrics": {}, "pairs": {}}
+        try:
+            soup = BeautifulSoup(requests.get(XE_URL.format(currency)).content, "html.parser")
+            xe_rate_element = soup.select_one(".result__BigRate-sc-1bsijpp-1.dPdXSB")
+            if xe_rate_element:
+                quote["rates"]["XE"] = re.sub(r"[^\d\-.]", "", xe_rate_element.get_text())
+            else:
+                print(f"XE rate element not found for {currency}")
+            for name in ("High", "Low", "Volatility"):
+                value = soup.select_one(f'th:contains("{name}") + td')
+                if value:
+                    quote["metrics"][name] = value.text.strip()
+        except Exception as e:
+            print(f"Error scraping XE.com for {currency}: {e}")
+
+        try:
+            soup = BeautifulSoup(requests.get(WISE_URL.format(currency)).content, "html.parser")
+            wise_rate_element = soup.select_one(".text-success")
+            if wise_rate_element:
+                quote["rates"]["WISE"] = re.sub(r"[^\d\-.]", "", wise_rate_element.get_text())
+        except Exception as e:
+            print(f"Error scraping Wise.com for {currency}: {e}")
+
+        try:
+            soup = BeautifulSoup(requests.get(XE_CHARTS_URL).content, "html.parser")
+            currency_table = soup.find_all("table", class_="table__TableBase-sc-1j0jd5l-0")[0]
+            for row in currency_table.find_all("tr")[1:]:
+                cells = row.find_all("td")
+                pair_link = cells[0].find('a') if len(cells) >= 3 else None
+                if not pair_link:
+                    continue
+                change_symbol = cells[2].text.strip()
+                change_direction = 'Stable'
+                if '▲' in change_symbol:
+                    change_direction = 'Up'
+                elif '▼' in change_symbol:
+                    change_direction = 'Down'
+                quote["pairs"][pair_link.get_text(strip=True).replace(" / ", "/")] = {
+                    'rate': float(re.sub(r"[^\d.]", "", cells[1].get_text(strip=True))),
+                    'change': change_direction,
+                }
+        except Exception as e:
+            print(f"Error all currency: {e}")
+        return quote
+
+
+class BctProvider(MarketDataProvider):
+    """Published BCT interbank rates (archived page first, then the website)."""
+
+    def fixings(self, day, require=None):
+        return bct_rates(day, require=require)
+
+
+class LiveProvider(EikonProvider, WebQuoteProvider, BctProvider):
+    """The production sources: Eikon bars, XE/Wise quotes, BCT fixings."""
+
+
+# ----------------------------------------------------------------------
+# replay
+# ----------------------------------------------------------------------
+class ReplayProvider(MarketDataProvider):
+    """
+    Serves recorded events as if they were happening now.  A recording is
+    a JSON array of
+
+        {"t": "2025-04-29T09:05:00", "kind": "bar" | "quote" | "fixing",
+         "key": ric | currency | "YYYY-MM-DD", "value": {...}}
+
+    The replay clock starts at the first event when the provider is built
+    and runs `speed` times faster than `clock`; later events are not
+    visible yet.  speed=0 shows the whole recording at once, for
+    throughput runs.
+    """
+
+    def __init__(self, events, speed=1.0, clock=time.monotonic):
+        events = list(events)
+        times = pd.to_datetime([e["t"] for e in events], format="ISO8601")
+        if times.tz is not None:
+            times = times.tz_convert(None)
+        self._series = {}           # (kind, key) -> ([t, ...], [value, ...]), sorted
+        for i in np.argsort(times.values, kind="stable"):
+            e = events[i]
+            ts, values = self._series.setdefault((e["kind"], str(e["key"])), ([], []))
+            ts.append(times[i].to_pydatetime())
+            values.append(e["value"])
+        self.start = times.min().to_pydatetime() if len(events) else datetime.min
+        self.speed = speed
+        self.clock = clock
+        self._t0 = clock()
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Replay a recording (plain, .gz or .zst JSON array)."""
+        return cls(iter_json_records(path), **kwargs)
+
+    @classmethod
+    def from_data_files(cls, data_dir, **kwargs):
+        """
+        Replay the bctx_data and midmarket_rates files of a data/
+        directory (each run of eikon/ writes the rows it fetched, so every
+        file is read, oldest first): BID/ASK bars per BCTX RIC and USD /
+        EUR quotes, the recorded mid standing in for both the XE and the
+        Wise rate.
+        """
+        def records(prefix):
+            names = sorted(f for f in os.listdir(data_dir)
+                           if re.fullmatch(prefix + r"_\d{4}-\d{2}-\d{2}_\d{4}" + DATA_FILE_SUFFIX, f))
+            for name in names:
+                yield from iter_json_records(os.path.join(data_dir, name))
+
+        def events():
+            columns = None
+            for rec in records("bctx_data"):
+                ts = record_timestamp(rec)
+                if ts is None:
+                    continue
+                columns = columns or bctx_columns(rec.keys())
+                bars = {}
+                for field, (ric, side) in BCTX_FIELDS.items():
+                    if columns[field] is not None:
+                        bars.setdefault(ric, {})[side] = rec.get(columns[field])
+                for ric, bar in bars.items():
+                    yield {"t": ts.isoformat(), "kind": "bar", "key": ric, "value": bar}
+            for rec in records("midmarket_rates"):
+                ts = record_timestamp(rec)
+                if ts is None:
+                    continue
+                for ccy, field in (("USD", "spotUSD"), ("EUR", "spotEUR")):
+                    mid = rec.get(field)
+                    if mid is None:
+                        continue
+                    yield {"t": ts.isoformat(), "kind": "quote", "key": ccy,
+                           "value": {"rates": {"XE": mid, "WISE": mid}, "metrics": {}, "pairs": {}}}
+
+        return cls(events(), **kwargs)
+
+    def now(self):
+        """Current replay time."""
+        if not self.speed:
+            return datetime.max
+        return self.start + timedelta(seconds=(self.clock() - self._t0) * self.speed)
+
+    def _visible(self, kind, key):
+        ts, values = self._series.get((kind, str(key)), ([], []))
+        n = bisect.bisect_right(ts, self.now())
+        return ts[:n], values[:n]
+
+    def history(self, ric, interval="minute", count=None, start=None, end=None):
+        ts, values = self._visible("bar", ric)
+        df = pd.DataFrame(values, index=pd.DatetimeIndex(ts, name="Date"))
+        if start is not None:
+            df = df[df.index >= pd.Timestamp(start)]
+        if end is not None:
+            df = df[df.index <= pd.Timestamp(end)]
+        return df.tail(count) if count else df
+
+    def get_history(self, universe, fields, start=None, end=None, interval=None):
+        """
+        refinitiv.data's get_history over the recorded bars, so the eikon/
+        scripts' main(provider=...) runs without a Refinitiv session:
+        `fields` columns for one RIC, (RIC, field) columns for several, on
+        a "Timestamp" index.  Bars keep their recorded spacing whatever
+        the `interval`.
+        """
+        universe = [universe] if isinstance(universe, str) else list(universe)
+        frames = {}
+        for ric in universe:
+            df = self.history(ric, start=start, end=end)
+            if not df.empty:
+                frames[ric] = df.reindex(columns=fields)
+        if not frames:
+            return pd.DataFrame()
+        df = frames[universe[0]] if len(universe) == 1 else pd.concat(frames, axis=1)
+        return df.rename_axis("Timestamp")
+
+    def latest_quote(self, currency):
+        _, values = self._visible("quote", currency.upper())
+        return values[-1] if values else {"rates": {}, "metrics": {}, "pairs": {}}
+
+    def fixings(self, day, require=None):
+        _, values = self._visible("fixing", day.isoformat())
+        return dict(values[-1]) if values else {}
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    Passes calls through to `inner` and keeps what it returned as replay
+    events; `save(path)` writes them as a recording for ReplayProvider.
+    """
+
+    def __init__(self, inner):
+        self.inner = inner
+        self._lock = threading.Lock()
+        self._events = {}           # (kind, key, t) -> event, so repeated bars are kept once
+
+    def _add(self, kind, key, t, value):
+        event = {"t": t.isoformat(), "kind": kind, "key": key, "value": value}
+        with self._lock:
+            self._events[(kind, key, event["t"])] = event
+
+    def history(self, ric, interval="minute", count=None, start=None, end=None):
+        df = self.inner.history(ric, interval=interval, count=count, start=start, end=end)
+        if df is not None:
+            for t, row in df.iterrows():
+                self._add("bar", ric, pd.Timestamp(t).to_pydatetime(),
+                          {k: (None if pd.isna(v) else float(v)) for k, v in row.items()})
+        return df
+
+    def latest_quote(self, currency):
+        quote = self.inner.latest_quote(currency)
+        self._add("quote", currency.upper(), datetime.now(), quote)
+        return quote
+
+    def fixings(self, day, require=None):
+        rates = self.inner.fixings(day, require=require)
+        self._add("fixing", day.isoformat(), datetime.now(), rates)
+        return rates
+
+    def save(self, path):
+        with self._lock:
+            events = sorted(self._events.values(), key=lambda e: e["t"])
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".tmp-")
+        with os.fdopen(fd, "w") as fh:
+            json.dump(events, fh)
+        os.replace(tmp, path)
+        return len(events)
+
+
+# ----------------------------------------------------------------------
+# process-wide provider
+# ----------------------------------------------------------------------
+_provider = None
+
+
+def make_provider(kind=None, path=None, speed=None):
+    """A provider per MARKET_DATA_PROVIDER / MARKET_REPLAY_* unless given."""
+    kind = kind or MARKET_DATA_PROVIDER
+    if kind == "live":
+        return LiveProvider()
+    if kind == "replay":
+        path = path or MARKET_REPLAY_FILE
+        speed = MARKET_REPLAY_SPEED if speed is None else speed
+        if os.path.isdir(path):
+            return ReplayProvider.from_data_files(path, speed=speed)
+        return ReplayProvider.from_file(path, speed=speed)
+    raise ValueError(f"Unknown market data provider: {kind}")
+
+
+def get_market_provider():
+    """The provider market data is read through (built on first use)."""
+    global _provider
+    if _provider is None:
+        _provider = make_provider()
+    return _provider
+
+
+def set_market_provider(provider):
+    """Swap the process-wide provider (benchmarks, load tests).  Returns the previous one."""
+    global _provider
+    previous, _provider = _provider, provider
+    return previous
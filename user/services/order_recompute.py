@@ -0,0 +1,204 @@
+import numpy as np
+import pandas as pd
+from sqlalchemy import update
+from models import db, Order
+from .benchmark_service import BENCHMARK_COLUMNS, compute_benchmarks
+from .interbank_index import interbank_index
+
+# Columns read for a recompute (benchmark inputs + the values we persist)
+RECOMPUTE_COLUMNS = BENCHMARK_COLUMNS + [
+    "user_id", "execution_rate", "original_amount",
+    "benchmark_rate", "gain", "gain_percentage",
+]
+PERSISTED = ["interbank_rate", "benchmark_rate", "gain", "gain_percentage"]
+
+# Orders sharing these share one daily commission / gain ratio
+DAY_KEY = ["user_id", "currency", "transaction_date"]
+COMMISSION_COLUMNS = DAY_KEY + [
+    "id", "execution_rate", "original_amount", "commission_percent",
+    "gain", "commission_gain",
+]
+
+
+# ---------------------------------------------------------------------------
+# dirty marking
+# ---------------------------------------------------------------------------
+def mark_dirty_for_interbank(currencies, since):
+    """
+    New or corrected interbank rows from `since` onwards can change the
+    as-of rate of every order in those currencies traded on/after `since`,
+    whatever interbank_rate it holds now: the recompute reads it again.
+    """
+    db.session.execute(
+        update(Order)
+        .where(Order.currency.in_(list(currencies)),
+               Order.transaction_date >= since)
+        .values(benchmark_dirty=True)
+    )
+
+
+def mark_dirty_for_exchange_data(dates):
+    """Yield changes only move the benchmark of forward/option trades of those dates."""
+    dates = list(dates)
+    if dates:
+        db.session.execute(
+            update(Order)
+            .where(Order.transaction_date.in_(dates),
+                   Order.trade_type.in_(["forward", "option"]))
+            .values(benchmark_dirty=True)
+        )
+
+
+# ---------------------------------------------------------------------------
+# recompute
+# ---------------------------------------------------------------------------
+def compute_gains(df: pd.DataFrame, bench: np.ndarray):
+    """
+    Gain of each order against its benchmark:
+      gain_pct = (bench - exe) / exe   for import/buy
+               = (exe - bench) / bench for export/sell
+      gain     = gain_pct * original_amount * exe     (TND)
+    Orders without execution rate or benchmark get 0.
+    Returns (gain_pct, gain_tnd).
+    """
+    exe = pd.to_numeric(df["execution_rate"], errors="coerce").to_numpy(dtype=float)
+    amt = pd.to_numeric(df["original_amount"], errors="coerce").to_numpy(dtype=float)
+    is_buy = df["transaction_type"].fillna("").str.lower().isin(["import", "buy"]).to_numpy()
+
+    ok = (exe > 0) & (np.nan_to_num(bench) != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(is_buy, (bench - exe) / exe, (exe - bench) / bench)
+    pct = np.where(ok, pct, 0.0)
+    return pct, np.where(ok, pct * amt * exe, 0.0)
+
+
+def daily_commission_ratio(keys, commission_tnd, gain_tnd) -> np.ndarray:
+    """
+    Commission / |gain| * 100 summed over each row's trading day
+    (0 when the day has no gain).  `keys` is the list of grouping arrays,
+    e.g. [transaction_date] or [user_id, currency, transaction_date].
+    """
+    names = [f"k{i}" for i in range(len(keys))]
+    daily = pd.DataFrame({**{n: np.asarray(k) for n, k in zip(names, keys)},
+                          "comm": np.asarray(commission_tnd, dtype=float),
+                          "gain": np.asarray(gain_tnd, dtype=float)})
+    sums = daily.groupby(names)[["comm", "gain"]].transform("sum")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = sums["comm"] / sums["gain"].abs() * 100
+    return np.where(sums["gain"] != 0, ratio, 0.0)
+
+
+def refresh_commission_gains(keys: pd.DataFrame) -> int:
+    """
+    Persist `commission_gain` for every executed/matched order sharing a
+    (user_id, currency, transaction_date) with a row of `keys`.  Uses the
+    gains already written in the current transaction.
+    Returns the number of rows whose value changed.
+    """
+    keys = keys[DAY_KEY].drop_duplicates()
+    if keys.empty:
+        return 0
+    rows = (
+        db.session.query(*[getattr(Order, c) for c in COMMISSION_COLUMNS])
+        .filter(Order.user_id.in_([int(u) for u in keys["user_id"].unique()]),
+                Order.currency.in_(list(keys["currency"].unique())),
+                Order.transaction_date.in_(list(keys["transaction_date"].unique())),
+                Order.status.in_(["Executed", "Matched"]))
+        .all()
+    )
+    day = pd.DataFrame(rows, columns=COMMISSION_COLUMNS).merge(keys, on=DAY_KEY)
+    if day.empty:
+        return 0
+
+    exe = pd.to_numeric(day["execution_rate"], errors="coerce").fillna(0.0)
+    amt = pd.to_numeric(day["original_amount"], errors="coerce").fillna(0.0)
+    comm = pd.to_numeric(day["commission_percent"], errors="coerce").fillna(0.0)
+    gain = pd.to_numeric(day["gain"], errors="coerce").fillna(0.0)
+    ratio = daily_commission_ratio([day[k] for k in DAY_KEY], exe * amt * comm, gain)
+
+    changed = _changed(day["commission_gain"], ratio)
+    if changed.any():
+        db.session.execute(update(Order), [
+            {"id": int(i), "commission_gain": float(r)}
+            for i, r in zip(day["id"][changed], ratio[changed])
+        ])
+    return int(changed.sum())
+
+
+def _changed(old, new):
+    old = pd.to_numeric(pd.Series(old), errors="coerce").to_numpy(dtype=float)
+    both_nan = np.isnan(old) & np.isnan(new)
+    return ~both_nan & ~np.isclose(old, new, rtol=0, atol=1e-12, equal_nan=False)
+
+
+def recompute_dirty_orders(full=False, errors=None):
+    """
+    Re-benchmark the orders flagged `benchmark_dirty` (or every order when
+    `full`), and write back only the rows whose interbank_rate,
+    benchmark_rate, gain or gain_percentage actually changed – in a single
+    bulk UPDATE – then refresh `commission_gain` for their trading days.
+    Orders that cannot be priced yet are simply un-flagged; they are
+    flagged again when the order or its reference data changes.
+
+    The flags are cleared by the same statement that reads the orders
+    (UPDATE ... RETURNING), so an order edited while this runs is flagged
+    again afterwards and picked up by the next run instead of being lost.
+
+    Returns {"processed": n, "updated": m, "user_ids": {...}, "day_keys": frame}
+    where user_ids / day_keys cover every processed order (a status change
+    matters to the dashboards even when the benchmark did not move).
+    """
+    cols = [getattr(Order, c) for c in RECOMPUTE_COLUMNS]
+    claim = update(Order).values(benchmark_dirty=False).returning(*cols)
+    if not full:
+        claim = claim.where(Order.benchmark_dirty.is_(True))
+    rows = db.session.execute(claim, execution_options={"synchronize_session": False}).all()
+    df = pd.DataFrame(rows, columns=RECOMPUTE_COLUMNS)
+    if df.empty:
+        return {"processed": 0, "updated": 0, "user_ids": set(),
+                "day_keys": pd.DataFrame(columns=DAY_KEY)}
+
+    # 1) as-of interbank rate (the stored one when none is published) -------
+    old_ib = pd.to_numeric(df["interbank_rate"], errors="coerce").to_numpy(dtype=float)
+    ib, _ = interbank_index.asof_many(df["currency"], df["transaction_date"])
+    ib = np.where(np.isnan(ib), old_ib, ib)
+    df["interbank_rate"] = ib
+
+    # 2) benchmarks & gains -------------------------------------------------
+    bench = compute_benchmarks(df, strict=False, errors=errors)
+    old_bench = pd.to_numeric(df["benchmark_rate"], errors="coerce").to_numpy(dtype=float)
+    bench = np.where(np.isnan(bench), old_bench, bench)   # keep last good value
+    pct, gain = compute_gains(df, bench)
+
+    new = {
+        "interbank_rate": ib,
+        "benchmark_rate": bench,
+        "gain": gain,
+        "gain_percentage": pct * 100,
+    }
+    old = {"interbank_rate": old_ib, "benchmark_rate": old_bench,
+           "gain": df["gain"], "gain_percentage": df["gain_percentage"]}
+    changed = np.zeros(len(df), dtype=bool)
+    for c in PERSISTED:
+        changed |= _changed(old[c], new[c])
+
+    # 3) write back ----------------------------------------------------------
+    ids = df["id"].to_numpy()
+    if changed.any():
+        params = [
+            {"id": int(ids[i]),
+             **{c: (None if np.isnan(new[c][i]) else float(new[c][i])) for c in PERSISTED}}
+            for i in np.flatnonzero(changed)
+        ]
+        db.session.execute(update(Order), params)
+
+    # 4) daily commission / gain ratio of the trading days involved ----------
+    refresh_commission_gains(df)
+    db.session.commit()
+
+    return {
+        "processed": len(df),
+        "updated": int(changed.sum()),
+        "user_ids": set(int(u) for u in df["user_id"]),
+        "day_keys": df[DAY_KEY].drop_duplicates(),
+    }